@@ -0,0 +1,53 @@
+"""Import-time benchmark for short-lived processes.
+
+Measures the wall-clock latency of `import alparc` and `alparc --help` in fresh interpreters and
+compares the median against a target latency.
+
+Usage:
+    python benchmarks/import_time.py [--repeats 10] [--import-target 0.2] [--help-target 1.0]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = "import alparc"
+HELP_SNIPPET = "import sys; sys.argv = ['alparc', '--help']; from alparc.cli import cli; cli()"
+
+
+def time_snippet(snippet: str, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", snippet], check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--import-target", type=float, default=0.2, help="target median latency in seconds")
+    parser.add_argument("--help-target", type=float, default=1.0, help="target median latency in seconds")
+    args = parser.parse_args()
+
+    baseline = time_snippet("pass", args.repeats)
+    results = [
+        ("import alparc", time_snippet(IMPORT_SNIPPET, args.repeats), args.import_target),
+        ("alparc --help", time_snippet(HELP_SNIPPET, args.repeats), args.help_target),
+    ]
+
+    print(f"{'command':<16}{'median [s]':>12}{'target [s]':>12}")
+    print(f"{'python (empty)':<16}{baseline:>12.3f}{'':>12}")
+    failed = False
+    for name, median, target in results:
+        status = "ok" if median <= target else "SLOW"
+        failed = failed or median > target
+        print(f"{name:<16}{median:>12.3f}{target:>12.3f}  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Word generation benchmark: the "loop" and the "vectorized" engine of `make_words`.
+
+Usage:
+    python benchmarks/make_words.py [--n-words 10000] [--phoneme-pattern cV]
+"""
+import argparse
+import time
+
+from alparc import load_phonemes, make_syllables, make_words, set_seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-words", type=int, default=10_000)
+    parser.add_argument("--max-tries", type=int, default=100_000)
+    parser.add_argument("--phoneme-pattern", default="cV")
+    args = parser.parse_args()
+
+    set_seed(0)
+    syllables = make_syllables(load_phonemes(lang=None), phoneme_pattern=args.phoneme_pattern)
+
+    print(f"{'engine':<12}{'words':>8}{'time [s]':>12}")
+    for engine in ("loop", "vectorized"):
+        start = time.perf_counter()
+        words = make_words(syllables, n_words=args.n_words, max_tries=args.max_tries, positional_control=False,
+                           progress_bar=False, engine=engine)
+        print(f"{engine:<12}{len(words):>8}{time.perf_counter() - start:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Construction benchmark: validated pydantic constructors vs. the trusted fast constructors, on a word register.
+
+Usage:
+    python benchmarks/register_construct.py [--n-words 10000]
+"""
+import argparse
+import time
+
+from alparc import load_phonemes, make_syllables, make_words, set_seed, Word, Register
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-words", type=int, default=10_000)
+    args = parser.parse_args()
+
+    set_seed(0)
+    syllables = make_syllables(load_phonemes(lang=None), phoneme_pattern="cV")
+    words = make_words(syllables, n_words=args.n_words, max_tries=10 * args.n_words, positional_control=False,
+                       bigram_control=False, trigram_control=False, progress_bar=False, engine="vectorized", seed=0)
+    dumps = [word.model_dump() for word in words]
+
+    print(f"{len(words)} words")
+    print(f"{'case':<28}{'validated [s]':>16}{'trusted [s]':>14}{'speed-up':>10}")
+
+    cases = {
+        "from syllable objects": (
+            lambda: Register({w.id: Word(id=w.id, syllables=w.syllables, info=w.info) for w in words}),
+            lambda: Register({w.id: Word.trusted(id=w.id, syllables=w.syllables, info=w.info) for w in words}),
+        ),
+        "from dicts (json)": (
+            lambda: Register({d["id"]: Word(**d) for d in dumps}),
+            lambda: Register({d["id"]: Word.from_trusted_dict(d) for d in dumps}),
+        ),
+    }
+    for name, (validated, trusted) in cases.items():
+        validated_words, validated_time = timed(validated)
+        trusted_words, trusted_time = timed(trusted)
+        assert [w.model_dump() for w in validated_words] == [w.model_dump() for w in trusted_words]
+        print(f"{name:<28}{validated_time:>16.3f}{trusted_time:>14.3f}{validated_time / trusted_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Round-trip (save + load) benchmark on a streams register: the former `json.dump(default=model_dump)` + validating
+load, and the codec with the stdlib json and the orjson backend (trusted loading), in schema version 1 and 2.
+
+Usage:
+    python benchmarks/register_io.py [--n-streams 60] [--stream-length 15]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from alparc import codec
+from alparc.core.stream import make_streams
+from alparc.eval import to_lexicon
+from alparc.io import load_streams
+from alparc.types.base_types import Register
+from alparc.types.stream import Stream
+
+LEXICONS = [
+    ["pi", "ɾu", "ta", "ba", "ɡo", "li", "to", "ku", "da", "ɡu", "ki", "bo"],
+    ["ka", "mo", "fi", "nu", "pe", "lo", "si", "ta", "ɡe", "bu", "ɾi", "do"],
+]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def legacy_save(register, path):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(register.get_self_with_info_key(), file,
+                  default=lambda o: o.model_dump(), sort_keys=False, ensure_ascii=False)
+
+
+def legacy_load(path):
+    with open(path, "r", encoding="utf-8") as file:
+        d = json.load(file)
+    register = Register({k: Stream(**v) for k, v in d.items() if k != "_info"})
+    register.info = d["_info"]
+    return register
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-streams", type=int, default=60)
+    parser.add_argument("--stream-length", type=int, default=15)
+    args = parser.parse_args()
+
+    lexicons = [to_lexicon([sylls[i:i + 3] for i in range(0, len(sylls), 3)]) for sylls in LEXICONS]
+    streams = make_streams(lexicons, stream_length=args.stream_length, max_rhythmicity=None)
+    streams = Register({f"{key}_{i}": stream for i in range(-(-args.n_streams // len(streams)))
+                        for key, stream in streams.items()}, _info=streams.info)
+    n_tokens = sum(len(stream.syllables) for stream in streams)
+    print(f"{len(streams)} streams, {n_tokens} syllable tokens")
+
+    cases = {"legacy json": (legacy_save, legacy_load)}
+    for schema in (1, 2):
+        for backend in codec.BACKENDS:
+            cases[f"v{schema} {backend}"] = (
+                lambda register, path, backend=backend, schema=schema:
+                    open(path, "wb").write(codec.encode_register(register, backend, schema=schema)),
+                lambda path, backend=backend: codec.decode_register(open(path, "rb").read(), Stream, trusted=True, backend=backend),
+            )
+
+    print(f"{'case':<18}{'save [s]':>10}{'load [s]':>10}{'size [MB]':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "streams.json")
+        expected = None
+        for name, (save, load) in cases.items():
+            _, save_time = timed(lambda: save(streams, path))
+            loaded, load_time = timed(lambda: load(path))
+            dumped = [stream.model_dump() for stream in loaded]
+            expected = expected or dumped
+            assert dumped == expected
+            print(f"{name:<18}{save_time:>10.3f}{load_time:>10.3f}{os.path.getsize(path) / 1e6:>11.1f}")
+
+        assert len(load_streams(path)) == len(streams)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,81 @@
-from .io import load_phonemes, load_syllables, load_words, load_lexicons, load_streams, export_speech_synthesizer
+import importlib
+from typing import TYPE_CHECKING
 
-from .controls.common import set_seed
+# Public API, resolved lazily on first attribute access (PEP 562). This keeps `import alparc` cheap for
+# short-lived processes that only need a small part of the library.
+_LAZY_ATTRIBUTES = {
+    "load_phonemes": "alparc.io",
+    "load_syllables": "alparc.io",
+    "load_words": "alparc.io",
+    "load_lexicons": "alparc.io",
+    "load_streams": "alparc.io",
+    "save_lexicons": "alparc.io",
+    "export_speech_synthesizer": "alparc.io",
 
-from .types.base_types import Register, RegisterType, Element
-from .types.phoneme import Phoneme, PhonemeType
-from .types.syllable import Syllable, SyllableType
-from .types.word import Word, WordType
-from .types.lexicon import Lexicon, LexiconType
-from .types.stream import Stream, StreamType
+    "set_seed": "alparc.controls.common",
 
-from .core.syllable import make_syllables
-from .core.word import make_words
-from .core.lexicon import make_lexicons
-from .core.stream import make_streams
+    "Register": "alparc.types.base_types",
+    "RegisterType": "alparc.types.base_types",
+    "Element": "alparc.types.base_types",
+    "Phoneme": "alparc.types.phoneme",
+    "PhonemeType": "alparc.types.phoneme",
+    "Syllable": "alparc.types.syllable",
+    "SyllableType": "alparc.types.syllable",
+    "Word": "alparc.types.word",
+    "WordType": "alparc.types.word",
+    "Lexicon": "alparc.types.lexicon",
+    "LexiconType": "alparc.types.lexicon",
+    "Stream": "alparc.types.stream",
+    "StreamType": "alparc.types.stream",
 
-from .eval import to_lexicon, to_stream, to_word
+    "Field": "alparc.types.query",
+    "Feature": "alparc.types.query",
+    "Contains": "alparc.types.query",
+    "Where": "alparc.types.query",
+
+    "make_syllables": "alparc.core.syllable",
+    "make_words": "alparc.core.word",
+    "make_lexicons": "alparc.core.lexicon",
+    "make_streams": "alparc.core.stream",
+
+    "to_lexicon": "alparc.eval",
+    "to_stream": "alparc.eval",
+    "to_word": "alparc.eval",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value  # cache, so __getattr__ is only hit once per name
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .io import load_phonemes, load_syllables, load_words, load_lexicons, load_streams, save_lexicons, \
+        export_speech_synthesizer
+
+    from .controls.common import set_seed
+
+    from .types.base_types import Register, RegisterType, Element
+    from .types.phoneme import Phoneme, PhonemeType
+    from .types.syllable import Syllable, SyllableType
+    from .types.word import Word, WordType
+    from .types.lexicon import Lexicon, LexiconType
+    from .types.stream import Stream, StreamType
+    from .types.query import Field, Feature, Contains, Where
+
+    from .core.syllable import make_syllables
+    from .core.word import make_words
+    from .core.lexicon import make_lexicons
+    from .core.stream import make_streams
+
+    from .eval import to_lexicon, to_stream, to_word
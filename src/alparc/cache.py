@@ -0,0 +1,220 @@
+"""Persistent (on-disk) and in-process caches for processed data tables and pipeline stage artifacts"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+from collections import OrderedDict
+from os import PathLike
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "ALPARC_CACHE_DIR"
+"""Environment variable to override the cache directory"""
+NO_CACHE_ENV = "ALPARC_NO_CACHE"
+"""Set this environment variable to '1' to disable all on-disk caching"""
+MEMORY_CACHE_SIZE = 32
+"""How many processed tables to keep in memory"""
+STAGE_CACHE_SIZE_ENV = "ALPARC_STAGE_CACHE_SIZE"
+"""Environment variable to override the size limit of the stage cache (in bytes)"""
+STAGE_CACHE_SIZE = 2 * 1024 ** 3
+"""Default size limit of the stage cache, least recently used stages are evicted above it"""
+STAGE_FORMAT = 1
+"""Version of the stage artifacts and of the code that generates them, part of every stage key. The library version
+is not bumped for every change, so bump this whenever a change gives different results for the same arguments."""
+
+Table = Dict[str, np.ndarray]
+
+_memory_cache: "OrderedDict[Tuple, Table]" = OrderedDict()
+_digest_cache: Dict[Tuple, str] = {}
+
+
+def get_cache_dir(*subdirs: str) -> pathlib.Path:
+    """The user cache directory of alparc, e.g. `~/.cache/alparc` on linux"""
+    if os.environ.get(CACHE_DIR_ENV):
+        base = pathlib.Path(os.environ[CACHE_DIR_ENV])
+    elif os.name == "nt":
+        base = pathlib.Path(os.environ.get("LOCALAPPDATA", pathlib.Path.home())) / "alparc" / "cache"
+    else:
+        base = pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache")) / "alparc"
+    return base.joinpath(*subdirs)
+
+
+def disk_cache_enabled() -> bool:
+    return os.environ.get(NO_CACHE_ENV, "0") not in ("1", "true", "True")
+
+
+def file_signature(path: Union[str, PathLike]) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(path: Union[str, PathLike]) -> str:
+    """sha256 of the file contents (memoized as long as the file's mtime and size don't change)"""
+    signature = file_signature(path)
+    if signature not in _digest_cache:
+        sha = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                sha.update(chunk)
+        _digest_cache[signature] = sha.hexdigest()
+    return _digest_cache[signature]
+
+
+def _read_only(table: Table) -> Table:
+    for array in table.values():
+        array.setflags(write=False)
+    return table
+
+
+def _save_table(path: pathlib.Path, table: Table):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write to a temporary file first, so concurrent processes never see a half-written table
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp.npz")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            np.savez(file, **table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def cached_table(name: str, source_path: Union[str, PathLike], version: int, build: Callable[[], Table]) -> Table:
+    """
+    Get a processed table of arrays derived from `source_path`.
+
+    The table is looked up in memory first, then in the user cache directory (keyed on the hash of the source file
+    and the processing `version`), and is only built from scratch with `build` if neither has it.
+    The returned arrays are read-only and shared between callers.
+    """
+    memory_key = (name, version, *file_signature(source_path))
+    if memory_key in _memory_cache:
+        _memory_cache.move_to_end(memory_key)
+        return _memory_cache[memory_key]
+
+    table = None
+    cache_path = get_cache_dir("tables") / f"{name}-v{version}-{file_digest(source_path)[:32]}.npz"
+
+    if disk_cache_enabled() and cache_path.exists():
+        try:
+            with np.load(cache_path, allow_pickle=False) as npz:
+                table = {key: npz[key] for key in npz.files}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache file {cache_path}: {e}")
+
+    if table is None:
+        table = build()
+        if disk_cache_enabled():
+            try:
+                _save_table(cache_path, table)
+            except OSError as e:
+                logger.warning(f"Could not write cache file {cache_path}: {e}")
+
+    _memory_cache[memory_key] = _read_only(table)
+    if len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+    return table
+
+
+def clear_memory_cache():
+    _memory_cache.clear()
+    _digest_cache.clear()
+
+
+def library_version() -> str:
+    from importlib import metadata
+
+    try:
+        return metadata.version("alparc")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def stage_key(stage: str, *parts: Any) -> str:
+    """
+    Content address of a pipeline stage: the hash of the stage name, everything its result depends on (`parts`,
+    e.g. arguments, seed, corpus file digests and the key of the previous stage), the library version and
+    STAGE_FORMAT.
+    """
+    payload = json.dumps([stage, library_version(), STAGE_FORMAT, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class StageCache:
+    """
+    On-disk cache of pipeline stage artifacts (files) and metadata, one directory per stage key, in the user cache
+    directory. Lookups mark an entry as recently used, and the least recently used entries are evicted when the
+    cache grows beyond `max_bytes`.
+    """
+
+    META = "stage.json"
+
+    def __init__(self, directory: Optional[Union[str, PathLike]] = None, max_bytes: Optional[int] = None):
+        self.directory = pathlib.Path(directory) if directory is not None else get_cache_dir("stages")
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(STAGE_CACHE_SIZE_ENV, STAGE_CACHE_SIZE))
+        self.max_bytes = max_bytes
+
+    def get(self, key: str) -> Optional[Tuple[pathlib.Path, Dict[str, Any]]]:
+        """The directory with the artifacts of stage `key` and its metadata, or None"""
+        entry = self.directory / key
+        try:
+            with open(entry / self.META, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+        os.utime(entry / self.META)
+        return entry, meta
+
+    def put(self, key: str, files: Dict[str, Union[str, PathLike]], meta: Dict[str, Any]) -> Optional[pathlib.Path]:
+        """Store copies of the artifact `files` (by name) and `meta` as stage `key`"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_dir = pathlib.Path(tempfile.mkdtemp(dir=self.directory, suffix=".tmp"))
+        try:
+            for name, path in files.items():
+                shutil.copyfile(path, tmp_dir / name)
+            # the metadata marks a complete entry, so it is written last
+            with open(tmp_dir / self.META, "w", encoding="utf-8") as file:
+                json.dump(meta, file)
+            entry = self.directory / key
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp_dir, entry)
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            logger.warning(f"Could not write stage {key} to the cache: {e}")
+            return None
+
+        self.evict(keep=key)
+        return entry
+
+    def entries(self) -> Dict[str, Tuple[float, int]]:
+        """Stage key -> (last use, size in bytes) of all complete entries"""
+        entries = {}
+        if not self.directory.exists():
+            return entries
+        for entry in self.directory.iterdir():
+            meta = entry / self.META
+            if entry.is_dir() and meta.exists():
+                size = sum(path.stat().st_size for path in entry.iterdir() if path.is_file())
+                entries[entry.name] = (meta.stat().st_mtime, size)
+        return entries
+
+    def evict(self, keep: Optional[str] = None):
+        entries = self.entries()
+        total = sum(size for _, size in entries.values())
+        for key, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                shutil.rmtree(self.directory / key, ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,13 +1,14 @@
 import collections
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 import datetime
 from functools import partial
 import itertools
 import logging.config
 import math
-from typing import List, Optional, Literal, Dict, Tuple, Union
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Literal, Dict, Tuple, Union
 import logging
 import os
+import shutil
 import tyro
 import yaml
 import json
@@ -16,7 +17,14 @@ from tqdm import tqdm
 
 from alparc.core.stream import make_streams
 from alparc.eval import to_lexicon
-from alparc.io import load_phonemes, read_phoneme_corpus, read_syllables_corpus
+from alparc.cache import StageCache, disk_cache_enabled, stage_key
+from alparc.io import load_phonemes, read_phoneme_corpus, read_syllables_corpus, save_lexicons, load_syllables, \
+    load_words, load_lexicons, corpus_digests
+from alparc.jsonl import JsonlWriter, read_jsonl, read_jsonl_unique
+from alparc import codec
+from alparc.schema import normalize_stream_records
+from alparc.store import write_stream_store_records, stream_record, unpack_stream_info
+from alparc.tables import export_stream_record_tables
 from alparc.types.base_types import Register, RegisterType
 from alparc.types.phoneme import TypePhonemeFeatureLabels
 from alparc.types.syllable import LABELS_C, LABELS_V, Syllable
@@ -32,6 +40,8 @@ from alparc.core.syllable import make_syllables
 from alparc.controls.common import *
 
 _OBJECT_DUMP = "_arpac"
+STREAMS_JSONL = "streams.jsonl"
+CHECKPOINT = "checkpoint.json"
 
 def setup_log_dir(results_base_dir: str, name="unknown"):
     results_dir = f"{name}_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
@@ -41,8 +51,9 @@ def setup_log_dir(results_base_dir: str, name="unknown"):
     return results_path
 
 
-def setup_logging(log_dir: Optional[str] = None, log_console: bool = True, name: str = "unnamed_command") -> Tuple[logging.Logger, str]:
-    log_path = setup_log_dir(log_dir, name=name)
+def setup_logging(log_dir: Optional[str] = None, log_console: bool = True, name: str = "unnamed_command",
+                  run_dir: Optional[str] = None) -> Tuple[logging.Logger, str]:
+    log_path = run_dir if run_dir is not None else setup_log_dir(log_dir, name=name)
     logging.basicConfig(filename=os.path.join(log_path, "debug.log"), 
                         encoding='utf-8', level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
@@ -51,24 +62,50 @@ def setup_logging(log_dir: Optional[str] = None, log_console: bool = True, name:
     return logger, log_path
 
 
-def write_stream_summary(streams: Register, save_path: str, logger: logging.Logger):
+def stream_summary(syllable_ids: List[str], info: Dict) -> Dict:
+    return {
+            "stream_full": "|".join(syllable_ids),
+            "lexicon": info["lexicon"],
+            "lexicon_info": info["lexicon_info"],
+            "rhythmicity_indexes": info["rhythmicity_indexes"],
+            "stream_tp_mode": info["stream_tp_mode"],
+            "n_syllables_per_word": info["n_syllables_per_word"] if "n_syllables_per_word" in info.keys() else None,
+            "n_look_back": info["n_look_back"] if "n_look_back" in info.keys() else None,
+            "phonotactic_control": info["phonotactic_control"] if "phonotactic_control" in info.keys() else None,
+            "syllables_info": info["syllables_info"] if "syllables_info" in info.keys() else None,
+    }
+
+
+class _SummaryDumper(getattr(yaml, "CDumper", yaml.Dumper)):
+    """Write repeated objects in full: anchors of separately dumped streams would collide"""
+
+    def ignore_aliases(self, data):
+        return True
+
+
+def write_stream_summary_entries(entries: Iterable[Tuple[str, List[str], Dict]], info: Dict, save_path: str,
+                                 logger: logging.Logger):
+    """
+    Write the summary of the streams `entries` (id, syllable ids, info) one stream at a time. The file loads as the
+    same object as one yaml dump of {"info": info, "streams": [...]}.
+    """
+    dumper = _SummaryDumper
     with open(os.path.join(save_path, "streams.yml"), 'w') as file:
-        results = {"streams": {}, "info": {}}
-        results["streams"] = [{
-                "stream_full": "|".join([syllable.id for syllable in stream]),
-                "lexicon": stream.info["lexicon"],
-                "lexicon_info": stream.info["lexicon_info"],
-                "rhythmicity_indexes": stream.info["rhythmicity_indexes"],
-                "stream_tp_mode": stream.info["stream_tp_mode"],
-                "n_syllables_per_word": stream.info["n_syllables_per_word"] if "n_syllables_per_word" in stream.info.keys() else None,
-                "n_look_back": stream.info["n_look_back"] if "n_look_back" in stream.info.keys() else None,
-                "phonotactic_control": stream.info["phonotactic_control"] if "phonotactic_control" in stream.info.keys() else None,
-                "syllables_info": stream.info["syllables_info"] if "syllables_info" in stream.info.keys() else None,
-        } for stream in streams]
-        for stream in streams:
-            logger.info(f"- {stream.id}")
-        results["info"] = streams.info
-        yaml.dump(results, file, encoding="utf-8")
+        yaml.dump({"info": info}, file, encoding="utf-8", Dumper=dumper)
+        file.write("streams:")
+        n_streams = 0
+        for stream_id, syllable_ids, stream_info in entries:
+            file.write("\n" if n_streams == 0 else "")
+            yaml.dump([stream_summary(syllable_ids, stream_info)], file, encoding="utf-8", Dumper=dumper)
+            logger.info(f"- {stream_id}")
+            n_streams += 1
+        if n_streams == 0:
+            file.write(" []\n")
+
+
+def write_stream_summary(streams: Register, save_path: str, logger: logging.Logger):
+    write_stream_summary_entries(((stream.id, [syllable.id for syllable in stream], stream.info) for stream in streams),
+                                 streams.info, save_path, logger)
 
 @dataclass
 class CommonArgs:
@@ -83,6 +120,11 @@ class CommonArgs:
     """Log to console"""
     progress_bars: bool = True
     """Show progress bars in console"""
+    seed: Optional[int] = None
+    """Random seed. If set, the generated dataset is reproducible"""
+    cache: bool = True
+    """Reuse the syllables, words and lexicons of earlier runs with the same settings and seed from the stage cache
+    (only with a seed). Disable with --common.no-cache"""
 
 @dataclass
 class SyllableArgs:
@@ -129,6 +171,12 @@ class WordArgs:
     """Number of phonemes to look back for phonotactic control"""
     max_tries: int = 100000
     """Maximum number of tries to generate the word register with the given constraints"""
+    engine: Literal["loop", "vectorized", "enumerate"] = "loop"
+    """Word generation engine: sample one word at a time, sample in batches, or enumerate all valid words"""
+    n_jobs: int = 1
+    """Number of worker processes for word generation (vectorized engine only, -1 = all cpus)"""
+    syllable_weighting: Literal["uniform", "frequency", "inverse_frequency"] = "uniform"
+    """Draw syllables uniformly, proportional or inversely proportional to their corpus frequency (needs syllable_control)"""
 
 @dataclass
 class LexiconArgs:
@@ -164,6 +212,8 @@ class StreamArgs:
     """Rules to use for the syllable randomization. If None, all patterns are used"""
     require_all_tp_modes: bool = True
     """If True, all tp_modes are required to return a valid stream for a given lexicon, otherwise the stream will be dropped"""
+    binary_store: bool = True
+    """Also write the streams as a memory-mapped binary stream store (readable with alparc.store.open_stream_store)"""
 
 @dataclass
 class Generate:
@@ -173,91 +223,298 @@ class Generate:
     word: WordArgs
     lexicon: LexiconArgs
     stream: StreamArgs
+    resume: Optional[str] = None
+    """Resume the interrupted run in this run directory, with its settings (all other options are ignored)"""
+
+    def settings(self) -> Dict:
+        return {name: asdict(getattr(self, name)) for name in ("common", "syllable", "word", "lexicon", "stream")}
+
+    @classmethod
+    def from_settings(cls, settings: Dict, resume: Optional[str] = None) -> "Generate":
+        return cls(common=CommonArgs(**settings["common"]), syllable=SyllableArgs(**settings["syllable"]),
+                   word=WordArgs(**settings["word"]), lexicon=LexiconArgs(**settings["lexicon"]),
+                   stream=StreamArgs(**settings["stream"]), resume=resume)
+
+
+class RunCheckpoint:
+    """
+    Progress of a generate run, kept in `_arpac/checkpoint.json`: the settings of the run and, for every completed
+    stage (and for every lexicon of the stream stage), the stage key and the global random state at its end. A
+    resumed run loads the completed stages and continues with the saved random state, so it gives the same results
+    as an uninterrupted run.
+    """
+
+    def __init__(self, directory: str, settings: Optional[Dict] = None):
+        self.path = os.path.join(directory, CHECKPOINT)
+        self.state = {"settings": settings, "stages": {}}
+
+    @classmethod
+    def load(cls, directory: str) -> "RunCheckpoint":
+        checkpoint = cls(directory)
+        if not os.path.exists(checkpoint.path):
+            raise FileNotFoundError(f"No checkpoint found in {directory}, the run can not be resumed.")
+        with open(checkpoint.path, "r", encoding="utf-8") as file:
+            checkpoint.state = json.load(file)
+        return checkpoint
+
+    @property
+    def settings(self) -> Dict:
+        return self.state["settings"]
+
+    def get(self, stage: str, key: str) -> Optional[Dict]:
+        """The saved progress of `stage`, None if it was not reached"""
+        progress = self.state["stages"].get(stage)
+        if progress is not None and progress["key"] != key:
+            raise ValueError(f"Stage '{stage}' of the run was made with other settings, corpora or alparc version, "
+                             f"it can not be resumed.")
+        return progress
+
+    def set(self, stage: str, key: str, **progress):
+        """Save the progress of `stage` together with the current random state"""
+        self.state["stages"][stage] = {"key": key, "rng_state": get_rng_state(), **progress}
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def cached_stage(name: str, key: str, cache: Optional[StageCache], directory: str, artifacts: List[str],
+                 compute: Callable[[], Any], load: Callable[[], Any], logger: logging.Logger,
+                 checkpoint: Optional[RunCheckpoint] = None) -> Any:
+    """
+    Run a pipeline stage that writes the files `artifacts` to `directory`, or, if the stage cache has the stage
+    `key`, copy its artifacts from the cache and `load` them. The global random state after the stage is cached
+    with the artifacts and restored on a hit, so the following stages do not depend on whether this one was cached.
+    With a `checkpoint`, a stage completed before the run was interrupted is loaded from `directory`.
+    """
+    if checkpoint is not None:
+        progress = checkpoint.get(name, key)
+        if progress is not None:
+            set_rng_state(progress["rng_state"])
+            logger.info(f"Stage '{name}' loaded from the resumed run.")
+            return load()
+
+    hit = cache.get(key) if cache is not None else None
+    if hit is not None:
+        entry, meta = hit
+        for artifact in artifacts:
+            shutil.copyfile(entry / artifact, os.path.join(directory, artifact))
+        set_rng_state(meta["rng_state"])
+        logger.info(f"Stage '{name}' loaded from the stage cache ({key}).")
+        result = load()
+    else:
+        result = compute()
+        if cache is not None:
+            cache.put(key, {artifact: os.path.join(directory, artifact) for artifact in artifacts},
+                      {"stage": name, "rng_state": get_rng_state()})
+
+    if checkpoint is not None:
+        checkpoint.set(name, key)
+    return result
+
 
 def generate_stream_dataset(args: Generate) -> RegisterType:
-    logger, log_dir = setup_logging(args.common.log_dir, args.common.log_console, name=args.common.name or "generate_streams")
-    
-    with open(os.path.join(log_dir, "config.yml"), "w") as file:
-        yaml.dump(vars(args), file, encoding="utf-8")
+    if args.resume is not None:
+        checkpoint = RunCheckpoint.load(os.path.join(args.resume, _OBJECT_DUMP))
+        args = Generate.from_settings(checkpoint.settings, resume=args.resume)
+        logger, log_dir = setup_logging(log_console=args.common.log_console, run_dir=args.resume)
+        logger.info(f"Resume run {log_dir}")
+    else:
+        logger, log_dir = setup_logging(args.common.log_dir, args.common.log_console, name=args.common.name or "generate_streams")
+        with open(os.path.join(log_dir, "config.yml"), "w") as file:
+            yaml.dump(vars(args), file, encoding="utf-8")
+        checkpoint = RunCheckpoint(os.path.join(log_dir, _OBJECT_DUMP), args.settings())
+        checkpoint.save()
+
+    if args.common.seed is not None:
+        set_seed(args.common.seed)
 
     phonemes = load_phonemes(lang=(args.common.lang if args.syllable.unigram_control else None))
     if args.syllable.unigram_alpha is not None:
         phonemes = phonemes.filter(lambda unigram: unigram.info["p_unif"] > args.syllable.unigram_alpha)
     logger.info(f"Generate Phonemes: {phonemes}")
 
-    syllables = make_syllables(
-        phonemes=phonemes, 
-        phoneme_pattern=args.syllable.phoneme_pattern,
-        syllable_control=args.syllable.syllable_control,
-        syllable_alpha=args.syllable.syllable_alpha,
-        lang=args.common.lang,
-        consonant_features=args.syllable.consonant_features,
-        vowel_features=args.syllable.vowel_features,
-    )
+    cache = None
+    if args.common.cache and args.common.seed is not None and disk_cache_enabled():
+        cache = StageCache()
+    elif args.common.cache and args.common.seed is None:
+        logger.info("Stage cache not used: the results of runs without a seed are not reproducible.")
+
+    object_dump = os.path.join(log_dir, _OBJECT_DUMP)
+    syllable_args = {key: value for key, value in asdict(args.syllable).items() if key != "export_ssml"}
+    syllables_key = stage_key("syllables", syllable_args, args.common.lang, args.common.seed, corpus_digests())
+    # the words of a seed do not depend on the number of workers
+    word_args = {key: value for key, value in asdict(args.word).items() if key != "n_jobs"}
+    words_key = stage_key("words", syllables_key, word_args)
+    lexicons_key = stage_key("lexicons", words_key, asdict(args.lexicon))
+
+    def compute_syllables():
+        syllables = make_syllables(
+            phonemes=phonemes, 
+            phoneme_pattern=args.syllable.phoneme_pattern,
+            syllable_control=args.syllable.syllable_control,
+            syllable_alpha=args.syllable.syllable_alpha,
+            lang=args.common.lang,
+            consonant_features=args.syllable.consonant_features,
+            vowel_features=args.syllable.vowel_features,
+        )
+        syllables.save(os.path.join(object_dump, "syllables.json"))
+        return syllables
+
+    syllables = cached_stage("syllables", syllables_key, cache, object_dump, ["syllables.json"], compute_syllables,
+                             lambda: load_syllables(os.path.join(object_dump, "syllables.json"), trusted=True), logger, checkpoint)
     logger.info(f"Generate Syllables: {syllables}")
 
-    syllables.save(os.path.join(log_dir, _OBJECT_DUMP, "syllables.json"))
-
     if args.syllable.export_ssml:
         from alparc.io import export_speech_synthesizer
         export_speech_synthesizer(syllables, syllables_dir=os.path.join(log_dir, "ssml"))
 
     logger.info(f"Generate Pseudo-Words: ...")
-    pseudo_words = make_words(
-        syllables=syllables,
-        num_syllables=args.word.n_syllables_per_word,
-        bigram_control=args.word.bigram_control,
-        bigram_alpha=args.word.bigram_alpha,
-        trigram_control=args.word.trigram_control,
-        trigram_alpha=args.word.trigram_alpha,
-        positional_control=args.word.positional_control,
-        positional_control_position=args.word.positional_control_position,
-        position_alpha=args.word.position_alpha,
-        phonotactic_control=args.word.phonotactic_control,
-        n_look_back=args.word.n_look_back,
-        n_words=args.word.n_words,
-        max_tries=args.word.max_tries,
-        progress_bar=args.common.progress_bars,
-        lang=args.common.lang,
-    )
-    logger.info(f"Pseudo-Words: {pseudo_words}")
 
-    pseudo_words.save(os.path.join(log_dir, _OBJECT_DUMP, "pseudo_words.json"))
+    def compute_words():
+        pseudo_words = make_words(
+            syllables=syllables,
+            num_syllables=args.word.n_syllables_per_word,
+            bigram_control=args.word.bigram_control,
+            bigram_alpha=args.word.bigram_alpha,
+            trigram_control=args.word.trigram_control,
+            trigram_alpha=args.word.trigram_alpha,
+            positional_control=args.word.positional_control,
+            positional_control_position=args.word.positional_control_position,
+            position_alpha=args.word.position_alpha,
+            phonotactic_control=args.word.phonotactic_control,
+            n_look_back=args.word.n_look_back,
+            n_words=args.word.n_words,
+            max_tries=args.word.max_tries,
+            progress_bar=args.common.progress_bars,
+            lang=args.common.lang,
+            engine=args.word.engine,
+            seed=args.common.seed,
+            n_jobs=args.word.n_jobs,
+            syllable_weighting=args.word.syllable_weighting,
+        )
+        pseudo_words.save(os.path.join(object_dump, "pseudo_words.json"))
+        return pseudo_words
+
+    pseudo_words = cached_stage("words", words_key, cache, object_dump, ["pseudo_words.json"], compute_words,
+                                lambda: load_words(os.path.join(object_dump, "pseudo_words.json"), trusted=True), logger, checkpoint)
+    logger.info(f"Pseudo-Words: {pseudo_words}")
 
     logger.info(f"Generate Lexicons: ...")
-    lexicons = make_lexicons(
-        pseudo_words, 
-        n_lexicons=args.lexicon.n_lexicons, 
-        n_words=args.lexicon.n_words_per_lexicon,
-        max_overlap=args.lexicon.max_overlap,
-        lag_of_interest=args.lexicon.lag_of_interest,
-        max_word_matrix=args.lexicon.max_word_matrix,
-        unique_words=args.lexicon.unique_words,
-        control_features=args.lexicon.control_features,
-        progress_bar=args.common.progress_bars,
-        binary_feature_control=args.lexicon.binary_feature_control,
-    )
+
+    def compute_lexicons():
+        lexicons = make_lexicons(
+            pseudo_words, 
+            n_lexicons=args.lexicon.n_lexicons, 
+            n_words=args.lexicon.n_words_per_lexicon,
+            max_overlap=args.lexicon.max_overlap,
+            lag_of_interest=args.lexicon.lag_of_interest,
+            max_word_matrix=args.lexicon.max_word_matrix,
+            unique_words=args.lexicon.unique_words,
+            control_features=args.lexicon.control_features,
+            progress_bar=args.common.progress_bars,
+            binary_feature_control=args.lexicon.binary_feature_control,
+        )
+        save_lexicons(lexicons, os.path.join(object_dump, "lexicons.json"))
+        return lexicons
+
+    lexicons = cached_stage("lexicons", lexicons_key, cache, object_dump, ["lexicons.json"], compute_lexicons,
+                            lambda: load_lexicons(os.path.join(object_dump, "lexicons.json"), trusted=True), logger, checkpoint)
     logger.info(f"Lexicons: {[str(l) for l in lexicons]}")
 
     for i, lexicon in enumerate(lexicons):
-        lexicon.save(os.path.join(log_dir, _OBJECT_DUMP, f"lexicon_{i}.json"))
+        lexicon.save(os.path.join(object_dump, f"lexicon_{i}.json"))
 
     logger.info(f"Generate Streams: ...")
-    streams = Register()
-    for _ in tqdm(range(args.stream.n_streams_per_lexicon)):
-        for stream in make_streams(
-            lexicons,
-            max_rhythmicity=args.stream.max_rhythmicity,
-            stream_length=args.stream.repetitions,
-            max_tries_randomize=args.stream.max_tries_randomize,
-            tp_modes=args.stream.tp_modes,
-            require_all_tp_modes=args.stream.require_all_tp_modes
-        ):
-            streams.append(stream)
-    
+    streams_path = generate_streams(lexicons, args.stream, log_dir, checkpoint)
+
     logger.info(f"Streams: ")
-    streams.save(os.path.join(log_dir, _OBJECT_DUMP, f"streams.json"))
-    write_stream_summary(streams, save_path=log_dir, logger=logger)
+    write_streams(streams_path, lexicons, args.stream, log_dir, logger)
+
+
+def streams_from_jsonl(path: str, lexicons: List[LexiconType]) -> RegisterType:
+    """The streams register of the records written by `generate_streams`, sharing the syllables of the lexicons"""
+    syllables = {syllable.id: syllable for lexicon in lexicons for word in lexicon for syllable in word}
+    streams = Register()
+    for record in read_jsonl(path):
+        info = unpack_stream_info(record["info"], lexicons[record["info"]["lexicon_info"]].info)
+        streams[record["key"]] = Stream.trusted(record["id"], [syllables[i] for i in record["syllables"]], info)
+    return streams
+
+
+def stream_entries(path: str, lexicons: List[LexiconType]) -> Iterator[Tuple[str, List[str], Dict]]:
+    """The id, syllable ids and (unpacked) info of the streams in a file written by `generate_streams`, one by one"""
+    for record in read_jsonl_unique(path):
+        yield record["id"], record["syllables"], \
+            unpack_stream_info(record["info"], lexicons[record["info"]["lexicon_info"]].info)
+
+
+def generate_streams(lexicons: List[LexiconType], args: StreamArgs, log_dir: str,
+                     checkpoint: Optional[RunCheckpoint] = None) -> str:
+    """
+    Generate `args.n_streams_per_lexicon` rounds of streams. Every stream is appended to `streams.jsonl` as soon as
+    it is accepted (by a background writer) and not kept in memory, the file is synced after every round, and its
+    path is returned (see `streams_from_jsonl` and `write_streams`). With a `checkpoint`, the file is synced and the progress saved after every lexicon, and
+    an interrupted run continues after the last saved lexicon (records written after it are dropped).
+    """
+    path = os.path.join(log_dir, _OBJECT_DUMP, STREAMS_JSONL)
+    lexicon_positions = {str(lexicon): i for i, lexicon in enumerate(lexicons)}
+    key = stage_key("streams", list(lexicon_positions), asdict(args))
+
+    start_round, start_lexicon = 0, 0
+    if checkpoint is not None:
+        progress = checkpoint.get("streams", key)
+        if progress is not None:
+            set_rng_state(progress["rng_state"])
+            start_round, start_lexicon = progress["round"], progress["lexicon"]
+        if os.path.exists(path):
+            with open(path, "r+b") as file:
+                file.truncate(progress["jsonl_size"] if progress is not None else 0)
+
+    with JsonlWriter(path) as writer:
+        def lexicon_done(i: int):
+            writer.flush()
+            next_round, next_lexicon = (round_ + 1, 0) if i + 1 == len(lexicons) else (round_, i + 1)
+            checkpoint.set("streams", key, round=next_round, lexicon=next_lexicon, jsonl_size=os.path.getsize(path))
+
+        for round_ in tqdm(range(start_round, args.n_streams_per_lexicon), initial=start_round,
+                           total=args.n_streams_per_lexicon):
+            make_streams(
+                lexicons,
+                max_rhythmicity=args.max_rhythmicity,
+                stream_length=args.repetitions,
+                max_tries_randomize=args.max_tries_randomize,
+                tp_modes=args.tp_modes,
+                require_all_tp_modes=args.require_all_tp_modes,
+                on_stream=lambda _, stream: writer.write(stream_record(str(stream), stream, lexicon_positions)),
+                start_lexicon=start_lexicon if round_ == start_round else 0,
+                on_lexicon=lexicon_done if checkpoint is not None else None,
+                collect=False,
+            )
+            writer.flush()
+
+    return path
+
+
+def write_streams(path: str, lexicons: List[LexiconType], args: StreamArgs, log_dir: str, logger: logging.Logger):
+    """
+    Write streams.json (schema version 2), the binary store, the summary and the tables of the streams in the file
+    `path` written by `generate_streams`. Every output is written while reading the file one record at a time, so
+    the streams are never all in memory. Like in `streams_from_jsonl`, a later record replaces an earlier one with the
+    same key.
+    """
+    object_dump = os.path.join(log_dir, _OBJECT_DUMP)
+    with open(os.path.join(object_dump, "streams.json"), "wb") as file:
+        codec.write_document(file, *normalize_stream_records(read_jsonl_unique(path), lexicons))
+    if args.binary_store:
+        write_stream_store_records(read_jsonl_unique(path), lexicons, os.path.join(object_dump, "streams_store"))
+    write_stream_summary_entries(stream_entries(path, lexicons), {}, save_path=log_dir, logger=logger)
+    export_stream_record_tables(lambda: read_jsonl_unique(path), lexicons, log_dir)
 
 
 def write_lexicon_summary(lexicon: Register, save_path: str, logger: logging.Logger):
@@ -308,21 +565,10 @@ def evaluate_lexicons(args: Diagnose):
 
     if args.generate_streams:
         logger.info(f"Generate Streams: ...")
-        streams = Register()
-        for _ in tqdm(range(args.stream.n_streams_per_lexicon)):
-            for stream in make_streams(
-                lexicons,
-                max_rhythmicity=args.stream.max_rhythmicity,
-                stream_length=args.stream.repetitions,
-                max_tries_randomize=args.stream.max_tries_randomize,
-                tp_modes=args.stream.tp_modes,
-                require_all_tp_modes=args.stream.require_all_tp_modes
-            ):
-                streams.append(stream)
-        
+        streams_path = generate_streams(lexicons, args.stream, log_dir)
+
         logger.info(f"Streams: ")
-        streams.save(os.path.join(log_dir, _OBJECT_DUMP, f"streams.json"))
-        write_stream_summary(streams, save_path=log_dir, logger=logger)
+        write_streams(streams_path, lexicons, args.stream, log_dir, logger)
 
     if args.split_registers:
         for lexicon in lexicons:
@@ -0,0 +1,218 @@
+"""JSON encoding of registers and elements, with orjson as the (much faster) backend when it is installed"""
+from abc import ABC, abstractmethod
+import gc
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from alparc.schema import SCHEMA_VERSION, INFO_KEY, schema_version, normalize_register, normalize_lexicons, \
+    denormalize_register
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_BACKEND_ENV = "ALPARC_JSON_BACKEND"
+"""Environment variable to choose the json backend ('json' or 'orjson'), e.g. to compare them"""
+
+
+def _default(obj):
+    """Serialize what the json backends don't know natively"""
+    if isinstance(obj, BaseModel):
+        return element_to_dict(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonBackend(ABC):
+    name: str
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        pass
+
+
+class StdlibJsonBackend(JsonBackend):
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=_default, sort_keys=False, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonBackend(JsonBackend):
+    name = "orjson"
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+BACKENDS: Dict[str, JsonBackend] = {"json": StdlibJsonBackend()}
+if orjson is not None:
+    BACKENDS["orjson"] = OrjsonBackend()
+
+_backend: Optional[JsonBackend] = None
+
+
+def get_json_backend(name: Optional[str] = None) -> JsonBackend:
+    """
+    The backend `name`, or the default one: set with `set_json_backend`, the environment variable
+    JSON_BACKEND_ENV, or orjson if installed.
+    """
+    if name is None:
+        if _backend is not None:
+            return _backend
+        name = os.environ.get(JSON_BACKEND_ENV) or ("orjson" if "orjson" in BACKENDS else "json")
+
+    if name not in BACKENDS:
+        hint = " (is orjson installed?)" if name == "orjson" else ""
+        raise ValueError(f"JSON backend '{name}' not available{hint}, choose from {list(BACKENDS)}.")
+    return BACKENDS[name]
+
+
+def set_json_backend(name: Optional[str]) -> None:
+    """Use the backend `name` from now on (None: back to the default)"""
+    global _backend
+    _backend = None if name is None else get_json_backend(name)
+
+
+def element_to_dict(element: BaseModel, memo: Optional[Dict[int, dict]] = None) -> dict:
+    """
+    Like `element.model_dump()`, but without copying `info` dicts, and with `memo`, nested elements that occur
+    many times (the phonemes of syllables, the syllables of words, ...) are converted only once.
+    """
+    if memo is not None:
+        converted = memo.get(id(element))
+        if converted is not None:
+            return converted
+
+    converted = {}
+    for name, value in element.__dict__.items():
+        if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+            value = [element_to_dict(sub_element, memo) for sub_element in value]
+        elif isinstance(value, BaseModel):
+            value = element_to_dict(value, memo)
+        converted[name] = value
+
+    if memo is not None:
+        memo[id(element)] = converted
+    return converted
+
+
+def to_serializable(value: Any, memo: Optional[Dict[int, dict]] = None) -> Any:
+    """
+    Elements as dicts (see `element_to_dict`), registers and other mappings (e.g. the lexicons of a register of
+    lexicons) as dicts of their converted items, anything else as is
+    """
+    if isinstance(value, BaseModel):
+        return element_to_dict(value, memo)
+    if isinstance(value, dict):
+        return {key: to_serializable(item, memo) for key, item in dict.items(value)}
+    return value
+
+
+def register_to_dict(register) -> dict:
+    """The json object of a register: its elements by key, followed by its info"""
+    memo = {}
+    converted = {key: to_serializable(element, memo) for key, element in dict.items(register)}
+    converted[INFO_KEY] = register.info
+    return converted
+
+
+def encode_register(register, backend: Optional[str] = None, schema: int = 1) -> bytes:
+    """The register as json, in schema version 1 (plain) or 2 (normalized, see `alparc.schema`)"""
+    if schema not in (1, SCHEMA_VERSION):
+        raise ValueError(f"Unknown schema version {schema}.")
+    return get_json_backend(backend).dumps(register_to_dict(register) if schema == 1 else normalize_register(register))
+
+
+def encode_lexicons(lexicons, backend: Optional[str] = None) -> bytes:
+    """A list of lexicons as json (schema version 2)"""
+    return get_json_backend(backend).dumps(normalize_lexicons(lexicons))
+
+
+def encode_element(element: BaseModel, backend: Optional[str] = None) -> bytes:
+    return get_json_backend(backend).dumps(element_to_dict(element, {}))
+
+
+def write_document(file: BinaryIO, document: dict, elements: Iterable[Tuple[str, Any]],
+                   backend: Optional[str] = None) -> None:
+    """
+    Write a json object to `file` with its "elements" (a placeholder in `document`) taken from the (key, element)
+    pairs of `elements` and encoded one at a time, so that they never have to be in memory all at once
+    """
+    json_backend = get_json_backend(backend)
+    file.write(b"{")
+    for i, (name, value) in enumerate(document.items()):
+        file.write((b"," if i else b"") + json_backend.dumps(name) + b":")
+        if name != "elements":
+            file.write(json_backend.dumps(value))
+            continue
+
+        file.write(b"{")
+        for j, (key, element) in enumerate(elements):
+            file.write((b"," if j else b"") + json_backend.dumps(key) + b":" + json_backend.dumps(element))
+        file.write(b"}")
+    file.write(b"}")
+
+
+@contextmanager
+def gc_paused():
+    """
+    Pause the cyclic garbage collector: decoding creates millions of small containers and no cycles, which would
+    otherwise trigger (and slow down) many useless collections.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def register_from_dict(d: dict, arc_type, trusted: bool = False):
+    """
+    The register of a decoded json object (any schema version) with elements of `arc_type`. With `trusted`, the
+    elements are constructed with the trusted constructors, without validation (only for data written by alparc).
+    """
+    from alparc.types.base_types import Register
+
+    if schema_version(d) == SCHEMA_VERSION:
+        return denormalize_register(d, arc_type, trusted=trusted)
+
+    info = d.pop(INFO_KEY, {})
+    if trusted:
+        memo = {}
+        register = Register({key: arc_type.from_trusted_dict(value, memo) for key, value in d.items()})
+    else:
+        register = Register({key: arc_type(**value) for key, value in d.items()})
+    register.info = info
+    return register
+
+
+def decode(data: bytes, backend: Optional[str] = None) -> Any:
+    with gc_paused():
+        return get_json_backend(backend).loads(data)
+
+
+def decode_register(data: bytes, arc_type, trusted: bool = False, backend: Optional[str] = None):
+    with gc_paused():
+        return register_from_dict(get_json_backend(backend).loads(data), arc_type, trusted=trusted)
@@ -9,3 +9,30 @@ def get_oscillation_patterns(lag):
 def set_seed(seed: int):
     random.seed(seed)
     np.random.seed(seed)
+
+
+def get_rng_state() -> dict:
+    """The state of the global random generators seeded by `set_seed`, as json-serializable lists"""
+    version, internal_state, gauss_next = random.getstate()
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    return {
+        "random": [version, list(internal_state), gauss_next],
+        "numpy": [name, keys.tolist(), pos, has_gauss, cached_gaussian],
+    }
+
+
+def set_rng_state(state: dict):
+    """Restore the global random generators from `get_rng_state`"""
+    version, internal_state, gauss_next = state["random"]
+    random.setstate((version, tuple(internal_state), gauss_next))
+    name, keys, pos, has_gauss, cached_gaussian = state["numpy"]
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    """Number of set bits of every element of an unsigned integer array"""
+    x = np.asarray(x)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    as_bytes = np.ascontiguousarray(x).view(np.uint8).reshape(*x.shape, x.itemsize)
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1, dtype=np.uint8)
@@ -0,0 +1,66 @@
+"""Integer encoding of phonemes, shared by the vectorized word controls"""
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from alparc.types.base_types import RegisterType
+
+PAD = -1
+"""Code for positions without a phoneme (words with fewer phonemes than the longest word in the batch)"""
+
+
+class PhonemeEncoder:
+    """Maps phoneme ids to consecutive integers (and back)"""
+
+    def __init__(self, phoneme_ids: Iterable[str]):
+        self.ids: List[str] = list(dict.fromkeys(phoneme_ids))
+        self.index: Dict[str, int] = {phoneme_id: i for i, phoneme_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, phoneme_id: str):
+        return phoneme_id in self.index
+
+    @classmethod
+    def from_words(cls, words: RegisterType) -> "PhonemeEncoder":
+        return cls(phoneme.id for word in words for syllable in word for phoneme in syllable)
+
+    @classmethod
+    def from_syllables(cls, syllables: RegisterType) -> "PhonemeEncoder":
+        return cls(phoneme.id for syllable in syllables for phoneme in syllable)
+
+    def encode(self, phoneme_ids: Iterable[str]) -> np.ndarray:
+        return np.array([self.index[phoneme_id] for phoneme_id in phoneme_ids], dtype=np.int64)
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        return [self.ids[code] for code in codes if code != PAD]
+
+    def encode_rows(self, rows: Iterable[Iterable[str]]) -> np.ndarray:
+        """Encode sequences of phoneme ids as an (n_rows x max_length) int array, padded with PAD"""
+        rows = [[self.index[phoneme_id] for phoneme_id in row] for row in rows]
+        n_phonemes = max(map(len, rows), default=0)
+        encoded = np.full((len(rows), n_phonemes), PAD, dtype=np.int64)
+        for i, row in enumerate(rows):
+            encoded[i, :len(row)] = row
+        return encoded
+
+    def encode_words(self, words: RegisterType) -> np.ndarray:
+        """Encode a register of words as an (n_words x n_phonemes) int array, padded with PAD"""
+        return self.encode_rows((phoneme.id for syllable in word for phoneme in syllable) for word in words)
+
+    def encode_syllables(self, syllables: RegisterType) -> np.ndarray:
+        """Encode a register of syllables as an (n_syllables x n_phonemes) int array, padded with PAD"""
+        return self.encode_rows((phoneme.id for phoneme in syllable) for syllable in syllables)
+
+
+def words_from_syllables(syllable_phonemes: np.ndarray, syllable_indexes: np.ndarray) -> np.ndarray:
+    """
+    Encoded words (n_words x n_phonemes) from encoded syllables (n_syllables x max_phonemes) and the words'
+    syllable indexes (n_words x n_syllables_per_word). Padding is moved to the end of each word.
+    """
+    word_phonemes = syllable_phonemes[syllable_indexes].reshape(len(syllable_indexes), -1)
+    if (word_phonemes == PAD).any():
+        order = np.argsort(word_phonemes == PAD, axis=1, kind="stable")
+        word_phonemes = np.take_along_axis(word_phonemes, order, axis=1)
+    return word_phonemes
@@ -3,24 +3,28 @@ import logging
 import os.path
 from copy import copy
 from os import PathLike
-from typing import Iterable, Dict, Union, Optional
+from typing import Iterable, Dict, List, Union, Optional
 
 import numpy as np
-from scipy import stats
 
 from alparc.types.base_types import Register, RegisterType
 from alparc.types.phoneme import Phoneme
+from alparc.types.query import Predicate
 from alparc.types.syllable import Syllable
 from alparc.types.word import Word
 
-from alparc.io import read_phoneme_corpus, read_bigrams, read_trigrams, IPA_SEG_DEFAULT_PATH, IPA_BIGRAMS_DEFAULT_PATH, \
-    IPA_TRIGRAMS_DEFAULT_PATH
+from alparc.io import read_phoneme_corpus, read_bigrams_table, read_trigrams_table, IPA_SEG_DEFAULT_PATH, \
+    IPA_BIGRAMS_DEFAULT_PATH, IPA_TRIGRAMS_DEFAULT_PATH
+from alparc.controls.encoding import PhonemeEncoder, PAD
+from alparc.controls.ngrams import NgramFilter
 
 
 logger = logging.getLogger(__name__)
 
 
 def filter_uniform_syllables(syllables: Register[str, Syllable], alpha: float = 0.05):
+    from scipy import stats
+
     logger.info("Filter uniformly distributed syllables.")
     freqs = [s.info["freq"] for s in syllables]
     p_vals_uniform = stats.uniform.sf(abs(stats.zscore(np.log(freqs))))
@@ -40,6 +44,11 @@ def filter_common_phoneme_syllables(syllables, lang="deu"):
     }, _info=copy(syllables.info))
 
 
+def select_words(words: RegisterType, mask: np.ndarray) -> RegisterType:
+    """New Register with the words where `mask` is True (in order), keeping a copy of the register info"""
+    return words.new_from_dict({key: word for (key, word), keep in zip(words.items(), mask) if keep})
+
+
 def phoneme_is_common_at(phoneme: Phoneme, position: int = 0, p_threshold: float = 0.05):
     assert "word_position_prob" in phoneme.info.keys(), (
         "To check for phoneme position probability, your phonemes need the 'word_position_prob' info key. " 
@@ -58,14 +67,63 @@ def filter_common_phonemes_at_position(word: Word, position, p_threshold: float
     return phoneme_is_common_at(phonemes[position], position, p_threshold=p_threshold)
 
 
+def word_phonemes_of(words: RegisterType) -> Iterable[Phoneme]:
+    return (phoneme for word in words for syllable in word for phoneme in syllable)
+
+
+def position_prob_matrix(phonemes: Iterable[Phoneme], encoder: PhonemeEncoder, n_positions: int) -> np.ndarray:
+    """(phoneme x position) matrix of the phonemes' 'word_position_prob', rows ordered like the encoder"""
+    probs = np.zeros((len(encoder), n_positions), dtype=np.float64)
+    seen = set()
+    for phoneme in phonemes:
+        if phoneme.id in seen:
+            continue
+        seen.add(phoneme.id)
+        assert "word_position_prob" in phoneme.info.keys(), (
+            "To check for phoneme position probability, your phonemes need the 'word_position_prob' info key. "
+            "Before creating syllables and words from your phonemes run "
+            "`phonemes = phonemes.intersection(read_phoneme_corpus())`."
+        )
+        for position, prob in phoneme.info["word_position_prob"].items():
+            # positions may be str after a json round trip
+            if int(position) < n_positions:
+                probs[encoder.index[phoneme.id], int(position)] = prob
+    return probs
+
+
+def common_phonemes_mask(word_phonemes: np.ndarray, probs: np.ndarray, position: Optional[int] = None,
+                         p_threshold: float = 0.05) -> np.ndarray:
+    """Mask of encoded words with phoneme probability >= p_threshold at `position` (or all positions if None)"""
+    n_words, n_positions = word_phonemes.shape
+    if position is not None and not 0 <= position < n_positions:
+        raise ValueError(f"Position {position} is out of range, the words have {n_positions} phoneme positions.")
+    padding = (word_phonemes == PAD)
+
+    if position is None:
+        common = probs[word_phonemes, np.arange(n_positions)] >= p_threshold
+        return (common | padding).all(axis=1)
+
+    return (probs[word_phonemes[:, position], position] >= p_threshold) | padding[:, position]
+
+
+def positional_mask(words: RegisterType,
+                    position: Optional[int] = None,
+                    p_threshold: float = 0.05,
+                    encoder: Optional[PhonemeEncoder] = None,
+                    word_phonemes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Mask of words with common phonemes (probability >= p_threshold) at `position`, or at all positions if None"""
+    encoder = encoder or PhonemeEncoder.from_words(words)
+    word_phonemes = encoder.encode_words(words) if word_phonemes is None else word_phonemes
+
+    probs = position_prob_matrix(word_phonemes_of(words), encoder, word_phonemes.shape[1])
+    return common_phonemes_mask(word_phonemes, probs, position=position, p_threshold=p_threshold)
+
+
 def filter_common_phoneme_words(words: RegisterType, position: Optional[int] = None, p_threshold: float = 0.05, 
                                 ipa_seg_path: Union[str, PathLike] = IPA_SEG_DEFAULT_PATH):
     logger.info("Exclude words with low (onset) syllable probability.")
 
-    if position is None:
-        return words.filter(filter_common_phonemes_at_all_positions, p_threshold=p_threshold)
-    else:
-        return words.filter(filter_common_phonemes_at_position, position=position, p_threshold=p_threshold)
+    return select_words(words, positional_mask(words, position=position, p_threshold=p_threshold))
 
 
 def check_bigram_stats(word: Word, valid_bigrams: Register[str, Syllable]):
@@ -88,24 +146,47 @@ def check_trigram_stats(word: Word, valid_trigrams: Register[str, Syllable]):
     return True
 
 
+def valid_ngrams(table: Dict[str, np.ndarray], p_val: Optional[float] = None) -> List[str]:
+    return (table["ids"] if p_val is None else table["ids"][table["p_unif"] > p_val]).tolist()
+
+
+def bigram_mask(words: RegisterType,
+                bigrams_path: Optional[Union[str, PathLike]] = IPA_BIGRAMS_DEFAULT_PATH,
+                p_val: float = None,
+                encoder: Optional[PhonemeEncoder] = None,
+                word_phonemes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Mask of words where all phoneme bigrams are (uniformly distributed, if p_val is given) corpus bigrams"""
+    assert os.path.exists(bigrams_path), "Bigram control requires valid path to bigrams file"
+
+    encoder = encoder or PhonemeEncoder.from_words(words)
+    word_phonemes = encoder.encode_words(words) if word_phonemes is None else word_phonemes
+
+    return NgramFilter(valid_ngrams(read_bigrams_table(bigrams_path), p_val), 2, encoder).admissible(word_phonemes)
+
+
+def trigram_mask(words: RegisterType,
+                 trigrams_path: Optional[Union[str, PathLike]] = IPA_TRIGRAMS_DEFAULT_PATH,
+                 p_val: float = None,
+                 encoder: Optional[PhonemeEncoder] = None,
+                 word_phonemes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Mask of words where all phoneme trigrams are (uniformly distributed, if p_val is given) corpus trigrams"""
+    assert os.path.exists(trigrams_path), "Trigram control requires valid path to trigrams file"
+
+    encoder = encoder or PhonemeEncoder.from_words(words)
+    word_phonemes = encoder.encode_words(words) if word_phonemes is None else word_phonemes
+
+    return NgramFilter(valid_ngrams(read_trigrams_table(trigrams_path), p_val), 3, encoder).admissible(word_phonemes)
+
+
 def filter_bigrams(words: RegisterType,
                    bigrams_path: Optional[Union[str, PathLike]] = IPA_BIGRAMS_DEFAULT_PATH,
                    p_val: float = None) -> Register[str, Word]:
     logger.info("Select words with uniform bigram and non-zero trigram log-probability of occurrence in the corpus.")
 
-    words = copy(words)  # ?
+    words = select_words(words, bigram_mask(words, bigrams_path=bigrams_path, p_val=p_val))
 
     words.info.update({"bigram_pval": p_val})
 
-    assert os.path.exists(bigrams_path), "Bigram control requires valid path to bigrams file"
-
-    bigrams = read_bigrams(bigrams_path)
-
-    if p_val is not None:
-        bigrams = bigrams.filter(lambda bigram: bigram.info["p_unif"] > p_val)
-
-    words.filter(check_bigram_stats, valid_bigrams=bigrams)
-
     return words
 
 
@@ -114,16 +195,113 @@ def filter_trigrams(words: RegisterType,
                     p_val: float = None) -> Register[str, Word]:
     logger.info("Select words with uniform bigram and non-zero trigram log-probability of occurrence in the corpus.")
 
-    words = copy(words)  # ?
+    words = select_words(words, trigram_mask(words, trigrams_path=trigrams_path, p_val=p_val))
 
     words.info.update({"trigram_pval": p_val})
 
-    assert os.path.exists(trigrams_path), "Trigram control requires valid path to trigrams file"
-    trigrams = read_trigrams(trigrams_path)
+    return words
+
+
+def word_controls_info(bigram_control: bool = True,
+                       bigram_alpha: Optional[float] = None,
+                       trigram_control: bool = True,
+                       trigram_alpha: Optional[float] = None,
+                       **_) -> Dict:
+    """The register info that the word controls record"""
+    info = {}
+    if bigram_control:
+        info["bigram_pval"] = bigram_alpha
+    if trigram_control:
+        info["trigram_pval"] = trigram_alpha
+    return info
+
+
+class WordControls:
+    """
+    Bigram, trigram and positional control compiled once for a phoneme encoding, to be applied to any number of
+    batches of encoded words (n_words x n_phonemes).
+    """
+
+    def __init__(self,
+                 encoder: PhonemeEncoder,
+                 phonemes: Iterable[Phoneme],
+                 n_positions: int,
+                 bigram_control: bool = True,
+                 bigram_alpha: Optional[float] = None,
+                 trigram_control: bool = True,
+                 trigram_alpha: Optional[float] = None,
+                 positional_control: bool = True,
+                 positional_control_position: Optional[int] = None,
+                 position_alpha: float = 0):
+        self.info = word_controls_info(bigram_control, bigram_alpha, trigram_control, trigram_alpha)
+        self.bigrams, self.trigrams, self.position_probs = None, None, None
+        self.position = positional_control_position
+        self.position_alpha = position_alpha
+
+        if bigram_control:
+            self.bigrams = NgramFilter(valid_ngrams(read_bigrams_table(), bigram_alpha), 2, encoder)
+
+        if trigram_control:
+            self.trigrams = NgramFilter(valid_ngrams(read_trigrams_table(), trigram_alpha), 3, encoder)
+
+        if positional_control:
+            self.position_probs = position_prob_matrix(phonemes, encoder, n_positions)
+
+    def mask(self, word_phonemes: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(word_phonemes), dtype=bool)
+
+        if self.bigrams is not None:
+            mask &= self.bigrams.admissible(word_phonemes)
+
+        if self.trigrams is not None:
+            mask[mask] &= self.trigrams.admissible(word_phonemes[mask])
+
+        if self.position_probs is not None:
+            mask[mask] &= common_phonemes_mask(word_phonemes[mask], self.position_probs,
+                                               position=self.position, p_threshold=self.position_alpha)
+
+        return mask
+
+
+class WordControlsQuery(Predicate):
+    """
+    The words that pass bigram, trigram and positional control (keyword arguments of `WordControls`), as a query
+    predicate, so the controls can be fused with other steps of a register view. The controls are compiled for
+    the phonemes of the queried words.
+    """
+
+    def __init__(self, **controls):
+        self.controls = controls
+        self.info = word_controls_info(**controls)
+
+    def mask(self, register):
+        encoder = PhonemeEncoder.from_words(register)
+        word_phonemes = encoder.encode_words(register)
+        controls = WordControls(encoder, word_phonemes_of(register), word_phonemes.shape[1], **self.controls)
+        return controls.mask(word_phonemes)
+
+
+def filter_words(words: RegisterType,
+                 bigram_control: bool = True,
+                 bigram_alpha: Optional[float] = None,
+                 trigram_control: bool = True,
+                 trigram_alpha: Optional[float] = None,
+                 positional_control: bool = True,
+                 positional_control_position: Optional[int] = None,
+                 position_alpha: float = 0) -> Register[str, Word]:
+    """
+    Apply bigram, trigram and positional control in one pass over a shared phoneme encoding of the words. `words`
+    can be a register or a register view, the controls are evaluated as one query together with its other steps.
+    """
+    logger.info("bigram, trigram and positional control...")
+    controls = WordControlsQuery(
+        bigram_control=bigram_control, bigram_alpha=bigram_alpha,
+        trigram_control=trigram_control, trigram_alpha=trigram_alpha,
+        positional_control=positional_control, positional_control_position=positional_control_position,
+        position_alpha=position_alpha,
+    )
 
-    if p_val is not None:
-        trigrams = trigrams.filter(lambda trigram: trigram.info["p_unif"] > p_val)
-        
-    words.filter(check_trigram_stats, valid_trigrams=trigrams)
+    words = words.view().query(controls).materialize()
+    words.info.update(controls.info)
 
     return words
@@ -0,0 +1,64 @@
+"""Vectorized n-gram control on integer-encoded words"""
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+from alparc.controls.encoding import PhonemeEncoder, PAD
+
+
+def segmentations(ngram: str, n: int, encoder: PhonemeEncoder) -> Iterator[Tuple[int, ...]]:
+    """All ways to write `ngram` as a concatenation of `n` phonemes known to the encoder (as phoneme codes)"""
+    if n == 1:
+        if ngram in encoder:
+            yield (encoder.index[ngram],)
+        return
+
+    for end in range(1, len(ngram) - n + 2):
+        head = ngram[:end]
+        if head in encoder:
+            for tail in segmentations(ngram[end:], n - 1, encoder):
+                yield (encoder.index[head],) + tail
+
+
+class NgramFilter:
+    """
+    Admissible n-grams as sorted integer codes over the phoneme codes of an encoder.
+
+    An n-gram of phoneme codes (p_1, ..., p_n) has the code sum(p_i * P^(n - i)), with P the size of the encoder's
+    vocabulary. A whole batch of encoded words is checked with one windowed sum and one sorted lookup.
+    """
+
+    def __init__(self, ngram_ids: Iterable[str], n: int, encoder: PhonemeEncoder):
+        self.n = n
+        self.encoder = encoder
+        self.base = max(len(encoder), 1)
+
+        codes = {self.code(segmentation) for ngram in ngram_ids for segmentation in segmentations(ngram, n, encoder)}
+        self.admissible_codes = np.array(sorted(codes), dtype=np.int64)
+
+    def code(self, phoneme_codes: Tuple[int, ...]) -> int:
+        code = 0
+        for phoneme_code in phoneme_codes:
+            code = code * self.base + phoneme_code
+        return code
+
+    def window_codes(self, word_phonemes: np.ndarray) -> np.ndarray:
+        """(n_words x n_windows) codes of all n-grams in an (n_words x n_phonemes) array of phoneme codes"""
+        n_windows = max(word_phonemes.shape[1] - self.n + 1, 0)
+        codes = np.zeros((word_phonemes.shape[0], n_windows), dtype=np.int64)
+        for k in range(self.n):
+            codes = codes * self.base + word_phonemes[:, k:k + n_windows]
+        return codes
+
+    def admissible_windows(self, word_phonemes: np.ndarray) -> np.ndarray:
+        """(n_words x n_windows) mask of admissible n-grams. Windows overlapping padding count as admissible."""
+        n_windows = max(word_phonemes.shape[1] - self.n + 1, 0)
+        padded = np.zeros((word_phonemes.shape[0], n_windows), dtype=bool)
+        for k in range(self.n):
+            padded |= (word_phonemes[:, k:k + n_windows] == PAD)
+
+        return padded | np.isin(self.window_codes(word_phonemes), self.admissible_codes, assume_unique=False)
+
+    def admissible(self, word_phonemes: np.ndarray) -> np.ndarray:
+        """(n_words,) mask of words whose n-grams are all admissible"""
+        return self.admissible_windows(word_phonemes).all(axis=1)
@@ -0,0 +1,93 @@
+"""Phonotactic control with precomputed syllable compatibility bitsets"""
+import itertools
+from typing import List, Sequence
+
+import numpy as np
+
+from alparc.controls.common import popcount
+from alparc.types.base_types import RegisterType
+
+DENSE_MAX_SYLLABLES = 20_000
+"""Up to this many syllables, the full bitset matrix is precomputed (~50MB). Above, rows are computed on demand."""
+BLOCK_SIZE = 256
+
+
+class SyllableCompatibility:
+    """
+    Packed syllable x syllable bitset matrix: bit j of row i is set if syllables i and j share no phonotactic feature,
+    i.e. if their phonotactic masks AND to zero.
+
+    A set of syllables passes `check_syll_feature_overlap` iff every syllable has no repeated features itself and
+    all pairs are compatible, so the valid candidates after a look-back window are the AND of the window's rows.
+    """
+
+    def __init__(self, syllables: RegisterType):
+        self.n_syllables = len(syllables)
+        self.masks = np.array([syllable.phonotactic_mask for syllable in syllables], dtype=np.uint16)
+        n_features = np.array([syllable.n_phonotactic_features for syllable in syllables], dtype=np.int64)
+
+        # a syllable repeats a feature itself iff its union of features has fewer bits than it has features
+        self.self_consistent = popcount(self.masks).astype(np.int64) == n_features
+        self.valid = np.packbits(self.self_consistent, bitorder="little")
+
+        self.matrix = None
+        if self.n_syllables <= DENSE_MAX_SYLLABLES:
+            self.matrix = np.zeros((self.n_syllables, len(self.valid)), dtype=np.uint8)
+            for start in range(0, self.n_syllables, BLOCK_SIZE):
+                rows = np.arange(start, min(start + BLOCK_SIZE, self.n_syllables))
+                self.matrix[rows] = np.packbits(self._compatible_rows(rows), axis=1, bitorder="little")
+
+    def _compatible_rows(self, rows: np.ndarray) -> np.ndarray:
+        disjoint = (self.masks[rows, None] & self.masks[None, :]) == 0
+        return disjoint & self.self_consistent[rows, None] & self.self_consistent[None, :]
+
+    def row(self, i: int) -> np.ndarray:
+        if self.matrix is not None:
+            return self.matrix[i]
+        return np.packbits(self._compatible_rows(np.array([i]))[0], bitorder="little")
+
+    def rows(self, indexes: np.ndarray) -> np.ndarray:
+        """Unpacked (... x n_syllables) boolean rows for an int array of syllable indexes"""
+        if self.matrix is not None:
+            return np.unpackbits(self.matrix[indexes], axis=-1, count=self.n_syllables, bitorder="little").view(bool)
+        flat = np.ravel(indexes)
+        return self._compatible_rows(flat).reshape(*np.shape(indexes), self.n_syllables)
+
+    def is_compatible(self, i: int, j: int) -> bool:
+        return bool((self.row(i)[j >> 3] >> (j & 7)) & 1)
+
+    def pack(self, indexes: Sequence[int]) -> np.ndarray:
+        mask = np.zeros(self.n_syllables, dtype=bool)
+        mask[list(indexes)] = True
+        return np.packbits(mask, bitorder="little")
+
+    def unpack(self, bits: np.ndarray) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_syllables, bitorder="little"))
+
+    def candidate_bits(self, lookback: Sequence[int], exclude: Sequence[int] = ()) -> np.ndarray:
+        bits = self.valid.copy()
+        for i in lookback:
+            bits &= self.row(i)
+
+        # the look-back window has to be consistent itself
+        if not all(self.is_compatible(i, j) for i, j in itertools.combinations(lookback, 2)):
+            bits[:] = 0
+
+        if len(exclude):
+            bits &= ~self.pack(exclude)
+
+        return bits
+
+    def candidates(self, lookback: Sequence[int], exclude: Sequence[int] = ()) -> np.ndarray:
+        """Indexes of syllables that can follow the `lookback` syllables (and are not in `exclude`)"""
+        return self.unpack(self.candidate_bits(lookback, exclude))
+
+    def candidate_mask(self, lookback: np.ndarray) -> np.ndarray:
+        """
+        Batched version of `candidates`: (n_words x n_syllables) mask of the syllables that can follow the
+        look-back windows in `lookback` (n_words x window). The windows are assumed to be consistent themselves.
+        """
+        mask = np.repeat(self.self_consistent[None, :], len(lookback), axis=0)
+        if lookback.shape[1]:
+            mask &= self.rows(lookback).all(axis=1)
+        return mask
@@ -0,0 +1,96 @@
+"""Frequency-weighted syllable sampling"""
+from typing import Literal, Optional
+
+import numpy as np
+
+from alparc.types.base_types import RegisterType
+
+SyllableWeighting = Literal["uniform", "frequency", "inverse_frequency"]
+
+MAX_REJECTIONS = 16
+"""Alias draws that may land outside the candidates before falling back to an explicit renormalised draw"""
+
+
+def syllable_weights(syllables: RegisterType, weighting: SyllableWeighting = "uniform") -> np.ndarray:
+    """
+    Sampling weights of the syllables in a register: uniform, proportional to their corpus `freq` or inversely
+    proportional to it. Syllables have a corpus `freq` after `make_syllables(..., syllable_control=True)`.
+    """
+    if weighting == "uniform":
+        return np.ones(len(syllables), dtype=np.float64)
+
+    if weighting not in ("frequency", "inverse_frequency"):
+        raise ValueError(f"syllable weighting '{weighting}' unknown.")
+
+    missing = [syllable.id for syllable in syllables if "freq" not in syllable.info]
+    if missing:
+        raise ValueError(f"Frequency weighting needs the corpus 'freq' of every syllable, "
+                         f"missing for {missing[:5]}. Generate the syllables with syllable_control.")
+
+    freqs = np.array([syllable.info["freq"] for syllable in syllables], dtype=np.float64)
+    if weighting == "frequency":
+        return freqs
+
+    weights = np.zeros_like(freqs)
+    np.divide(1, freqs, out=weights, where=freqs > 0)
+    return weights
+
+
+class AliasTable:
+    """
+    Walker's alias method: after O(n) setup, every draw from the discrete distribution given by `weights`
+    costs one uniform integer and one uniform float.
+    """
+
+    def __init__(self, weights: np.ndarray):
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim != 1 or not len(weights) or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Alias table weights have to be non-negative with a positive sum.")
+
+        n = len(weights)
+        self.probabilities = weights / weights.sum()
+        self.accept = np.ones(n, dtype=np.float64)
+        self.alias = np.arange(n, dtype=np.int64)
+
+        scaled = self.probabilities * n
+        small = [i for i in range(n) if scaled[i] < 1]
+        large = [i for i in range(n) if scaled[i] >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.accept[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # whatever is left is 1 up to rounding errors
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def draw(self, rng: np.random.Generator, size: Optional[int] = None):
+        columns = rng.integers(len(self), size=size)
+        keep = rng.random(size) < self.accept[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+    def draw_from(self, candidates: np.ndarray, rng: np.random.Generator) -> Optional[int]:
+        """
+        Draw one of the sorted syllable indexes `candidates` with the table's probabilities renormalised to them.
+
+        Draws from the full table are rejected until one is a candidate, which is exact for the renormalised
+        distribution. If the candidates carry little of the probability mass, this falls back to an explicit
+        draw after MAX_REJECTIONS rejections. Returns None if the candidates have no probability mass at all.
+        """
+        if not len(candidates):
+            return None
+
+        for _ in range(MAX_REJECTIONS):
+            index = int(self.draw(rng))
+            position = np.searchsorted(candidates, index)
+            if position < len(candidates) and candidates[position] == index:
+                return index
+
+        probabilities = self.probabilities[candidates]
+        total = probabilities.sum()
+        if total <= 0:
+            return None
+        position = np.searchsorted(np.cumsum(probabilities), rng.random() * total, side="right")
+        return int(candidates[min(position, len(candidates) - 1)])
@@ -2,11 +2,13 @@ import collections
 import itertools
 import logging.config
 import math
-from typing import List, Optional, Literal, Dict, Union
+from typing import Callable, List, Optional, Literal, Dict, Union
 import logging
 import os
+from os import PathLike
 
 from alparc.io import load_phonemes
+from alparc.store import write_stream_store
 from alparc.types.base_types import Register, RegisterType
 from alparc.types.syllable import Syllable
 from alparc.types.word import WordType, Word
@@ -331,16 +333,20 @@ def sample_syllable_randomization(
 
 
 def compute_rhythmicity_index_sylls_stream(stream, patterns):
-    count_patterns = []
-    patterns = [tuple(pat) for pat in patterns]
-    for feature_stream in list(zip(*[syllable.info["binary_features"] for syllable in stream])):
-        c = 0
-        for iSyll in range(len(feature_stream) - max(len(i) for i in patterns)):
-            if any(i == feature_stream[iSyll: iSyll + len(i)] for i in patterns):
-                c += 1
-        count_patterns.append(c / (len(feature_stream) - max(len(i) for i in patterns)))
+    """
+    For every binary feature, the fraction of positions in the syllable stream at which one of the (equally long)
+    oscillation `patterns` starts.
+    """
+    features = np.array([syllable.info["binary_features"] for syllable in stream], dtype=np.int8).T
+    pattern_length = max(len(pattern) for pattern in patterns)
+    n_positions = features.shape[1] - pattern_length
+
+    windows = np.lib.stride_tricks.sliding_window_view(features, pattern_length, axis=1)[:, :n_positions]
+    matches = np.zeros(windows.shape[:2], dtype=bool)
+    for pattern in patterns:
+        matches |= (windows == np.array(pattern, dtype=np.int8)).all(axis=2)
 
-    return count_patterns
+    return (matches.sum(axis=1) / n_positions).tolist()
 
 
 def make_stream_from_lexicon(lexicon: Register[str, Word],
@@ -354,7 +360,7 @@ def make_stream_from_lexicon(lexicon: Register[str, Word],
             i_labels = enumerate(lexicon.info["syllables_info"]["syllable_feature_labels"])
             feature_labels = [f"phon_{i_phon+1}_{label}" for i_phon, labels in i_labels for label in labels]
         
-            return Stream(
+            return Stream.trusted(
                 id="_".join([syll.id for syll in sylls_stream[:5]]) + "..." + "_".join([syll.id for syll in sylls_stream[-5:]]),
                 syllables=sylls_stream,
                 info={
@@ -405,7 +411,12 @@ def make_streams(
         stream_length: int = 15,
         max_tries_randomize: int = 10,
         tp_modes: tuple = ("random", "word_structured", "position_controlled"),
-        require_all_tp_modes: bool = True
+        require_all_tp_modes: bool = True,
+        store: Optional[Union[str, PathLike]] = None,
+        on_stream: Optional[Callable[[str, StreamType], None]] = None,
+        start_lexicon: int = 0,
+        on_lexicon: Optional[Callable[[int], None]] = None,
+        collect: bool = True
 ) -> RegisterType:
     """_summary_
 
@@ -416,6 +427,11 @@ def make_streams(
         max_tries_randomize (int, optional): if max_rhythmicity is given and violated, how many times to try with a new randomization. Defaults to 10.
         tp_modes (tuple, optional): the ways (modes) in which to control for transition probabilities of syllables in the stream. Defaults to ("random", "word_structured", "position_controlled").
         require_all_tp_modes (bool, optional): all streams coming from the same lexicon will be discarded if not all their tp-modes have been found. Defaults to True.
+        store (str or PathLike, optional): also write the streams as a memory-mapped stream store to this directory (see `alparc.store`). Defaults to None.
+        on_stream (callable, optional): called with the key and the stream of every accepted stream as soon as all streams of its lexicon are done, e.g. to write results incrementally. Defaults to None.
+        start_lexicon (int, optional): skip the lexicons before this index, e.g. to resume an interrupted run. Defaults to 0.
+        on_lexicon (callable, optional): called with the index of every lexicon once its streams are done (accepted or not), e.g. to checkpoint progress. Defaults to None.
+        collect (bool, optional): collect the streams in the returned register. If False, the streams are only passed to `on_stream` and not kept in memory. Defaults to True.
 
     Returns:
         RegisterType: _description_
@@ -424,7 +440,7 @@ def make_streams(
 
     streams = {}
 
-    for i, lexicon in enumerate(lexicons):
+    for i, lexicon in enumerate(lexicons[start_lexicon:], start=start_lexicon):
         found_all_tp_modes = True
         new_streams = {}
         for tp_mode in tp_modes:
@@ -445,7 +461,14 @@ def make_streams(
                 break
 
         if found_all_tp_modes or (require_all_tp_modes == False):
-            streams.update(new_streams)
+            if collect:
+                streams.update(new_streams)
+            if on_stream is not None:
+                for key, stream in new_streams.items():
+                    on_stream(key, stream)
+
+        if on_lexicon is not None:
+            on_lexicon(i)
 
     streams_reg = Register(**streams)
 
@@ -457,4 +480,7 @@ def make_streams(
         "require_all_tp_modes": require_all_tp_modes
     }
 
+    if store is not None:
+        write_stream_store(streams_reg, store)
+
     return streams_reg
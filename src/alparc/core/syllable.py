@@ -2,17 +2,20 @@ import itertools
 import logging
 from copy import copy
 from functools import reduce
-from typing import List, Literal, Optional, Union, TypeVar, Dict, Any
+from typing import List, Literal, Optional, Union, TypeVar, Dict, Any, Iterable, Iterator, Tuple
 
+import numpy as np
 from pydantic import BaseModel
 
 from alparc.types.base_types import Register, RegisterType
-from alparc.types.phoneme import Phoneme, TypePhonemeFeatureLabels
+from alparc.types.phoneme import Phoneme, TypePhonemeFeatureLabels, PHONEME_FEATURE_INDEX
 from alparc.types.base_types import Element
-from alparc.types.syllable import Syllable, SyllableType, LABELS_C, LABELS_V
+from alparc.types.syllable import (Syllable, SyllableType, LABELS_C, LABELS_V, PHONOTACTIC_FEATURES,
+                                   PHONOTACTIC_VOWELS)
 
-from alparc.io import read_syllables_corpus
+from alparc.io import read_syllables_table
 
+from alparc.controls.common import popcount
 from alparc.controls.filter import filter_common_phoneme_syllables, filter_uniform_syllables
 
 logger = logging.getLogger(__name__)
@@ -42,6 +45,69 @@ def add_phonotactic_features(syllable_phonemes: List[Phoneme]):
     return syll_feats
 
 
+class CompiledPhonemes:
+    """
+    Per-phoneme features of a phoneme register, precomputed once for batch syllable feature extraction:
+    the binary features over LABELS_C (consonants) or LABELS_V (vowels) and the phonotactic classes as bit codes.
+    """
+
+    def __init__(self, phonemes: RegisterType):
+        self.ids: List[str] = list(phonemes.keys())
+        self.index: Dict[str, int] = {phoneme_id: i for i, phoneme_id in enumerate(self.ids)}
+
+        codes = np.stack([phoneme.feature_codes for phoneme in phonemes]) if self.ids \
+            else np.zeros((0, len(PHONEME_FEATURE_INDEX)), dtype=np.int8)
+        binary = codes > 0
+        feature = {label: binary[:, i] for label, i in PHONEME_FEATURE_INDEX.items()}
+
+        self.is_consonant = feature["cons"]
+        self.binary_c = binary[:, [PHONEME_FEATURE_INDEX[label] for label in LABELS_C]].astype(np.int8)
+        self.binary_v = binary[:, [PHONEME_FEATURE_INDEX[label] for label in LABELS_V]].astype(np.int8)
+
+        cons, son, cont = feature["cons"], feature["son"], feature["cont"]
+        lab = cons & feature["lab"]
+        den = cons & feature["cor"] & ~feature["hi"]
+        classes = [cons & son, cons & ~son & ~cont, cons & ~son & cont, lab, den, cons & ~lab & ~den]
+        classes += [~cons & np.array([vowel in phoneme_id for phoneme_id in self.ids], dtype=bool)
+                    for vowel in PHONOTACTIC_VOWELS]
+
+        self.phonotactic = np.zeros(len(self.ids), dtype=np.uint16)
+        for bit, has_class in enumerate(classes):
+            self.phonotactic |= has_class.astype(np.uint16) << bit
+
+    def encode(self, phoneme_combinations: Iterable[Iterable[str]], n_phonemes: int) -> np.ndarray:
+        """(n_syllables x n_phonemes) array of phoneme indexes"""
+        rows = [[self.index[phoneme_id] for phoneme_id in combination] for combination in phoneme_combinations]
+        return np.array(rows, dtype=np.int64).reshape(len(rows), n_phonemes)
+
+
+def decode_phonotactic_code(code: int) -> List[str]:
+    return [feature for bit, feature in enumerate(PHONOTACTIC_FEATURES) if code >> bit & 1]
+
+
+def syllable_features(compiled: CompiledPhonemes, syllable_phonemes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batch version of the features of `syllable_from_phonemes` for an (n_syllables x n_phonemes) array of phoneme
+    indexes into `compiled`. Returns the int8 `binary_features` matrix (n_syllables x n_binary_features) and the
+    phonotactic feature codes (n_syllables x n_phonemes, see `decode_phonotactic_code`).
+
+    All syllables need the same phoneme type (consonant or vowel) at each position, like the syllables of a pattern.
+    """
+    columns = []
+    for k in range(syllable_phonemes.shape[1]):
+        position = syllable_phonemes[:, k]
+        is_consonant = compiled.is_consonant[position]
+        if is_consonant.all():
+            columns.append(compiled.binary_c[position])
+        elif not is_consonant.any():
+            columns.append(compiled.binary_v[position])
+        else:
+            raise ValueError(f"Syllables mix consonants and vowels at position {k}.")
+
+    binary_features = np.concatenate(columns, axis=1) if columns else np.zeros((len(syllable_phonemes), 0), np.int8)
+    return binary_features, compiled.phonotactic[syllable_phonemes]
+
+
 def get_feature_labels(phoneme: Phoneme):
     if phoneme.get_binary_feature('cons'):
         return LABELS_C
@@ -60,7 +126,7 @@ def syllable_from_phonemes(phonemes: RegisterType, phoneme_combination: List[str
             else:
                 syll_features.append(0)
 
-    syllable = Syllable(
+    syllable = Syllable.trusted(
         id="".join(phoneme_combination), 
         info={"binary_features": syll_features,
                           "phonotactic_features": add_phonotactic_features(syll_phons)},
@@ -70,14 +136,64 @@ def syllable_from_phonemes(phonemes: RegisterType, phoneme_combination: List[str
     return syllable
 
 
+TRIE_END = ""
+"""Key that marks the end of a complete syllable in a trie node"""
+
+
+def build_syllable_trie(syllable_ids: Iterable[str]) -> Dict:
+    """Character prefix tree over corpus syllables, as nested dicts"""
+    trie = {}
+    for syllable_id in syllable_ids:
+        node = trie
+        for char in syllable_id:
+            node = node.setdefault(char, {})
+        node[TRIE_END] = {}
+    return trie
+
+
+def descend_trie(node: Dict, phoneme_id: str) -> Optional[Dict]:
+    """The trie node after appending `phoneme_id` to the prefix of `node`, None if no corpus syllable continues so"""
+    for char in phoneme_id:
+        node = node.get(char)
+        if node is None:
+            return None
+    return node
+
+
+def iter_phoneme_combinations(phonemes_factors: List[List[str]], trie: Optional[Dict] = None) -> Iterator[Tuple[str, ...]]:
+    """
+    Combinations of one phoneme per factor, in the order of `itertools.product`. With a `trie`, only combinations
+    that spell a corpus syllable are yielded, and a prefix is not extended as soon as no corpus syllable starts with it.
+    """
+    if trie is None:
+        yield from itertools.product(*phonemes_factors)
+        return
+
+    def search(prefix, node):
+        if len(prefix) == len(phonemes_factors):
+            if TRIE_END in node:
+                yield tuple(prefix)
+            return
+        for phoneme_id in phonemes_factors[len(prefix)]:
+            child = descend_trie(node, phoneme_id)
+            if child is not None:
+                prefix.append(phoneme_id)
+                yield from search(prefix, child)
+                prefix.pop()
+
+    yield from search([], trie)
+
+
 def make_feature_syllables(
     phonemes: RegisterType,
     phoneme_pattern: Union[str, list] = "cV",
     max_combinations: int = 1_000_000,
     consonant_features: List[TypePhonemeFeatureLabels] = LABELS_C,
     vowel_features: List[TypePhonemeFeatureLabels] = LABELS_V,
+    corpus_ids: Optional[Iterable[str]] = None,
 ) -> RegisterType:
-    """Generate syllables form feature-phonemes. Only keep syllables that follow the phoneme pattern"""
+    """Generate syllables form feature-phonemes. Only keep syllables that follow the phoneme pattern.
+    If `corpus_ids` are given, only the syllables among them are enumerated and built."""
 
     logger.info("SELECT SYLLABLES WITH GIVEN PHONEME-TYPE PATTERN AND WITH PHONEMES WE HAVE FEATURES FOR")
     valid_phoneme_types = ["c", "C", "v", "V"]
@@ -111,21 +227,31 @@ def make_feature_syllables(
     phonemes_mapping = {"c": single_consonants, "C": multi_consonants, "v": short_vowels, "V": long_vowels}
 
     phonemes_factors = list(map(lambda phoneme_type: phonemes_mapping[phoneme_type], phoneme_types))
+    trie = build_syllable_trie(corpus_ids) if corpus_ids is not None else None
     total_combs = reduce(lambda a, b: a * b, [len(phonemes_factor) for phonemes_factor in phonemes_factors])
-    if total_combs > max_combinations:
+    if trie is None and total_combs > max_combinations:
         logger.warning(f"Combinatorial explosion with {total_combs} combinations for '{phoneme_types}'."
                         f"I will only generate {max_combinations} of them, but you can set this number higher via the "
                         "option 'max_combinations'.")
 
+    combinations = list(itertools.islice(iter_phoneme_combinations(phonemes_factors, trie), max_combinations))
+    compiled = CompiledPhonemes(phonemes)
+    syllable_phonemes = compiled.encode(combinations, len(phonemes_factors))
+    binary_features, phonotactic_codes = syllable_features(compiled, syllable_phonemes)
+    phonotactic_features = [decode_phonotactic_code(code) for code in compiled.phonotactic.tolist()]
+    phonotactic_counts = popcount(phonotactic_codes).sum(axis=1).tolist()
+    phonotactic_masks = np.bitwise_or.reduce(phonotactic_codes, axis=1).tolist()
+
     syllables_dict = {}
-    list_of_combinations = []
-    for i, phoneme_combination in enumerate(itertools.product(*phonemes_factors)):
-        if i >= max_combinations:
-            break
-        list_of_combinations.append(phoneme_combination)
-
-    for phoneme_combination in list_of_combinations:
-        syllable = syllable_from_phonemes(phonemes, phoneme_combination, syll_feature_labels)
+    for combination, binary_row, phoneme_row, mask, count in zip(
+            combinations, binary_features.tolist(), syllable_phonemes.tolist(), phonotactic_masks, phonotactic_counts):
+        syllable = Syllable.trusted(
+            id="".join(combination),
+            info={"binary_features": binary_row,
+                  "phonotactic_features": [list(phonotactic_features[i]) for i in phoneme_row]},
+            phonemes=[phonemes[phoneme_id] for phoneme_id in combination]
+        )
+        syllable._phonotactic_mask, syllable._n_phonotactic_features = mask, count
         syllables_dict[syllable.id] = syllable
 
     new_info = copy(phonemes.info)
@@ -156,14 +282,20 @@ def make_syllables(phonemes: RegisterType, phoneme_pattern: str = "cV",
         RegisterType: The final Register of syllables
     """
 
+    syllable_corpus = read_syllables_table(lang=lang) if syllable_control else None
+
+    # with syllable control, only syllables that are in the corpus are enumerated
     syllables = make_feature_syllables(phonemes, 
                                        phoneme_pattern=phoneme_pattern,
                                        consonant_features=consonant_features,
-                                       vowel_features=vowel_features)
+                                       vowel_features=vowel_features,
+                                       corpus_ids=(syllable_corpus["ids"].tolist() if syllable_control else None))
 
     if syllable_control:
-        syllable_corpus = read_syllables_corpus(lang=lang)
-        syllables = syllables.intersection(syllable_corpus)
+        corpus_index = {syllable_id: i for i, syllable_id in enumerate(syllable_corpus["ids"].tolist())}
+        for syllable in syllables:
+            i = corpus_index[syllable.id]
+            syllable.info.update(freq=syllable_corpus["freq"].item(i), prob=syllable_corpus["prob"].item(i))
     
         if syllable_alpha is not None:
             syllables = filter_uniform_syllables(syllables, alpha=syllable_alpha)
@@ -1,7 +1,10 @@
+import collections
+from concurrent.futures import ProcessPoolExecutor
 from copy import copy
 import itertools
 import logging
-from typing import TypeVar, List, Dict, Any
+import os
+from typing import TypeVar, List, Dict, Any, Literal, Optional, Iterable, Iterator, Tuple
 
 import numpy as np
 from pydantic import BaseModel
@@ -9,19 +12,26 @@ from tqdm import tqdm
 
 from alparc.types.base_types import Register, Element, RegisterType
 from alparc.types.phoneme import PHONEME_FEATURE_LABELS, TypePhonemeFeatureLabels
-from alparc.types.syllable import Syllable, SyllableType
+from alparc.types.syllable import Syllable, SyllableType, pack_bits
 from alparc.types.word import Word, WordType
 
 from alparc.controls.common import *
-from alparc.controls.filter import filter_bigrams, filter_common_phoneme_words, filter_trigrams
+from alparc.controls.encoding import PhonemeEncoder, PAD, words_from_syllables
+from alparc.controls.filter import filter_words, word_controls_info, WordControls
+from alparc.controls.phonotactics import SyllableCompatibility
+from alparc.controls.sampling import AliasTable, SyllableWeighting, syllable_weights
 
 
 logger = logging.getLogger(__name__)
 
 
 def check_syll_feature_overlap(syllables):
-    all_feats = [feat for syll in syllables for phon_feats in syll.info["phonotactic_features"] for feat in phon_feats]
-    return len(all_feats) == len(set(all_feats))
+    """True if no phonotactic feature occurs twice among all phonemes of the syllables"""
+    union, n_features = 0, 0
+    for syll in syllables:
+        union |= syll.phonotactic_mask
+        n_features += syll.n_phonotactic_features
+    return bin(union).count("1") == n_features
 
 
 def generate_subset_syllables(syllables, lookback_syllables):
@@ -34,55 +44,98 @@ def generate_subset_syllables(syllables, lookback_syllables):
     return subset
 
 
+def word_feature_bitplanes(words: RegisterType) -> np.ndarray:
+    """
+    (n_words x n_features) bitplanes of the words' binary features: bit k of plane f is set if syllable k of the
+    word has binary feature f.
+    """
+    if not len(words):
+        return np.zeros((0, 0), dtype=np.uint64)
+    features = words.features.values.astype(np.uint64)
+    return (features << np.arange(features.shape[2], dtype=np.uint64)).sum(axis=2, dtype=np.uint64)
+
+
 def word_overlap_matrix(
         words: Register[str, Word], 
         lag_of_interest: int = 1,
         control_features: List[TypePhonemeFeatureLabels] = PHONEME_FEATURE_LABELS):
+    """
+    Count for every pair of words the controlled binary features that oscillate across the pair, i.e. whose
+    feature values over the syllables of both words form one of the oscillation patterns.
+    """
     n_words = len(words)
     n_sylls_per_word = len(words[0].syllables)
 
     oscillation_patterns = get_oscillation_patterns(lag=(n_sylls_per_word*lag_of_interest))
 
-    overlap = np.zeros([n_words, n_words], dtype=int)
-
-    feature_indexes = []
-    features = [feature for phoneme_features in words.info["syllables_info"]["syllable_feature_labels"] for feature in phoneme_features]
-    for i, feature in enumerate(features):
-        if feature in control_features:
-            feature_indexes.append(i)
+    feature_indexes = [i for i, feature in enumerate(words.feature_labels()) if feature in control_features]
 
-    for i1, i2 in list(itertools.product(range(n_words), range(n_words))):
-        word_pair_features = [f1 + f2 for f1, f2 in zip(words[i1].info["binary_features"],
-                                                        words[i2].info["binary_features"])]
+    planes = word_feature_bitplanes(words)
+    planes = planes[:, [i for i in feature_indexes if i < planes.shape[1]]]
 
-        for i, word_pair_feature in enumerate(word_pair_features):
-            if (word_pair_feature in oscillation_patterns) and i in feature_indexes:
-                overlap[i1, i2] += 1
+    # a pattern over the concatenated syllables of a word pair matches if its first half equals the first
+    # word's bitplane and its second half the second one's, so the counts sum up as indicator products
+    overlap = np.zeros([n_words, n_words], dtype=int)
+    for pattern in oscillation_patterns:
+        if len(pattern) != 2 * n_sylls_per_word:
+            continue
+        first = (planes == pack_bits(pattern[:n_sylls_per_word])).astype(int)
+        second = (planes == pack_bits(pattern[n_sylls_per_word:])).astype(int)
+        overlap += first @ second.T
 
     return overlap
 
 
-def generate_feature_words(syllables, iter_tries, n_syllables, n_look_back, phonotactic_control, progress_bar, n_words):
+def word_from_syllables(sylls: List[SyllableType], syllable_features: Optional[np.ndarray] = None) -> WordType:
+    """A word from its syllables. `syllable_features` are the syllables' rows of their register's feature matrix,
+    if at hand."""
+    word_id = "".join(s.id for s in sylls)
+    if syllable_features is not None:
+        word_features = syllable_features.T.tolist()
+    else:
+        word_features = list(list(tup) for tup in zip(*[s.info["binary_features"] for s in sylls]))
+    return Word.trusted(id=word_id, info={"binary_features": word_features}, syllables=sylls)
+
+
+def generate_feature_words(syllables, iter_tries, n_syllables, n_look_back, phonotactic_control, progress_bar, n_words,
+                           syllable_weighting: SyllableWeighting = "uniform"):
     words = {}
+    word_indexes = []
+    syllables_list = list(syllables)
+    syllable_features = syllables.features.values
+    all_indexes = np.arange(len(syllables_list))
+
+    if phonotactic_control:
+        compatibility = SyllableCompatibility(syllables)
+
+    if syllable_weighting != "uniform" and syllables_list:
+        alias_table = AliasTable(syllable_weights(syllables, syllable_weighting))
+        rng = np.random.default_rng(np.random.randint(0, 2**31))
 
     if progress_bar:
         pbar = tqdm(total=n_words)
 
     for _ in iter_tries:
-        sylls = []
+        indexes = []
         for _ in range(n_syllables):
-            sub = list(filter(lambda x: x.id not in sylls, syllables))
             if phonotactic_control:
-                sub = generate_subset_syllables(sub, sylls[-n_look_back:])
-            if sub:
-                new_rand_valid_syllable = random.sample(sub, 1)[0]
-                sylls.append(new_rand_valid_syllable)
-
-        if len(sylls) == n_syllables:
+                sub = compatibility.candidates(indexes[-n_look_back:], exclude=indexes)
+            else:
+                sub = np.setdiff1d(all_indexes, indexes)
+            if syllable_weighting != "uniform":
+                index = alias_table.draw_from(sub, rng)
+            else:
+                index = int(random.choice(sub)) if len(sub) else None
+            if index is None:
+                break
+            indexes.append(index)
+
+        if len(indexes) == n_syllables:
+            sylls = [syllables_list[i] for i in indexes]
             word_id = "".join(s.id for s in sylls)
             if word_id not in words:
-                word_features = list(list(tup) for tup in zip(*[s.info["binary_features"] for s in sylls]))
-                words[word_id] = Word(id=word_id, info={"binary_features": word_features}, syllables=sylls)
+                words[word_id] = word_from_syllables(sylls, syllable_features[indexes])
+                word_indexes.append(indexes)
                 if progress_bar:
                     pbar.update(1)
 
@@ -90,8 +143,385 @@ def generate_feature_words(syllables, iter_tries, n_syllables, n_look_back, phon
             logging.info(f"Done: Found {n_words} words.")
             break
     
-    return Register(words, _info={"n_syllables_per_word": n_syllables, "n_look_back": n_look_back, "phonotactic_control": phonotactic_control})
+    words_register = Register(words, _info={"n_syllables_per_word": n_syllables, "n_look_back": n_look_back, "phonotactic_control": phonotactic_control})
+    if words:
+        # the words' feature matrix is a gather of the syllables' one, sliced by the filters of make_words
+        words_register.set_feature_matrix(syllable_features[np.array(word_indexes)].transpose(0, 2, 1))
+    return words_register
+
+
+
+def sample_from_mask(mask: np.ndarray, rng: np.random.Generator, weights: Optional[np.ndarray] = None):
+    """Pick one True column per row of a boolean (n_rows x n_columns) mask uniformly at random, or with probabilities
+    proportional to the column `weights` renormalised over the row's True columns.
+    Returns the column indexes and whether the row had any True column (with positive weight)."""
+    if weights is not None:
+        cumulative = np.cumsum(mask * weights, axis=1)
+        totals = cumulative[:, -1] if mask.shape[1] else np.zeros(len(mask))
+        indexes = np.argmax(cumulative > (rng.random(len(mask)) * totals)[:, None], axis=1)
+        return indexes, totals > 0
+
+    counts = mask.sum(axis=1)
+    thresholds = (rng.random(len(mask)) * counts).astype(np.int64)
+    indexes = np.argmax(np.cumsum(mask, axis=1) > thresholds[:, None], axis=1)
+    return indexes, counts > 0
+
+
+def sample_syllable_indexes(n_rows: int, n_syllables: int, n_look_back: int, available: np.ndarray,
+                            compatibility: Optional[SyllableCompatibility], rng: np.random.Generator,
+                            weights: Optional[np.ndarray] = None):
+    """
+    Draw (n_rows x n_syllables) syllable indexes slot by slot, every slot from the syllables that are not
+    yet in the word and (if `compatibility` is given) compatible with the look-back window, uniformly or
+    proportional to the syllable `weights`.
+    Returns the indexes and a mask of the rows that could be completed.
+    """
+    indexes = np.zeros((n_rows, n_syllables), dtype=np.int64)
+    complete = np.ones(n_rows, dtype=bool)
+    rows = np.arange(n_rows)[:, None]
+
+    for k in range(n_syllables):
+        if compatibility is not None:
+            window_start = max(0, k - n_look_back) if n_look_back > 0 else 0
+            mask = compatibility.candidate_mask(indexes[:, window_start:k]) & available
+        else:
+            mask = np.repeat(available[None, :], n_rows, axis=0)
+        mask[rows, indexes[:, :k]] = False
+        indexes[:, k], has_candidates = sample_from_mask(mask, rng, weights)
+        complete &= has_candidates
+
+    return indexes, complete
+
+
+def compile_word_controls(syllables: RegisterType, n_syllables: int, controls: Optional[dict]):
+    """Encoded syllables (n_syllables x max_phonemes) and the compiled `WordControls` (None if `controls` is None)"""
+    encoder = PhonemeEncoder.from_syllables(syllables)
+    syllable_phonemes = encoder.encode_syllables(syllables)
+    if controls is None:
+        return syllable_phonemes, None
+    phonemes = (phoneme for syllable in syllables for phoneme in syllable)
+    return syllable_phonemes, WordControls(encoder, phonemes, syllable_phonemes.shape[1] * n_syllables, **controls)
+
+
+MAX_BATCH_CELLS = 1 << 22
+"""Upper bound for batch_size * n_syllables_in_register, to bound the memory of one batch"""
+
+
+class WordSampler:
+    """Draws batches of candidate words as syllable index arrays and applies phonotactic and word controls"""
+
+    def __init__(self,
+                 syllables: RegisterType,
+                 n_syllables: int,
+                 n_look_back: int,
+                 phonotactic_control: bool,
+                 controls: Optional[dict] = None,
+                 syllable_weighting: SyllableWeighting = "uniform"):
+        self.n_syllables = n_syllables
+        self.n_look_back = n_look_back
+        self.compatibility = SyllableCompatibility(syllables) if phonotactic_control else None
+        self.available = np.ones(len(syllables), dtype=bool)
+        self.weights = syllable_weights(syllables, syllable_weighting) if syllable_weighting != "uniform" else None
+        self.syllable_phonemes, self.word_controls = compile_word_controls(syllables, n_syllables, controls)
+
+    def sample(self, n_rows: int, rng: np.random.Generator) -> np.ndarray:
+        """The accepted rows of a batch of `n_rows` candidates (not deduplicated)"""
+        indexes, complete = sample_syllable_indexes(n_rows, self.n_syllables, self.n_look_back, self.available,
+                                                    self.compatibility, rng, self.weights)
+        indexes = indexes[complete]
 
+        if self.word_controls is not None:
+            indexes = indexes[self.word_controls.mask(words_from_syllables(self.syllable_phonemes, indexes))]
+
+        return indexes
+
+
+_worker_sampler: Optional[WordSampler] = None
+
+
+def _init_sampler_worker(*sampler_args):
+    global _worker_sampler
+    _worker_sampler = WordSampler(*sampler_args)
+
+
+def _sample_in_worker(seed_sequence: np.random.SeedSequence, n_rows: int) -> np.ndarray:
+    return _worker_sampler.sample(n_rows, np.random.default_rng(seed_sequence))
+
+
+def iter_sampled_chunks(sampler_args: tuple, chunks: Iterable[tuple], n_jobs: int = 1) -> Iterator[np.ndarray]:
+    """
+    Sample the `chunks` (seed sequence, number of candidates) and yield their results in chunk order, either in this
+    process or in `n_jobs` worker processes. Each worker builds its own sampler once from `sampler_args`.
+    """
+    if n_jobs == 1:
+        sampler = WordSampler(*sampler_args)
+        for seed_sequence, n_rows in chunks:
+            yield sampler.sample(n_rows, np.random.default_rng(seed_sequence))
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_sampler_worker, initargs=sampler_args) as executor:
+        pending = collections.deque()
+        try:
+            for seed_sequence, n_rows in chunks:
+                pending.append(executor.submit(_sample_in_worker, seed_sequence, n_rows))
+                if len(pending) >= 2 * n_jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def generate_feature_words_vectorized(syllables: RegisterType,
+                                      n_syllables: int,
+                                      n_look_back: int,
+                                      phonotactic_control: bool,
+                                      n_words: int,
+                                      max_tries: int,
+                                      controls: Optional[dict] = None,
+                                      batch_size: int = 4096,
+                                      seed: Optional[int] = None,
+                                      n_jobs: int = 1,
+                                      syllable_weighting: SyllableWeighting = "uniform",
+                                      progress_bar: bool = False) -> RegisterType:
+    """
+    Generate words in batches of syllable index arrays. Phonotactic control uses the precomputed syllable
+    compatibility, the word `controls` (keyword arguments of `WordControls`) are applied to the whole batch, and
+    accepted words are deduplicated by their word id (different syllable sequences can concatenate to the same id).
+    Only accepted words are built as `Word`s.
+
+    The tries are split into batches, and batch i draws from its own generator seeded with
+    `SeedSequence(seed, spawn_key=(i,))`. Batches can be sampled by `n_jobs` worker processes, but are always merged
+    in batch order, so the result for a given seed is the same for any `n_jobs`.
+    """
+    seed = seed if seed is not None else int(np.random.randint(0, 2**31))
+    n_jobs = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+    syllables_list = list(syllables)
+    syllable_ids = [syllable.id for syllable in syllables_list]
+    n_register = len(syllables_list)
+    batch_size = max(1, min(batch_size, MAX_BATCH_CELLS // max(n_register, 1)))
+
+    sampler_args = (syllables, n_syllables, n_look_back, phonotactic_control, controls, syllable_weighting)
+    chunks = ((np.random.SeedSequence(seed, spawn_key=(i,)), min(batch_size, max_tries - start))
+              for i, start in enumerate(range(0, max_tries if n_register else 0, batch_size)))
+
+    if progress_bar:
+        pbar = tqdm(total=n_words)
+
+    accepted_keys = set()
+    accepted = []
+    for indexes in iter_sampled_chunks(sampler_args, chunks, n_jobs=n_jobs):
+        for row in indexes:
+            key = "".join([syllable_ids[i] for i in row.tolist()])
+            if key in accepted_keys:
+                continue
+            accepted_keys.add(key)
+            accepted.append(row)
+            if progress_bar:
+                pbar.update(1)
+            if len(accepted) == n_words:
+                break
+
+        if len(accepted) == n_words:
+            logging.info(f"Done: Found {n_words} words.")
+            break
+
+    syllable_features = syllables.features.values if accepted else None
+    words = {}
+    for row in accepted:
+        word = word_from_syllables([syllables_list[i] for i in row], syllable_features[row])
+        words[word.id] = word
+
+    info = {"n_syllables_per_word": n_syllables, "n_look_back": n_look_back, "phonotactic_control": phonotactic_control,
+            "syllable_weighting": syllable_weighting}
+    if controls is not None:
+        info.update(word_controls_info(**controls))
+
+    words_register = Register(words, _info=info)
+    if accepted:
+        # the words' feature matrix is a gather of the syllables' one
+        words_register.set_feature_matrix(syllable_features[np.array(accepted)].transpose(0, 2, 1))
+    return words_register
+
+
+class WordSpace:
+    """
+    The space of all valid words over a syllable register, enumerated lazily by backtracking search.
+
+    At each syllable boundary, the candidates for the next syllable are pruned with the phonotactic compatibility
+    of the look-back window and with the word `controls` (keyword arguments of `WordControls`) on the prefix,
+    so dead branches are cut as early as possible. Words are yielded as tuples of syllable indexes.
+
+    Different syllable sequences can spell the same word id (e.g. "a|aa|b" and "aa|a|b"). Such a word is
+    represented by its first valid sequence in enumeration order, and the others are skipped.
+    """
+
+    def __init__(self,
+                 syllables: RegisterType,
+                 n_syllables: int = 3,
+                 n_look_back: int = 2,
+                 phonotactic_control: bool = True,
+                 controls: Optional[dict] = None):
+        self.syllables = list(syllables)
+        self.n_syllables = n_syllables
+        self.n_look_back = n_look_back
+        self.compatibility = SyllableCompatibility(syllables) if phonotactic_control else None
+        self.syllable_phonemes, self.word_controls = compile_word_controls(syllables, n_syllables, controls)
+        self.n_positions = self.syllable_phonemes.shape[1] * n_syllables
+        self._counts: Dict[Tuple[int, ...], int] = {}
+        self._count: Optional[int] = None
+
+        self._syllable_ids = [syllable.id for syllable in self.syllables]
+        self._id_positions = {syllable_id: i for i, syllable_id in enumerate(self._syllable_ids)}
+        self._id_lengths = sorted({len(syllable_id) for syllable_id in self._syllable_ids})
+        # if no syllable id is a prefix of another, every sequence of syllables spells a different word id
+        sorted_ids = sorted(self._syllable_ids)
+        self.unique_ids = not any(longer.startswith(shorter) for shorter, longer in zip(sorted_ids, sorted_ids[1:]))
+
+    def children(self, prefix: Tuple[int, ...]) -> np.ndarray:
+        """Indexes of the syllables that can extend the word `prefix`"""
+        k = len(prefix)
+        if self.compatibility is not None:
+            window_start = max(0, k - self.n_look_back) if self.n_look_back > 0 else 0
+            mask = self.compatibility.candidate_mask(np.array([prefix[window_start:]], dtype=np.int64))[0]
+        else:
+            mask = np.ones(len(self.syllables), dtype=bool)
+        mask[list(prefix)] = False
+        children = np.flatnonzero(mask)
+
+        if self.word_controls is not None and len(children):
+            rows = np.empty((len(children), k + 1), dtype=np.int64)
+            rows[:, :k] = prefix
+            rows[:, k] = children
+            word_phonemes = np.full((len(children), self.n_positions), PAD, dtype=np.int64)
+            prefix_phonemes = words_from_syllables(self.syllable_phonemes, rows)
+            word_phonemes[:, :prefix_phonemes.shape[1]] = prefix_phonemes
+            children = children[self.word_controls.mask(word_phonemes)]
+
+        return children
+
+    def is_first_spelling(self, indexes: Tuple[int, ...]) -> bool:
+        """Whether the valid word `indexes` is the first valid syllable sequence (in enumeration order) of its id"""
+        if self.unique_ids:
+            return True
+        word_id = "".join([self._syllable_ids[i] for i in indexes])
+
+        def spellings(position, n_left):
+            if n_left == 0:
+                if position == len(word_id):
+                    yield ()
+                return
+            candidates = (self._id_positions.get(word_id[position:position + length]) for length in self._id_lengths)
+            for candidate in sorted(i for i in candidates if i is not None):
+                for rest in spellings(position + len(self._syllable_ids[candidate]), n_left - 1):
+                    yield (candidate,) + rest
+
+        # spellings are generated in enumeration order, the first valid one represents the word
+        for spelling in spellings(0, self.n_syllables):
+            if spelling == indexes:
+                return True
+            if all(spelling[k] in self.children(spelling[:k]) for k in range(self.n_syllables)):
+                return False
+        return True
+
+    def iter_indexes(self, shuffle: bool = False,
+                     rng: Optional[np.random.Generator] = None) -> Iterator[Tuple[int, ...]]:
+        """Yield every valid word once, in register order or (if `shuffle`) in random order"""
+        rng = rng if rng is not None else np.random.default_rng(np.random.randint(0, 2**31))
+
+        def search(prefix):
+            children = self.children(prefix)
+            if shuffle:
+                children = rng.permutation(children)
+            for child in children.tolist():
+                word = prefix + (child,)
+                if len(word) < self.n_syllables:
+                    yield from search(word)
+                elif self.is_first_spelling(word):
+                    yield word
+
+        if self.n_syllables > 0:
+            yield from search(())
+
+    def __iter__(self):
+        return self.iter_indexes()
+
+    def count_from(self, prefix: Tuple[int, ...]) -> int:
+        """The number of valid syllable sequences that start with `prefix` (memoized)"""
+        count = self._counts.get(prefix)
+        if count is None:
+            children = self.children(prefix)
+            if len(prefix) == self.n_syllables - 1:
+                count = len(children)
+            else:
+                count = sum(self.count_from(prefix + (child,)) for child in children.tolist())
+            self._counts[prefix] = count
+        return count
+
+    def count(self) -> int:
+        """
+        The exact number of valid words (distinct word ids). Counted from the subtree sizes if syllable sequences
+        spell distinct ids, otherwise by enumerating the space.
+        """
+        if self._count is None:
+            if self.n_syllables == 0:
+                self._count = 0
+            elif self.unique_ids:
+                self._count = self.count_from(())
+            else:
+                self._count = sum(1 for _ in self.iter_indexes())
+        return self._count
+
+    def _indexes_at(self, ranks: np.ndarray) -> List[Tuple[int, ...]]:
+        """The syllable sequences at `ranks` of the enumeration order, found by descending with the subtree sizes"""
+        found: List[Optional[Tuple[int, ...]]] = [None] * len(ranks)
+
+        def descend(prefix, prefix_ranks, positions):
+            children = self.children(prefix).tolist()
+            if len(prefix) == self.n_syllables - 1:
+                for rank, position in zip(prefix_ranks.tolist(), positions.tolist()):
+                    found[position] = prefix + (children[rank],)
+                return
+
+            sizes = np.array([self.count_from(prefix + (child,)) for child in children], dtype=np.int64)
+            ends = np.cumsum(sizes)
+            which = np.searchsorted(ends, prefix_ranks, side="right")
+            for j in np.unique(which).tolist():
+                selected = which == j
+                descend(prefix + (children[j],), prefix_ranks[selected] - (ends[j] - sizes[j]), positions[selected])
+
+        if len(ranks):
+            descend((), ranks, np.arange(len(ranks)))
+        return found
+
+    def sample_indexes(self, n: int, rng: Optional[np.random.Generator] = None) -> List[Tuple[int, ...]]:
+        """
+        A uniform random sample of `n` different valid words (all of them if there are fewer), in random order.
+        Draws ranks of the enumeration order and descends to the syllable sequences of these ranks with the subtree
+        counts. Sequences that are not the first spelling of their word id are rejected, and the sample is topped
+        up with ranks that were not drawn yet.
+        """
+        rng = rng if rng is not None else np.random.default_rng(np.random.randint(0, 2**31))
+        total = self.count_from(()) if self.n_syllables > 0 else 0
+        n = min(n, self.count())
+        sampled: List[Tuple[int, ...]] = []
+        drawn = set()
+        while len(sampled) < n:
+            # draw a few more ranks than missing words if some sequences are rejected
+            size = min((n - len(sampled)) * (1 if self.unique_ids else 2), total - len(drawn))
+            if len(drawn) > total // 2:
+                ranks = rng.choice(np.setdiff1d(np.arange(total), list(drawn)), size=size, replace=False)
+            else:
+                ranks = rng.choice(total, size=size, replace=False)
+                ranks = ranks[[rank not in drawn for rank in ranks.tolist()]]
+            drawn.update(ranks.tolist())
+            sampled.extend(indexes for indexes in self._indexes_at(ranks) if self.is_first_spelling(indexes))
+        return sampled[:n]
+
+    def words(self, shuffle: bool = False, rng: Optional[np.random.Generator] = None) -> Iterator[WordType]:
+        for indexes in self.iter_indexes(shuffle=shuffle, rng=rng):
+            yield word_from_syllables([self.syllables[i] for i in indexes])
 
 
 def make_words(syllables: RegisterType,
@@ -108,7 +538,12 @@ def make_words(syllables: RegisterType,
                n_words=10_000,
                max_tries=100_000,
                progress_bar: bool = True,
-               lang="deu"
+               lang="deu",
+               engine: Literal["loop", "vectorized", "enumerate"] = "loop",
+               batch_size: int = 4096,
+               seed: Optional[int] = None,
+               n_jobs: int = 1,
+               syllable_weighting: SyllableWeighting = "uniform",
                ) -> RegisterType:
     """_summary_
 
@@ -127,27 +562,66 @@ def make_words(syllables: RegisterType,
         n_words (_type_, optional): how many words to generate. Defaults to 10_000.
         max_tries (_type_, optional): how often to attemt to add a word to the Register, before the function gives up. Defaults to 100_000.
         progress_bar (bool, optional): print a progress bar based on 'n_words'. Defaults to True.
+        engine (str, optional): "loop" builds one word per try and filters the register afterwards. "vectorized" draws words in batches of syllable indexes and applies all controls per batch, so 'n_words' counts words after the controls and 'max_tries' counts candidate words. "enumerate" searches the space of valid words exhaustively and returns a uniform random sample of at most 'n_words' of them, it also records the exact number of valid words as 'n_valid_words'. Defaults to "loop".
+        batch_size (int, optional): how many candidate words to draw per batch with the "vectorized" engine. Defaults to 4096.
+        seed (int, optional): seed for the "vectorized" engine. The words for a given seed do not depend on 'n_jobs'. Defaults to None (drawn from numpy's global random state).
+        n_jobs (int, optional): number of worker processes for the "vectorized" engine (-1 for all CPUs). Defaults to 1.
+        syllable_weighting (str, optional): draw syllables "uniform"ly, proportional to their corpus frequency ("frequency") or inversely proportional to it ("inverse_frequency"). Frequency weighting needs syllables with corpus statistics. Not supported by the "enumerate" engine. Defaults to "uniform".
 
     Returns:
         RegisterType: The Register of words.
     """
 
+    controls = dict(
+        bigram_control=bigram_control,
+        bigram_alpha=bigram_alpha,
+        trigram_control=trigram_control,
+        trigram_alpha=trigram_alpha,
+        positional_control=positional_control,
+        positional_control_position=positional_control_position,
+        position_alpha=position_alpha,
+    )
+
+    if engine != "vectorized" and n_jobs != 1:
+        raise ValueError("n_jobs is only supported by the 'vectorized' engine.")
+
+    if engine == "vectorized":
+        words_register = generate_feature_words_vectorized(
+            syllables, num_syllables, n_look_back, phonotactic_control, n_words, max_tries,
+            controls=(controls if lang == "deu" else None), batch_size=batch_size, seed=seed, n_jobs=n_jobs,
+            syllable_weighting=syllable_weighting, progress_bar=progress_bar)
+        words_register.info["syllables_info"] = copy(syllables.info)
+        return words_register
+
+    if engine == "enumerate":
+        if syllable_weighting != "uniform":
+            raise ValueError("syllable_weighting is not supported by the 'enumerate' engine.")
+        space = WordSpace(syllables, num_syllables, n_look_back, phonotactic_control,
+                          controls=(controls if lang == "deu" else None))
+        n_valid_words = space.count()
+        if n_valid_words < n_words:
+            logger.warning(f"Only {n_valid_words} valid words exist, {n_words} were requested.")
+        words_register = Register({word.id: word for word in (
+            word_from_syllables([space.syllables[i] for i in indexes]) for indexes in space.sample_indexes(n_words))})
+        words_register.info = {"n_syllables_per_word": num_syllables, "n_look_back": n_look_back,
+                               "phonotactic_control": phonotactic_control, "n_valid_words": n_valid_words}
+        if space.word_controls is not None:
+            words_register.info.update(space.word_controls.info)
+        words_register.info["syllables_info"] = copy(syllables.info)
+        return words_register
+
+    if engine != "loop":
+        raise ValueError(f"engine '{engine}' unknown.")
+
     iter_tries = range(max_tries)
 
-    words_register = generate_feature_words(syllables, iter_tries, num_syllables, n_look_back, phonotactic_control, progress_bar, n_words)
+    words_register = generate_feature_words(syllables, iter_tries, num_syllables, n_look_back, phonotactic_control, progress_bar, n_words,
+                                            syllable_weighting=syllable_weighting)
+    words_register.info["syllable_weighting"] = syllable_weighting
 
     words_register.info["syllables_info"] = copy(syllables.info)
 
-    if bigram_control and lang=="deu":
-        logger.info("bigram control...")
-        words_register = filter_bigrams(words_register, p_val=bigram_alpha)
-
-    if trigram_control and lang=="deu":
-        logger.info("trigram control...")
-        words_register = filter_trigrams(words_register, p_val=trigram_alpha)
-
-    if positional_control and lang=="deu":
-        logger.info("positional control...")
-        words_register = filter_common_phoneme_words(words_register, p_threshold=position_alpha, position=positional_control_position)
+    if lang == "deu":
+        words_register = filter_words(words_register, **controls)
 
     return words_register
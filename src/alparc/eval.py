@@ -6,7 +6,7 @@ import pathlib
 from importlib import resources as importlib_resources
 from os import PathLike
 from typing import Iterable, Dict, Union, List, Type, Optional, Literal
-from functools import partial
+from functools import partial, lru_cache
 from copy import copy
 
 import numpy as np
@@ -21,12 +21,25 @@ from alparc.types.lexicon import LexiconType
 from alparc.types.stream import Stream
 
 from alparc.core.syllable import LABELS_C, LABELS_V, syllable_from_phonemes
-from alparc.core.word import Word, word_overlap_matrix
+from alparc.core.word import Word, word_from_syllables, word_overlap_matrix
 from alparc.core.stream import compute_rhythmicity_index_sylls_stream, get_oscillation_patterns
 
-ALL_DEFAULT_PHONEMES = load_phonemes(lang=None)
 SYLLABLE_FEAT_LABELS = [LABELS_C] + [LABELS_V]
 
+
+@lru_cache(maxsize=None)
+def get_default_phonemes() -> RegisterType:
+    """The full phoneme feature table, loaded on first use and cached for the lifetime of the process."""
+    return load_phonemes(lang=None)
+
+
+def __getattr__(name):
+    # `ALL_DEFAULT_PHONEMES` used to be loaded at import time, keep it available as a lazy module attribute
+    if name == "ALL_DEFAULT_PHONEMES":
+        return get_default_phonemes()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def to_syllable(syllable, syllable_type="cv"):
     says_cv = (syllable_type == "cv")
     says_cV = (syllable_type == "cV")
@@ -42,21 +55,19 @@ def to_syllable(syllable, syllable_type="cv"):
                           "All syllables must be of that type.")
     
     if is_diphthong:
-        syllable_obj = syllable_from_phonemes(ALL_DEFAULT_PHONEMES, syllable[:2], SYLLABLE_FEAT_LABELS)
+        syllable_obj = syllable_from_phonemes(get_default_phonemes(), syllable[:2], SYLLABLE_FEAT_LABELS)
         syllable_obj.id = syllable
         return syllable_obj
     
     if is_cV:
-        return syllable_from_phonemes(ALL_DEFAULT_PHONEMES, [syllable[:-2], syllable[-2:]], SYLLABLE_FEAT_LABELS)
+        return syllable_from_phonemes(get_default_phonemes(), [syllable[:-2], syllable[-2:]], SYLLABLE_FEAT_LABELS)
         
-    return syllable_from_phonemes(ALL_DEFAULT_PHONEMES, syllable, SYLLABLE_FEAT_LABELS)
+    return syllable_from_phonemes(get_default_phonemes(), syllable, SYLLABLE_FEAT_LABELS)
 
 def to_word(word, syllable_type="cv"):
     to_syllable_partial = partial(to_syllable, syllable_type=syllable_type)
     syllables_list = list(map(to_syllable_partial, word))
-    word_id = "".join(s.id for s in syllables_list)
-    word_features = list(list(tup) for tup in zip(*[s.info["binary_features"] for s in syllables_list]))
-    return Word(id=word_id, info={"binary_features": word_features}, syllables=syllables_list)
+    return word_from_syllables(syllables_list)
 
 def to_lexicon(lexicon, syllable_type="cv"):
     to_word_partial = partial(to_word, syllable_type=syllable_type)
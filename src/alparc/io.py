@@ -1,22 +1,22 @@
 import csv
-import json
 import logging
 import os
 import pathlib
 from importlib import resources as importlib_resources
 from os import PathLike
 from typing import Iterable, Dict, Union, List, Type, Optional, Literal
-from functools import partial
+from functools import partial, lru_cache
 from copy import copy
 
-import pandas as pd
 import numpy as np
-from scipy import stats
 
+from alparc import codec, schema
+from alparc.cache import cached_table, file_digest
 from alparc.phonecodes import phonecodes
 from alparc.types.base_types import Register, RegisterType
 
-from alparc.types.phoneme import PHONEME_FEATURE_LABELS, Phoneme
+from alparc.types.phoneme import PHONEME_FEATURE_LABELS, Phoneme, PhonemeFeatureTable, FEATURE_SYMBOLS, \
+    encode_feature_symbols
 from alparc.types.syllable import Syllable
 from alparc.types.word import Word
 from alparc.types.lexicon import Lexicon, LexiconType
@@ -43,6 +43,10 @@ SYLLABLES_DEFAULT_PATH_ENG = CORPUS_DEFAULT_PATH_CELEX / "syllables.csv"
 #SYLLABLES_DEFAULT_PATH_DEU = CORPUS_DEFAULT_PATH_CELEX / "GERMAN" / "EFS" / "EFS.CD"
 # SYLLABLES_DEFAULT_PATH_NLD = CORPUS_DEFAULT_PATH_CELEX / "DUTCH" / "EFS" / "EFS.CD"
 
+CORPUS_FILES = (BINARY_FEATURES_DEFAULT_PATH, SYLLABLES_DEFAULT_PATH_DEU_SPECIAL, IPA_BIGRAMS_DEFAULT_PATH,
+                IPA_TRIGRAMS_DEFAULT_PATH, IPA_SEG_DEFAULT_PATH, SYLLABLES_DEFAULT_PATH_ENG)
+"""The corpus files the generated syllables and words depend on"""
+
 RESULTS_DEFAULT_PATH = pathlib.Path("arc_results")
 SSML_RESULTS_DEFAULT_PATH = RESULTS_DEFAULT_PATH / "syllables"
 
@@ -65,6 +69,123 @@ def export_speech_synthesizer(syllables: Iterable[Syllable],
     print("Done")
 
 
+CORPUS_CACHE_VERSION = 1
+"""Version of the corpus processing below. Bump it whenever the processing changes to invalidate cached tables."""
+
+
+def corpus_digests() -> Dict[str, str]:
+    """sha256 of every existing corpus file, by file name"""
+    return {f"{pathlib.Path(str(path)).parent.name}/{path.name}": file_digest(str(path))
+            for path in CORPUS_FILES if os.path.exists(str(path))}
+
+
+def _p_vals_uniform(freqs: List[int]) -> np.ndarray:
+    from scipy import stats
+
+    return stats.uniform.sf(abs(stats.zscore(np.log(freqs))))
+
+
+def _process_phoneme_corpus(ipa_seg_path: Union[os.PathLike, str]) -> Dict[str, np.ndarray]:
+    with open(ipa_seg_path, "r", encoding='utf-8') as csv_file:
+        fdata = list(csv.reader(csv_file))[1:]
+
+    orders: Dict[str, List[int]] = {}
+    for phon, position_in_word in fdata:
+        phon = phon.replace('"', '').replace("g", "ɡ")
+        orders.setdefault(phon, []).append(int(position_in_word))
+
+    n_positions = [max(order) for order in orders.values()]
+    word_position_prob = np.zeros((len(orders), max(n_positions, default=0)), dtype=np.float64)
+    for i, order in enumerate(orders.values()):
+        for position in range(n_positions[i]):
+            word_position_prob[i, position] = order.count(position + 1) / len(order)
+
+    return {
+        "ids": np.array(list(orders), dtype=str),
+        "n_positions": np.array(n_positions, dtype=np.int64),
+        "word_position_prob": word_position_prob,
+    }
+
+
+def _process_syllables_corpus(syllables_corpus_path: Union[os.PathLike, str]) -> Dict[str, np.ndarray]:
+    with open(syllables_corpus_path, "r", encoding='utf-8') as csv_file:
+        data = list(csv.reader(csv_file))[1:]
+
+    # on conflicting entries, the last one wins (but the syllable keeps the position of its first occurrence)
+    syllables_dict: Dict[str, tuple] = {}
+    for syll_ipa, freq, prob in data:
+        info = (int(freq), float(prob))
+        if syll_ipa in syllables_dict and syllables_dict[syll_ipa] != info:
+            logger.info(f"Syllable '{syll_ipa}' with conflicting stats {info} != {syllables_dict[syll_ipa]}.")
+        syllables_dict[syll_ipa] = info
+
+    freqs, probs = zip(*syllables_dict.values()) if syllables_dict else ((), ())
+
+    return {
+        "ids": np.array(list(syllables_dict), dtype=str),
+        "freq": np.array(freqs, dtype=np.int64),
+        "prob": np.array(probs, dtype=np.float64),
+    }
+
+
+def _process_ngrams(ngrams_path: Union[os.PathLike, str], skip_first_row: bool = False) -> Dict[str, np.ndarray]:
+    with open(ngrams_path, "r", encoding='utf-8') as csv_file:
+        fdata = list(csv.reader(csv_file))[1:]
+
+    freqs = [int(data[1]) for data in fdata]
+    p_vals_uniform = _p_vals_uniform(freqs)
+
+    # on conflicting entries, the first one wins
+    ngrams_dict: Dict[str, tuple] = {}
+    for (ngram, freq), p_unif in zip(fdata[1:] if skip_first_row else fdata, p_vals_uniform):
+        ngram = ngram.replace('_', '').replace("g", "ɡ")
+        info = (int(freq), float(p_unif))
+
+        if ngram not in ngrams_dict:
+            ngrams_dict[ngram] = info
+        elif ngrams_dict[ngram] != info:
+            logger.info(f"N-gram '{ngram}' with conflicting stats {info} != {ngrams_dict[ngram]}.")
+
+    freqs, p_vals = zip(*ngrams_dict.values()) if ngrams_dict else ((), ())
+
+    return {
+        "ids": np.array(list(ngrams_dict), dtype=str),
+        "freq": np.array(freqs, dtype=np.int64),
+        "p_unif": np.array(p_vals, dtype=np.float64),
+    }
+
+
+def read_phoneme_corpus_table(ipa_seg_path: Union[os.PathLike, str] = IPA_SEG_DEFAULT_PATH) -> Dict[str, np.ndarray]:
+    """Processed phoneme corpus: phoneme `ids`, their `n_positions` and a (phoneme x position) `word_position_prob`"""
+    return cached_table("phoneme_corpus", ipa_seg_path, CORPUS_CACHE_VERSION,
+                        partial(_process_phoneme_corpus, ipa_seg_path))
+
+
+def read_syllables_table(lang: str = "deu") -> Dict[str, np.ndarray]:
+    """Processed syllable corpus: syllable `ids` with their corpus `freq` and `prob`"""
+    if lang == "deu":
+        syllables_corpus_path: Union[os.PathLike, str] = SYLLABLES_DEFAULT_PATH_DEU_SPECIAL
+    elif lang == "eng":
+        syllables_corpus_path: Union[os.PathLike, str] = SYLLABLES_DEFAULT_PATH_ENG
+    else:
+        raise ValueError(f"Language {lang} not supported.")
+
+    return cached_table("syllables", syllables_corpus_path, CORPUS_CACHE_VERSION,
+                        partial(_process_syllables_corpus, syllables_corpus_path))
+
+
+def read_bigrams_table(ipa_bigrams_path: Union[os.PathLike, str] = IPA_BIGRAMS_DEFAULT_PATH) -> Dict[str, np.ndarray]:
+    """Processed bigram corpus: bigram `ids` with their corpus `freq` and `p_unif`"""
+    return cached_table("bigrams", ipa_bigrams_path, CORPUS_CACHE_VERSION,
+                        partial(_process_ngrams, ipa_bigrams_path))
+
+
+def read_trigrams_table(ipa_trigrams_path: Union[os.PathLike, str] = IPA_TRIGRAMS_DEFAULT_PATH) -> Dict[str, np.ndarray]:
+    """Processed trigram corpus: trigram `ids` with their corpus `freq` and `p_unif`"""
+    return cached_table("trigrams", ipa_trigrams_path, CORPUS_CACHE_VERSION,
+                        partial(_process_ngrams, ipa_trigrams_path, skip_first_row=True))
+
+
 def read_phoneme_corpus(
         lang: Literal["deu", "eng"] = "eng",
 ) -> Register[str, Phoneme]:
@@ -82,27 +203,12 @@ def read_phoneme_corpus(
     logger.info("READ ORDER OF PHONEMES IN WORDS")
 
     # TODO: make language specific
-    ipa_seg_path: Union[os.PathLike, str] = IPA_SEG_DEFAULT_PATH
-
-    with open(ipa_seg_path, "r", encoding='utf-8') as csv_file:
-        fdata = list(csv.reader(csv_file))[1:]
+    table = read_phoneme_corpus_table(IPA_SEG_DEFAULT_PATH)
 
     phonemes = {}
-    for phon, position_in_word in fdata:
-        phon = phon.replace('"', '').replace("g", "ɡ")
-        position_in_word = int(position_in_word)
-        if phon in phonemes:
-            phonemes[phon].info["order"].append(position_in_word)
-        else:
-            phonemes[phon] = Phoneme(id=phon, info={"order": [position_in_word]})
-
-    for phon in phonemes:
-        positions = max(phonemes[phon].info["order"])
-        phonemes[phon].info["word_position_prob"] = {}
-        for position in range(positions):
-            phoneme_pos_prob = phonemes[phon].info["order"].count(position + 1) / len(phonemes[phon].info["order"])
-            phonemes[phon].info["word_position_prob"][position] = phoneme_pos_prob
-        del phonemes[phon].info["order"]
+    for phon, n_positions, probs in zip(table["ids"].tolist(), table["n_positions"].tolist(),
+                                        table["word_position_prob"].tolist()):
+        phonemes[phon] = Phoneme.trusted(id=phon, info={"word_position_prob": dict(enumerate(probs[:n_positions]))})
 
     return Register(phonemes)
 
@@ -116,114 +222,83 @@ def syll_to_ipa(syll, language="deu", from_format="xsampa"):
         raise ValueError(f"Unknown format {from_format}")
 
 
+def _syllables_from_table(table: Dict[str, np.ndarray], info_keys: List[str]) -> Register[str, Syllable]:
+    columns = [table[key].tolist() for key in info_keys]
+    return Register({
+        syll_id: Syllable.trusted(id=syll_id, phonemes=[], info=dict(zip(info_keys, values)))
+        for syll_id, *values in zip(table["ids"].tolist(), *columns)
+    })
+
+
 def read_syllables_corpus(
         lang: str = "deu",
 ) -> Register[str, Syllable]:
     logger.info("READ SYLLABLES, FREQUENCIES AND PROBABILITIES FROM CORPUS AND CONVERT SYLLABLES TO IPA")
-
-    if lang == "deu":
-        syllables_corpus_path: Union[os.PathLike, str] = SYLLABLES_DEFAULT_PATH_DEU_SPECIAL
-    elif lang == "eng":
-        syllables_corpus_path: Union[os.PathLike, str] = SYLLABLES_DEFAULT_PATH_ENG
-    else:
-        raise ValueError(f"Language {lang} not supported.")
-    
-    with open(syllables_corpus_path, "r", encoding='utf-8') as csv_file:
-        data = list(csv.reader(csv_file))[1:]
-
-    syllables_dict: Dict[str, Syllable] = {}
-
-    for syll_ipa, freq, prob in data:
-        info = {"freq": int(freq), "prob": float(prob)}
-        if syll_ipa not in syllables_dict or syllables_dict[syll_ipa].info != info:
-            syllables_dict[syll_ipa] = Syllable(
-                id=syll_ipa, phonemes=[], info=info, binary_features=[], phonotactic_features=[])
-        else:
-            logger.info(
-                f"Syllable '{syll_ipa}' with conflicting stats {info} != {syllables_dict[syll_ipa].info}."
-            )
-
-    return Register(syllables_dict)
+    return _syllables_from_table(read_syllables_table(lang=lang), ["freq", "prob"])
 
 
 def read_bigrams(
     ipa_bigrams_path: str = IPA_BIGRAMS_DEFAULT_PATH,
 ) -> Register[str, Syllable]:
     logger.info("READ BIGRAMS")
-
-    with open(ipa_bigrams_path, "r", encoding='utf-8') as csv_file:
-        fdata = list(csv.reader(csv_file))[1:]
-
-    freqs = [int(data[1]) for data in fdata]
-    p_vals_uniform = stats.uniform.sf(abs(stats.zscore(np.log(freqs))))
-
-    bigrams_dict: Dict[str, Syllable] = {}
-
-    for (bigram, freq), p_unif in zip(fdata, p_vals_uniform):
-        bigram = bigram.replace('_', '').replace("g", "ɡ")
-        info = {"freq": int(freq), "p_unif": p_unif}
-
-        if bigram not in bigrams_dict or bigrams_dict[bigram].info == info:
-            # a bigram is not necessarily a syllable but in our type system they are equivalent
-            bigrams_dict[bigram] = Syllable(id=bigram, phonemes=[], info=info)
-        else:
-            logger.info(
-                f"Bigram '{bigram}' with conflicting stats {info} != {bigrams_dict[bigram].info}."
-            )
-            # del bigrams_dict[bigram]
-
-    return Register(bigrams_dict)
+    # a bigram is not necessarily a syllable but in our type system they are equivalent
+    return _syllables_from_table(read_bigrams_table(ipa_bigrams_path), ["freq", "p_unif"])
 
 
 def read_trigrams(
         ipa_trigrams_path: str = IPA_TRIGRAMS_DEFAULT_PATH,
 ) -> Register[str, Syllable]:
     logger.info("READ TRIGRAMS")
-    
-    with open(ipa_trigrams_path, "r", encoding='utf-8') as csv_file:
-        fdata = list(csv.reader(csv_file))[1:]
+    return _syllables_from_table(read_trigrams_table(ipa_trigrams_path), ["freq", "p_unif"])
 
-    freqs = [int(data[1]) for data in fdata]
-    p_vals_uniform = stats.uniform.sf(abs(stats.zscore(np.log(freqs))))
 
-    trigrams = Register()
-    for (trigram, freq), p_unif in zip(fdata[1:], p_vals_uniform):
-        trigram = trigram.replace('_', '').replace("g", "ɡ")
-        info = {"freq": int(freq), "p_unif": p_unif}
+@lru_cache(maxsize=None)
+def read_phoneme_feature_table(
+        binary_features_path: Union[os.PathLike, str] = BINARY_FEATURES_DEFAULT_PATH
+) -> PhonemeFeatureTable:
+    """
+    Parse the phoneme feature csv once per process and compile it into an int8 feature matrix with an
+    id -> row index. For phonemes with conflicting entries, the first one is kept.
+    """
+    logger.info("COMPILE MATRIX OF BINARY FEATURES FOR ALL IPA PHONEMES")
+
+    with open(binary_features_path, "r", encoding='utf-8') as csv_file:
+        fdata = list(csv.reader(csv_file))
 
-        if trigram not in trigrams or trigrams[trigram].info == info:
-            trigrams[trigram] = Syllable(id=trigram, phonemes=[], info=info)
-        else:
+    phoneme_feature_labels = fdata[0][1:]
+
+    assert phoneme_feature_labels == PHONEME_FEATURE_LABELS
+
+    features_dict: Dict[str, List[str]] = {}
+    for phon, *features in fdata[1:]:
+        if phon not in features_dict:
+            features_dict[phon] = features
+        elif features != features_dict[phon]:
             logger.info(
-                f"Trigram '{trigram}' with conflicting stats {info} != {trigrams[trigram].info}."
-            )
+                f"Phoneme '{phon}' with conflicting "
+                f"feature entries {features} != {features_dict[phon]}.")
+
+    ids = list(features_dict)
+    features = np.stack([encode_feature_symbols(features) for features in features_dict.values()])
+    features.setflags(write=False)
 
-    return trigrams
+    return PhonemeFeatureTable(
+        ids=ids, index={phon: i for i, phon in enumerate(ids)}, labels=phoneme_feature_labels, features=features
+    )
 
 
 def read_default_phonemes() -> Register:
     logger.info("READ MATRIX OF BINARY FEATURES FOR ALL IPA PHONEMES")
 
-    with open(BINARY_FEATURES_DEFAULT_PATH, "r", encoding='utf-8') as csv_file:
-        fdata = list(csv.reader(csv_file))
-
-    phons = [row[0] for row in fdata[1:]]
-    feats = [row[1:] for row in fdata[1:]]
-    phoneme_feature_labels = fdata[0][1:]
-
-    assert phoneme_feature_labels == PHONEME_FEATURE_LABELS
+    table = read_phoneme_feature_table()
 
     phonemes_dict = {}
-    for phon, features in zip(phons, feats):
-        if phon not in phonemes_dict or features == phonemes_dict[phon].info["features"]:
-            phonemes_dict[phon] = Phoneme(id=phon, info={"features": features})
-        else:
-            logger.info(
-                f"Phoneme '{phon}' with conflicting "
-                f"feature entries {features} != {phonemes_dict[phon].info['features']}.")
-            # del phonemes_dict[phon]
+    for phon, feature_codes in zip(table.ids, table.features):
+        phoneme = Phoneme.trusted(id=phon, info={"features": [FEATURE_SYMBOLS[code] for code in feature_codes.tolist()]})
+        phoneme._feature_codes = feature_codes
+        phonemes_dict[phon] = phoneme
 
-    return Register(phonemes_dict, _info={"phoneme_feature_labels": phoneme_feature_labels})
+    return Register(phonemes_dict, _info={"phoneme_feature_labels": list(table.labels)})
 
 
 def check_german(words: List[Word]):
@@ -255,18 +330,14 @@ def check_german(words: List[Word]):
     return words
 
 
-def arc_register_from_json(path: Union[str, PathLike], arc_type: Type) -> RegisterType:
+def arc_register_from_json(path: Union[str, PathLike], arc_type: Type, trusted: bool = False) -> RegisterType:
     """
     Load an arc register from a json file.
+    The elements are validated, unless `trusted` is set: then they are constructed without validation, which is
+    faster, but only for files written by alparc itself (never for edited files or files from other sources).
     """
-    with open(path, "r", encoding='utf-8') as file:
-        d = json.load(file)
-
-    # we have to process the "_info" field separately because it's not a valid ARC type
-    register = Register({k: arc_type(**v) for k, v in d.items() if k != "_info"})
-    register.info = d["_info"]
-
-    return register
+    with open(path, "rb") as file:
+        return codec.decode_register(file.read(), arc_type, trusted=trusted)
 
 
 def load_phonemes(lang: Optional[Literal["deu", "eng"]] = "deu") -> RegisterType:
@@ -286,23 +357,29 @@ def load_phonemes(lang: Optional[Literal["deu", "eng"]] = "deu") -> RegisterType
     return phonemes
 
 
-def load_syllables(path_to_json: Union[str, PathLike]):
-    return arc_register_from_json(path_to_json, Syllable)
+def load_syllables(path_to_json: Union[str, PathLike], trusted: bool = False):
+    return arc_register_from_json(path_to_json, Syllable, trusted=trusted)
+
 
+def load_words(path_to_json: Union[str, PathLike], trusted: bool = False):
+    return arc_register_from_json(path_to_json, Word, trusted=trusted)
 
-def load_words(path_to_json: Union[str, PathLike]):
-    return arc_register_from_json(path_to_json, Word)
+def save_lexicons(lexicons: Iterable[LexiconType], path: Union[str, PathLike]):
+    """Write lexicons to one json file (schema version 2: the words of all lexicons are stored once)"""
+    with open(path, "wb") as file:
+        file.write(codec.encode_lexicons(list(lexicons)))
+
+def load_lexicons(path_to_json: Union[str, PathLike], trusted: bool = False) -> List[LexiconType]:
+    """
+    Load the lexicons of a file written by `save_lexicons` (schema version 2), or the lexicon of a file written by
+    `lexicon.save` (schema version 1 or 2), as a list of word registers.
+    """
+    with open(path_to_json, "rb") as file:
+        d = codec.decode(file.read())
 
-def load_lexicons(path_to_json: Union[str, PathLike]):
-    return arc_register_from_json(path_to_json, LexiconType)
+    if schema.schema_version(d) == schema.SCHEMA_VERSION and d.get("type") == schema.LEXICONS_TYPE:
+        return schema.denormalize_lexicons(d, trusted=trusted)
+    return [codec.register_from_dict(d, Word, trusted=trusted)]
 
-def load_streams(path_to_json: Union[str, PathLike]):
-    register = arc_register_from_json(path_to_json, Stream)
-    #for stream in register:
-    #    if "lexicon" in stream.info.keys():
-    #        data = stream.info["lexicon"]
-    #        print(data)
-    #        lexicon = Lexicon({k: Word(**v) for k, v in data.items() if k != "info"})
-    #        lexicon.info = data["info"]
-    #        stream.info["lexicon"] = lexicon
-    return register
+def load_streams(path_to_json: Union[str, PathLike], trusted: bool = False):
+    return arc_register_from_json(path_to_json, Stream, trusted=trusted)
@@ -0,0 +1,126 @@
+"""Incremental JSON Lines output: records are serialized and written by a background thread while results are computed"""
+import hashlib
+import os
+import queue
+import threading
+from os import PathLike
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from alparc import codec
+
+_CLOSE = object()
+
+
+class JsonlWriter:
+    """
+    Append records to a JSON Lines file from a background thread, so that serialization and file I/O overlap with
+    the computation that produces the records. `flush` waits for all queued records and fsyncs the file, e.g. at
+    the end of a pipeline stage. Errors of the writer thread are raised by the next `write`, `flush` or `close`.
+
+    Records must not be modified after they were passed to `write`.
+    """
+
+    def __init__(self, path: Union[str, PathLike], backend: Optional[str] = None, max_queued: int = 1024):
+        self.path = path
+        self._backend = codec.get_json_backend(backend)
+        self._file = open(path, "ab")
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queued)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name=f"JsonlWriter({os.path.basename(path)})", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            try:
+                if record is _CLOSE:
+                    return
+                if self._error is None:
+                    self._file.write(self._backend.dumps(record) + b"\n")
+            except BaseException as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"Writing to {self.path} failed.") from self._error
+
+    def write(self, record: Any):
+        self._raise_error()
+        self._queue.put(record)
+
+    def flush(self, fsync: bool = True):
+        """Wait until all records are written, then flush (and fsync) the file"""
+        self._queue.join()
+        self._raise_error()
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._file.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_lines(file) -> Iterator[Tuple[int, bytes]]:
+    offset = 0
+    for line in file:
+        if not line.endswith(b"\n"):
+            break
+        if line.strip():
+            yield offset, line
+        offset += len(line)
+
+
+def read_jsonl(path: Union[str, PathLike], backend: Optional[str] = None) -> Iterator[Any]:
+    """The records of a JSON Lines file. An incomplete last line (e.g. after a crash) is skipped."""
+    json_backend = codec.get_json_backend(backend)
+    with open(path, "rb") as file:
+        for _, line in _read_lines(file):
+            yield json_backend.loads(line)
+
+
+def read_jsonl_unique(path: Union[str, PathLike], key: str = "key", backend: Optional[str] = None) -> Iterator[Any]:
+    """
+    The records of a JSON Lines file with distinct `key`s, as if they were collected in a dict: in the order of the
+    first record of each key, with the last record of that key. The file is read twice, and only a digest per key
+    and the offsets of replaced records are kept in memory.
+    """
+    json_backend = codec.get_json_backend(backend)
+
+    def digest(record: Any) -> bytes:
+        return hashlib.blake2b(str(record[key]).encode("utf-8"), digest_size=16).digest()
+
+    first: Dict[bytes, int] = {}
+    last: Dict[bytes, Tuple[int, int]] = {}
+    with open(path, "rb") as file:
+        for i, (offset, line) in enumerate(_read_lines(file)):
+            record_digest = digest(json_backend.loads(line))
+            first.setdefault(record_digest, i)
+            last[record_digest] = i, offset
+    replacements = {first[record_digest]: offset for record_digest, (i, offset) in last.items()
+                    if i != first[record_digest]}
+    del last
+
+    with open(path, "rb") as file, open(path, "rb") as replacement_file:
+        for i, (_, line) in enumerate(_read_lines(file)):
+            record = json_backend.loads(line)
+            if first[digest(record)] != i:
+                continue
+            if i in replacements:
+                replacement_file.seek(replacements[i])
+                record = json_backend.loads(replacement_file.readline())
+            yield record
@@ -0,0 +1,230 @@
+"""
+On-disk schema version 2: normalized, reference-based json for registers and lexicons.
+
+Schema version 1 is the plain dump of a register, `{key: element, ..., "_info": info}`, with every nested phoneme
+and syllable written out in full at every occurrence. In version 2, the sub-elements are stored once, in tables,
+and referenced by their row index:
+
+    {
+        "_schema": 2,
+        "type": "Stream",
+        "types": {"phonemes": "Phoneme", "syllables": "Syllable"},
+        "tables": {
+            "phonemes": [{"id": "p", "info": {...}}, ...],
+            "syllables": [{"id": "pi", "phonemes": [0, 3], "info": {...}}, ...],
+            "lexicons": [{"id": "piɾuta_...", "info": {...}}, ...]
+        },
+        "elements": {"<key>": {"id": ..., "syllables": [12, 4, 7, ...], "info": {...}}, ...},
+        "_info": {...}
+    }
+
+A field that holds sub-elements references the table of the same name. The `lexicon_info` of streams (and its
+spread copy in the stream info) is replaced by the row index of the lexicon in the "lexicons" table, see
+`alparc.store.pack_stream_info`.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from alparc.store import pack_stream_info, is_packed_stream_info, unpack_stream_info, lexicon_rows
+
+SCHEMA_KEY = "_schema"
+SCHEMA_VERSION = 2
+INFO_KEY = "_info"
+LEXICONS_TYPE = "Lexicons"
+"""`type` of a file with a list of lexicons (word registers) in the "lexicons" table, see `normalize_lexicons`"""
+
+
+def element_types() -> Dict[str, type]:
+    from alparc.types.phoneme import Phoneme
+    from alparc.types.syllable import Syllable
+    from alparc.types.word import Word
+    from alparc.types.stream import Stream
+
+    return {cls.__name__: cls for cls in (Phoneme, Syllable, Word, Stream)}
+
+
+def schema_version(d: Dict[str, Any]) -> int:
+    """Schema version of a decoded json file (files without a version are version 1)"""
+    return d.get(SCHEMA_KEY, 1)
+
+
+class _TableWriter:
+    def __init__(self):
+        self.tables: Dict[str, List[dict]] = {}
+        self.types: Dict[str, str] = {}
+        self._by_object: Dict[int, int] = {}
+        self._by_id: Dict[tuple, List[int]] = {}
+
+    def _add(self, table: str, row: dict) -> int:
+        """Row index of `row` in `table`, appended if no equal row is in the table yet"""
+        rows = self.tables.setdefault(table, [])
+        candidates = self._by_id.setdefault((table, row.get("id")), [])
+        for i in candidates:
+            if rows[i] == row:
+                return i
+        candidates.append(len(rows))
+        rows.append(row)
+        return len(rows) - 1
+
+    def ref(self, table: str, element: BaseModel) -> int:
+        # the same object is looked up by identity, equal objects (e.g. after a validated load) by content
+        i = self._by_object.get(id(element))
+        if i is None:
+            self.types[table] = type(element).__name__
+            i = self._by_object[id(element)] = self._add(table, self.row(element))
+        return i
+
+    def row(self, element: BaseModel) -> dict:
+        if not isinstance(element, BaseModel):
+            # a register (or other mapping) as element, e.g. a register of lexicons: the rows of its items
+            return {key: (self.row(item) if isinstance(item, BaseModel) else item) for key, item in dict.items(element)}
+        row = {}
+        for name, value in element.__dict__.items():
+            if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+                value = [self.ref(name, sub_element) for sub_element in value]
+            row[name] = value
+        return row
+
+    def element_row(self, element: BaseModel) -> dict:
+        """Row of a top-level element, with its lexicon info moved to the "lexicons" table"""
+        row = self.row(element)
+        info = row.get("info")
+        if isinstance(info, dict) and isinstance(info.get("lexicon_info"), dict):
+            lexicon = self._add("lexicons", {"id": info.get("lexicon"), "info": info["lexicon_info"]})
+            row["info"] = pack_stream_info(info, lexicon)
+        return row
+
+    def document(self, element_type: str, info: dict, elements: Optional[dict] = None) -> dict:
+        d = {SCHEMA_KEY: SCHEMA_VERSION, "type": element_type, "types": self.types, "tables": self.tables}
+        if elements is not None:
+            d["elements"] = elements
+        d[INFO_KEY] = info
+        return d
+
+
+def normalize_register(register) -> dict:
+    """The schema 2 json object of a register"""
+    writer = _TableWriter()
+    elements = {key: writer.element_row(element) for key, element in dict.items(register)}
+    element_type = type(register[0]).__name__ if len(register) else None
+    return writer.document(element_type, register.info, elements)
+
+
+def normalize_lexicons(lexicons) -> dict:
+    """The schema 2 json object of a list of lexicons (registers of words), with the words in a shared table"""
+    writer = _TableWriter()
+    for lexicon in lexicons:
+        writer.tables.setdefault("lexicons", []).append({
+            "id": str(lexicon),
+            "words": [writer.ref("words", word) for word in lexicon],
+            "info": lexicon.info,
+        })
+    writer.types["lexicons"] = LEXICONS_TYPE
+    return writer.document(LEXICONS_TYPE, {})
+
+
+def normalize_stream_records(records: Iterable[dict], lexicons,
+                             info: Optional[dict] = None) -> Tuple[dict, Iterator[Tuple[str, dict]]]:
+    """
+    The schema 2 json object of the streams of `records` (see `alparc.store.stream_record`), made from `lexicons`,
+    without its elements (an empty placeholder), and a generator of the (key, row) pairs of the elements. The
+    tables are made from the lexicons up front, so the records are converted one at a time, e.g. for
+    `alparc.codec.write_document`.
+    """
+    writer = _TableWriter()
+    syllable_refs = {}
+    for lexicon in lexicons:
+        for word in lexicon:
+            for syllable in word:
+                if syllable.id not in syllable_refs:
+                    syllable_refs[syllable.id] = writer.ref("syllables", syllable)
+    # the packed stream infos refer to the lexicons by position
+    writer.tables["lexicons"] = lexicon_rows(lexicons)
+
+    rows = ((record["key"], {"id": record["id"], "syllables": [syllable_refs[i] for i in record["syllables"]],
+                             "info": record["info"]})
+            for record in records)
+    return writer.document("Stream", info or {}, {}), rows
+
+
+class LazyTable:
+    """The rows of a table, each turned into an object on first access (and shared by everything that uses it)"""
+
+    def __init__(self, rows: List[dict], build: Callable[[dict], Any]):
+        self.rows = rows
+        self.build = build
+        self._objects: List[Any] = [None] * len(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i: int):
+        obj = self._objects[i]
+        if obj is None:
+            obj = self._objects[i] = self.build(self.rows[i])
+        return obj
+
+
+class _TableReader:
+    def __init__(self, d: dict, trusted: bool = False):
+        self.types = element_types()
+        self.trusted = trusted
+        self.tables: Dict[str, LazyTable] = {}
+        for name, rows in d.get("tables", {}).items():
+            type_name = d.get("types", {}).get(name)
+            if name == "lexicons":
+                build = self.build_lexicon
+            else:
+                build = self.builder(self.types[type_name])
+            self.tables[name] = LazyTable(rows, build)
+
+    def fields(self, row: dict) -> dict:
+        return {name: ([self.tables[name][i] for i in value] if name in self.tables else value)
+                for name, value in row.items()}
+
+    def builder(self, cls: type) -> Callable[[dict], Any]:
+        if self.trusted:
+            return lambda row: cls.trusted(**self.fields(row))
+        return lambda row: cls(**self.fields(row))
+
+    def build_lexicon(self, row: dict):
+        if "words" not in row:
+            return row["info"]
+
+        from alparc.types.base_types import Register
+        lexicon = Register({word.id: word for word in (self.tables["words"][i] for i in row["words"])})
+        lexicon.info = row["info"]
+        return lexicon
+
+    def unpack_lexicon_info(self, row: dict) -> dict:
+        info = row.get("info")
+        if isinstance(info, dict) and is_packed_stream_info(info):
+            row = {**row, "info": unpack_stream_info(info, self.tables["lexicons"][info["lexicon_info"]])}
+        return row
+
+
+def denormalize_register(d: dict, arc_type: Optional[type] = None, trusted: bool = False):
+    """The register of a schema 2 json object. Sub-elements are built once, on first use, and shared."""
+    from alparc.types.base_types import Register
+
+    if d.get("type") == LEXICONS_TYPE:
+        raise ValueError("This file holds lexicons, load it with `load_lexicons`.")
+    if arc_type is not None and d.get("type") not in (None, arc_type.__name__):
+        raise ValueError(f"Expected a register of {arc_type.__name__}, got {d.get('type')}.")
+
+    reader = _TableReader(d, trusted=trusted)
+    if arc_type is None and d.get("type") not in reader.types:
+        raise ValueError(f"Registers of {d.get('type')} can not be loaded.")
+    build = reader.builder(arc_type or reader.types[d["type"]])
+    register = Register({key: build(reader.unpack_lexicon_info(row)) for key, row in d["elements"].items()})
+    register.info = d.get(INFO_KEY, {})
+    return register
+
+
+def denormalize_lexicons(d: dict, trusted: bool = False) -> list:
+    """The list of lexicons of a schema 2 json object written by `normalize_lexicons`"""
+    if d.get("type") != LEXICONS_TYPE:
+        raise ValueError(f"Expected lexicons, got a register of {d.get('type')}.")
+    lexicons = _TableReader(d, trusted=trusted).tables.get("lexicons", [])
+    return [lexicons[i] for i in range(len(lexicons))]
@@ -0,0 +1,227 @@
+"""
+Binary, memory-mapped store of streams, for analyses that read many streams as syllable index sequences.
+
+A store is a directory with
+
+- `syllables.npy`: the syllable indexes of all streams, concatenated (int32),
+- `offsets.npy`: stream i is `syllables[offsets[i]:offsets[i + 1]]` (int64, one more entry than streams),
+- `features.npy` (if all syllables have binary features): the binary features of every syllable index (int8),
+- `manifest.json`: the syllable ids of the indexes, stream keys, ids and infos, and the register info.
+
+Reading a store needs numpy and json only (no pydantic, no alparc types), and slices of streams are zero-copy views
+into the memory-mapped index array. Stores are written one stream at a time, either from a register of streams or
+from stream records (see `stream_record`), without holding all streams in memory.
+"""
+import json
+import os
+import pathlib
+from os import PathLike
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+STORE_FORMAT = "alparc-stream-store"
+STORE_VERSION = 1
+MANIFEST = "manifest.json"
+SYLLABLES = "syllables.npy"
+OFFSETS = "offsets.npy"
+FEATURES = "features.npy"
+
+
+def pack_stream_info(info: Dict[str, Any], lexicon_ref: Any) -> Dict[str, Any]:
+    """
+    The info of a stream with its `lexicon_info` replaced by `lexicon_ref` (e.g. a row index into a table of
+    lexicons) and without the copy of the lexicon info that `make_streams` spreads into the stream info
+    """
+    lexicon_info = info["lexicon_info"]
+    spread = bool(lexicon_info) and all(key in info and info[key] == value for key, value in lexicon_info.items())
+    packed = {key: (lexicon_ref if key == "lexicon_info" else value) for key, value in info.items()
+              if not (spread and key in lexicon_info)}
+    packed["lexicon_info_spread"] = spread
+    return packed
+
+
+def is_packed_stream_info(info: Dict[str, Any]) -> bool:
+    return "lexicon_info_spread" in info
+
+
+def unpack_stream_info(packed: Dict[str, Any], lexicon_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of `pack_stream_info`, given the lexicon info that `lexicon_ref` refers to"""
+    info = {key: (lexicon_info if key == "lexicon_info" else value) for key, value in packed.items()
+            if key != "lexicon_info_spread"}
+    if packed["lexicon_info_spread"]:
+        info.update(lexicon_info)
+    return info
+
+
+def stream_record(key: str, stream, lexicon_positions: Dict[str, int]) -> Dict[str, Any]:
+    """
+    A compact record of a stream: its key, id, syllable ids, and its info packed with the position of its lexicon
+    (in the list of lexicons the streams were made from) as `lexicon_info`
+    """
+    return {
+        "key": key,
+        "id": stream.id,
+        "syllables": [syllable.id for syllable in stream.syllables],
+        "info": pack_stream_info(stream.info, lexicon_positions[stream.info["lexicon"]]),
+    }
+
+
+def lexicon_rows(lexicons) -> List[Dict[str, Any]]:
+    """The id and info of every lexicon, in order, as referenced by the packed infos of stream records"""
+    return [{"id": str(lexicon), "info": lexicon.info} for lexicon in lexicons]
+
+
+def _pack_store_stream_info(info: Dict[str, Any], lexicons: List[dict], lexicon_index: Dict[str, int]):
+    if not isinstance(info.get("lexicon_info"), dict):
+        return info
+
+    key = json.dumps([info.get("lexicon"), info["lexicon_info"]], sort_keys=True, default=str)
+    if key not in lexicon_index:
+        lexicon_index[key] = len(lexicons)
+        lexicons.append({"id": info.get("lexicon"), "info": info["lexicon_info"]})
+    return pack_stream_info(info, lexicon_index[key])
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+def _write_store(path: Union[str, PathLike], entries: Iterable[Tuple[str, str, List[str], Dict[str, Any]]],
+                 syllables: Dict[str, Any], lexicons: List[dict], info: Dict[str, Any]) -> pathlib.Path:
+    """
+    Write the streams `entries` (key, id, syllable ids, info) one at a time: the syllable indexes go to a raw file
+    and the stream entries to the manifest as they come. `syllables` (id -> syllable, for the features) and
+    `lexicons` (referenced by packed infos) are read after all entries, they can be filled while they are consumed.
+    """
+    path = pathlib.Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    syllable_index: Dict[str, int] = {}
+    lengths = []
+    raw_path, manifest_path = path / (SYLLABLES + ".tmp"), path / (MANIFEST + ".tmp")
+    with open(raw_path, "wb") as raw, open(manifest_path, "w", encoding="utf-8") as manifest:
+        manifest.write(f'{{"format": {_dumps(STORE_FORMAT)}, "version": {STORE_VERSION}, "streams": [')
+        for i, (key, stream_id, syllable_ids, stream_info) in enumerate(entries):
+            raw.write(np.fromiter((syllable_index.setdefault(syllable_id, len(syllable_index))
+                                   for syllable_id in syllable_ids), dtype=np.int32, count=len(syllable_ids)).tobytes())
+            lengths.append(len(syllable_ids))
+            manifest.write((", " if i else "") + _dumps({"key": key, "id": stream_id, "info": stream_info}))
+
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        np.save(path / OFFSETS, offsets)
+
+        raw.flush()
+        indexes = np.lib.format.open_memmap(path / SYLLABLES, mode="w+", dtype=np.int32, shape=(int(offsets[-1]),))
+        if len(indexes):
+            indexes[:] = np.memmap(raw_path, dtype=np.int32, mode="r", shape=indexes.shape)
+        indexes.flush()
+        del indexes
+
+        store_syllables = [syllables[syllable_id] for syllable_id in syllable_index]
+        has_features = bool(store_syllables) and all("binary_features" in syllable.info for syllable in store_syllables)
+        if has_features:
+            np.save(path / FEATURES, np.array([syllable.info["binary_features"] for syllable in store_syllables],
+                                              dtype=np.int8))
+
+        manifest.write(f'], "n_streams": {len(lengths)}, "syllables": {_dumps(list(syllable_index))}, '
+                       f'"features": {_dumps(has_features)}, "lexicons": {_dumps(lexicons)}, "info": {_dumps(info)}}}')
+
+    os.remove(raw_path)
+    os.replace(manifest_path, path / MANIFEST)
+    return path
+
+
+def write_stream_store(streams, path: Union[str, PathLike]) -> pathlib.Path:
+    """
+    Write a register of streams as a stream store in the directory `path`. The manifest is written last, so a
+    directory with a manifest holds a complete store.
+    """
+    syllables: Dict[str, Any] = {}
+    lexicons, lexicon_index = [], {}
+
+    def entries():
+        for key, stream in dict.items(streams):
+            for syllable in stream.syllables:
+                syllables.setdefault(syllable.id, syllable)
+            yield key, stream.id, [syllable.id for syllable in stream.syllables], \
+                _pack_store_stream_info(stream.info, lexicons, lexicon_index)
+
+    return _write_store(path, entries(), syllables, lexicons, streams.info)
+
+
+def write_stream_store_records(records: Iterable[Dict[str, Any]], lexicons, path: Union[str, PathLike],
+                               info: Optional[Dict[str, Any]] = None) -> pathlib.Path:
+    """
+    Write the stream records (see `stream_record`) of streams made from `lexicons` as a stream store, one stream at
+    a time, e.g. while reading them from a JSON Lines file
+    """
+    syllables = {syllable.id: syllable for lexicon in lexicons for word in lexicon for syllable in word}
+    entries = ((record["key"], record["id"], record["syllables"], record["info"]) for record in records)
+    return _write_store(path, entries, syllables, lexicon_rows(lexicons), info or {})
+
+
+class StreamStore:
+    """
+    Read-only view of a stream store. `store[i]` (or `store[key]`) is the syllable index array of a stream, a
+    zero-copy slice of the memory-mapped `syllables.npy`. `syllable_ids` maps the indexes to syllable ids.
+    """
+
+    def __init__(self, path: Union[str, PathLike], mmap_mode: str = "r"):
+        self.path = pathlib.Path(path)
+        with open(self.path / MANIFEST, "r", encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        if self.manifest.get("format") != STORE_FORMAT or self.manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"{self.path} is not a stream store of version {STORE_VERSION}.")
+
+        self.syllables: np.ndarray = np.load(self.path / SYLLABLES, mmap_mode=mmap_mode)
+        self.offsets: np.ndarray = np.load(self.path / OFFSETS)
+        self.syllable_ids: List[str] = self.manifest["syllables"]
+        self.features = np.load(self.path / FEATURES, mmap_mode=mmap_mode) if self.manifest["features"] else None
+        self._positions = {entry["key"]: i for i, entry in enumerate(self.manifest["streams"])}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def keys(self) -> List[str]:
+        return list(self._positions)
+
+    def position(self, item: Union[int, str]) -> int:
+        return self._positions[item] if isinstance(item, str) else range(len(self))[item]
+
+    def __getitem__(self, item: Union[int, str]) -> np.ndarray:
+        i = self.position(item)
+        return self.syllables[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def ids(self, item: Union[int, str]) -> List[str]:
+        """The syllable ids of a stream"""
+        return [self.syllable_ids[index] for index in self[item].tolist()]
+
+    def stream_features(self, item: Union[int, str]) -> np.ndarray:
+        """(n_syllables x n_features) binary features of the syllables of a stream"""
+        if self.features is None:
+            raise ValueError("The store has no syllable features.")
+        return self.features[self[item]]
+
+    def info(self, item: Union[int, str]) -> Dict[str, Any]:
+        """The info of a stream, as in the register it was written from"""
+        info = self.manifest["streams"][self.position(item)]["info"]
+        if is_packed_stream_info(info):
+            return unpack_stream_info(info, self.manifest["lexicons"][info["lexicon_info"]]["info"])
+        return dict(info)
+
+    @property
+    def register_info(self) -> Dict[str, Any]:
+        return self.manifest["info"]
+
+
+def open_stream_store(path: Union[str, PathLike], mmap_mode: str = "r") -> StreamStore:
+    return StreamStore(path, mmap_mode=mmap_mode)
@@ -0,0 +1,224 @@
+"""
+Columnar export of stream datasets: one table of streams (one row per stream, one column per feature PRI) and one
+table of lexicons, written as Parquet if pyarrow is installed and as gzipped CSV otherwise. Both load with a single
+call, e.g. `pandas.read_parquet("streams.parquet")` or `pandas.read_csv("streams.csv.gz")`.
+
+The tables are made from a register of streams, or from stream records (see `alparc.store.stream_record`), which are
+written in batches of rows, so that the streams never have to be in memory all at once.
+"""
+import csv
+import gzip
+import importlib.util
+import json
+import pathlib
+from os import PathLike
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Union
+
+import numpy as np
+
+from alparc.store import unpack_stream_info
+
+Table = Dict[str, np.ndarray]
+TableFormat = Literal["auto", "parquet", "csv"]
+
+SCALAR_TYPES = (bool, int, float, str, np.generic)
+ColumnKind = Literal["int", "float", "bool", "object"]
+
+
+def _column_kind(types: Iterable[type], complete: bool) -> ColumnKind:
+    """The kind of a column with values of `types` (None aside), `complete` if no value is None"""
+    types = list(types)
+    if types and all(issubclass(t, (int, float, np.number)) and not issubclass(t, (bool, np.bool_)) for t in types):
+        return "int" if complete and all(issubclass(t, (int, np.integer)) for t in types) else "float"
+    if types and all(issubclass(t, (bool, np.bool_)) for t in types):
+        return "bool"
+    return "object"
+
+
+def _column(values: List[Any], kind: Optional[ColumnKind] = None) -> np.ndarray:
+    """
+    A numpy column: numeric if all values are numbers (missing values as NaN), else an object column. With `kind`
+    (e.g. of all batches of a table), the kind is not inferred from `values`.
+    """
+    if kind is None:
+        kind = _column_kind({type(value) for value in values if value is not None}, None not in values)
+    if kind == "int":
+        return np.array(values, dtype=np.int64)
+    if kind == "float":
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    column = np.empty(len(values), dtype=object)
+    column[:] = [value if value is None or isinstance(value, SCALAR_TYPES)
+                 else json.dumps(value, ensure_ascii=False, default=str) for value in values]
+    return column
+
+
+def _rows_to_table(rows: List[Dict[str, Any]]) -> Table:
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    return {key: _column([row.get(key) for row in rows]) for key in keys}
+
+
+def _stream_row(key: str, stream_id: str, syllable_ids: List[str], info: Dict[str, Any], lexicon_index: int) -> dict:
+    return {
+        "key": key,
+        "id": stream_id,
+        "lexicon": info.get("lexicon"),
+        "lexicon_index": lexicon_index,
+        "stream_tp_mode": info.get("stream_tp_mode"),
+        "n_syllables": len(syllable_ids),
+        "stream": "|".join(syllable_ids),
+        **info.get("rhythmicity_indexes", {}),
+    }
+
+
+def stream_tables(streams) -> Dict[str, Table]:
+    """
+    The "streams" table (key, id, lexicon, stream_tp_mode, the syllables joined with '|' and one `phon_i_feature`
+    column per rhythmicity index) and the "lexicons" table (one row per lexicon of the streams, with the scalar
+    entries of the lexicon info as columns and nested entries as json strings).
+    """
+    lexicon_rows, lexicon_index = [], {}
+    stream_rows = []
+    for key, stream in dict.items(streams):
+        info = stream.info
+        lexicon = info.get("lexicon")
+        if lexicon is not None and lexicon not in lexicon_index:
+            lexicon_index[lexicon] = len(lexicon_rows)
+            lexicon_rows.append({"lexicon_index": len(lexicon_rows), "lexicon": lexicon,
+                                 **info.get("lexicon_info", {})})
+
+        stream_rows.append(_stream_row(key, stream.id, [syllable.id for syllable in stream.syllables], info,
+                                       lexicon_index.get(lexicon, -1)))
+
+    return {"streams": _rows_to_table(stream_rows), "lexicons": _rows_to_table(lexicon_rows)}
+
+
+def resolve_format(table_format: TableFormat = "auto") -> str:
+    if table_format == "auto":
+        return "parquet" if importlib.util.find_spec("pyarrow") is not None else "csv"
+    if table_format not in ("parquet", "csv"):
+        raise ValueError(f"Table format '{table_format}' unknown.")
+    return table_format
+
+
+def _arrow_column(pa, column: np.ndarray, kind: ColumnKind):
+    if kind == "object":
+        return pa.array([value if value is None or isinstance(value, str) else str(value) for value in column],
+                        type=pa.string())
+    if kind == "bool":
+        return pa.array(list(column), type=pa.bool_())
+    return pa.array(column)
+
+
+class _TableWriter:
+    """
+    Write a table to `path` + '.parquet' or '.csv.gz' in one or more batches of rows with the same columns. Without
+    the column `kinds`, the column types of a parquet file are inferred from its (first) batch.
+    """
+
+    def __init__(self, path: Union[str, PathLike], table_format: TableFormat = "auto",
+                 kinds: Optional[Dict[str, ColumnKind]] = None):
+        self.format = resolve_format(table_format)
+        self.kinds = kinds
+        path = pathlib.Path(path)
+        self.path = path.with_name(path.name + (".parquet" if self.format == "parquet" else ".csv.gz"))
+        self._writer = None
+        self._file = None
+
+    def write(self, table: Table):
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self.kinds is not None:
+                batch = pa.table({key: _arrow_column(pa, column, self.kinds[key]) for key, column in table.items()})
+            else:
+                batch = pa.table({key: list(column) if column.dtype == object else column
+                                  for key, column in table.items()})
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, batch.schema)
+            self._writer.write_table(batch)
+            return
+
+        if self._writer is None:
+            self._file = gzip.open(self.path, "wt", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(table.keys())
+        self._writer.writerows(zip(*(column.tolist() for column in table.values())))
+
+    def close(self) -> pathlib.Path:
+        if self.format == "parquet" and self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+        return self.path
+
+
+def write_table(table: Table, path: Union[str, PathLike], table_format: TableFormat = "auto") -> pathlib.Path:
+    """Write a table to `path` + '.parquet' or '.csv.gz'"""
+    writer = _TableWriter(path, table_format)
+    writer.write(table)
+    return writer.close()
+
+
+def write_table_rows(rows: Callable[[], Iterable[Dict[str, Any]]], path: Union[str, PathLike],
+                     table_format: TableFormat = "auto", batch_size: int = 10_000) -> pathlib.Path:
+    """
+    Write a table of rows (dicts) in batches of `batch_size` rows. `rows` is called twice: the first pass finds the
+    columns and their kinds, so that all batches have the same columns and column types.
+    """
+    types: Dict[str, set] = {}
+    n_present: Dict[str, int] = {}
+    n_rows = 0
+    for row in rows():
+        n_rows += 1
+        for key, value in row.items():
+            types.setdefault(key, set())
+            if value is not None:
+                types[key].add(type(value))
+                n_present[key] = n_present.get(key, 0) + 1
+    kinds = {key: _column_kind(key_types, n_present.get(key, 0) == n_rows) for key, key_types in types.items()}
+
+    writer = _TableWriter(path, table_format, kinds)
+    batch = []
+    for row in rows():
+        batch.append(row)
+        if len(batch) == batch_size:
+            writer.write({key: _column([row.get(key) for row in batch], kind) for key, kind in kinds.items()})
+            batch = []
+    if batch or n_rows == 0:
+        writer.write({key: _column([row.get(key) for row in batch], kind) for key, kind in kinds.items()})
+    return writer.close()
+
+
+def export_stream_tables(streams, directory: Union[str, PathLike],
+                         table_format: TableFormat = "auto") -> Dict[str, pathlib.Path]:
+    """Write the tables of `stream_tables` to `directory`, returns their paths by table name"""
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    return {name: write_table(table, directory / name, table_format)
+            for name, table in stream_tables(streams).items()}
+
+
+def export_stream_record_tables(records: Callable[[], Iterable[Dict[str, Any]]], lexicons,
+                                directory: Union[str, PathLike], table_format: TableFormat = "auto",
+                                batch_size: int = 10_000) -> Dict[str, pathlib.Path]:
+    """
+    Write the tables of `stream_tables` for stream records (see `alparc.store.stream_record`) of streams made from
+    `lexicons` to `directory`, in batches of rows. `records` is called for a new pass over the records (twice). The
+    lexicons table has a row for every lexicon, and `lexicon_index` is the position of the lexicon in `lexicons`.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    def stream_rows():
+        for record in records():
+            lexicon_index = record["info"]["lexicon_info"]
+            info = unpack_stream_info(record["info"], lexicons[lexicon_index].info)
+            yield _stream_row(record["key"], record["id"], record["syllables"], info, lexicon_index)
+
+    lexicon_rows = [{"lexicon_index": i, "lexicon": str(lexicon), **lexicon.info} for i, lexicon in enumerate(lexicons)]
+    return {
+        "streams": write_table_rows(stream_rows, directory / "streams", table_format, batch_size),
+        "lexicons": write_table(_rows_to_table(lexicon_rows), directory / "lexicons", table_format),
+    }
@@ -1,22 +1,88 @@
-import json
 from abc import ABC, abstractmethod
 from collections import OrderedDict
 from copy import copy
+from dataclasses import dataclass
 from os import PathLike
-from typing import Dict, Any, Type, TypeVar, Union
+from typing import Dict, Any, Type, TypeVar, Union, List, Optional, Sequence
 
-import pandas as pd
+import numpy as np
 
+from alparc import codec
 from alparc.controls.common import *
-from alparc.types.elements import Element
+from alparc.types.elements import Element, reset_private
+from alparc.types.query import And, Predicate, RegisterIndex
 
 RegisterType = TypeVar("RegisterType", bound="Register")
 
 
+@dataclass(frozen=True)
+class FeatureMatrix:
+    """
+    The binary features of a register's elements as one read-only int8 array, aligned to the register's order:
+    (n_syllables x n_features) for syllables, (n_words x n_features x n_syllables_per_word) for words.
+    `labels` are the feature labels of the syllable positions, if the register knows them.
+    """
+    values: np.ndarray
+    labels: Optional[List[str]] = None
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+
+def _sample_positions(positions: np.ndarray, size: int, weights: Optional[np.ndarray],
+                      rng: np.random.Generator) -> np.ndarray:
+    """`size` distinct entries of `positions`, uniformly or by `weights` (aligned with `positions`)"""
+    if weights is None:
+        return rng.choice(positions, size=size, replace=False)
+
+    # Efraimidis-Spirakis: the smallest exponential keys scaled by 1/weight are a weighted sample without replacement
+    if (weights < 0).any() or np.count_nonzero(weights) < size:
+        raise ValueError(f"Need at least {size} elements with positive weight to sample from.")
+    with np.errstate(divide="ignore"):
+        keys = rng.exponential(size=len(positions)) / weights
+    return positions[np.argpartition(keys, size - 1)[:size]] if size else positions[:0]
+
+
+def _allocate(counts: np.ndarray, size: int) -> np.ndarray:
+    """Split `size` over strata with `counts` elements proportionally, rounding by the largest remainder"""
+    quotas = counts * size / counts.sum()
+    sizes = np.floor(quotas).astype(np.int64)
+    remainder = size - sizes.sum()
+    sizes[np.argsort(sizes - quotas, kind="stable")[:remainder]] += 1
+    return np.minimum(sizes, counts)
+
+
+def _merge_infos(element_1, element_2):
+    """A copy of `element_1` with the info of `element_2` merged into its info"""
+    element_new = copy(element_1)
+    element_new.info = {**element_1.info, **element_2.info}
+    if element_new.info != element_1.info:
+        # cached masks and feature codes are derived from the old info
+        reset_private(element_new)
+    return element_new
+
+
+def _invalidates_caches(method):
+    def wrapper(self, *args, **kwargs):
+        self._feature_values = None
+        self._index = None
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
 class Register(OrderedDict):
     MAX_PRINT_ELEMENTS = 10
     INFO_KEY = "_info"
 
+    _feature_values: Optional[np.ndarray] = None
+    _index: Optional[RegisterIndex] = None
+
     def __init__(self, other=(), /, **kwargs):
         if self.INFO_KEY in kwargs:
             self.info = kwargs[self.INFO_KEY]
@@ -45,9 +111,78 @@ class Register(OrderedDict):
     def __iter__(self):
         return iter(self.values())
 
+    # the cached feature matrix and indexes are dropped whenever the register changes (its elements are treated as
+    # immutable)
+    __setitem__ = _invalidates_caches(OrderedDict.__setitem__)
+    __delitem__ = _invalidates_caches(OrderedDict.__delitem__)
+    pop = _invalidates_caches(OrderedDict.pop)
+    popitem = _invalidates_caches(OrderedDict.popitem)
+    clear = _invalidates_caches(OrderedDict.clear)
+    setdefault = _invalidates_caches(OrderedDict.setdefault)
+    update = _invalidates_caches(OrderedDict.update)
+    move_to_end = _invalidates_caches(OrderedDict.move_to_end)
+
+    def feature_labels(self) -> Optional[List[str]]:
+        """The labels of the features of all syllable positions, from the (syllables) info of the register"""
+        info = self.info.get("syllables_info", self.info)
+        if "syllable_feature_labels" not in info:
+            return None
+        return [label for labels in info["syllable_feature_labels"] for label in labels]
+
+    @property
+    def features(self) -> FeatureMatrix:
+        """The elements' `binary_features`, built on first access and cached until the register is modified"""
+        if self._feature_values is None:
+            values = np.array([element.info["binary_features"] for element in self], dtype=np.int8)
+            values.setflags(write=False)
+            self._feature_values = values
+        return FeatureMatrix(self._feature_values, self.feature_labels())
+
+    def set_feature_matrix(self, values: np.ndarray):
+        """
+        Seed the cached feature matrix with `values` (see `features`), e.g. when they are a by-product of building
+        the register. The values must have one row per element, and are cached until the register is modified.
+        """
+        values = np.asarray(values, dtype=np.int8)
+        if values.ndim < 2 or len(values) != len(self):
+            raise ValueError(f"The feature matrix must have one row per element ({len(self)}), "
+                             f"got shape {values.shape}.")
+        values.setflags(write=False)
+        self._feature_values = values
+
+    @property
+    def index(self) -> RegisterIndex:
+        """Secondary indexes for queries, built lazily and cached until the register is modified"""
+        if self._index is None or self._index.register is not self:
+            self._index = RegisterIndex(self)
+        return self._index
+
+    def view(self) -> "RegisterView":
+        """A lazy view of this register, to chain filters, queries, intersections and flatten without copies"""
+        return RegisterView(self)
+
+    def query(self, predicate: Predicate) -> RegisterType:
+        """
+        Select the elements matching `predicate` (see `alparc.types.query`), evaluated as one boolean mask, e.g.
+        `words.query(Contains("pi") & Feature("son", syllable=0))` or `syllables.query(Field("freq").between(10, 100))`
+        """
+        positions = np.flatnonzero(predicate.mask(self))
+        elements = self.index.items()
+        return self._take_features(self.new_from_dict(dict(elements[i] for i in positions)), positions)
+
+    def _take_features(self, register: RegisterType, positions: Sequence[int]) -> RegisterType:
+        """Give `register` (made of the elements at `positions`) the matching rows of the cached feature matrix"""
+        if self._feature_values is not None and len(positions) == len(register):
+            values = self._feature_values[np.asarray(positions, dtype=np.int64)]
+            values.setflags(write=False)
+            register._feature_values = values
+        return register
+
     def __getitem__(self, item):
-        if isinstance(item, (int, slice)):
-            return list(self.values())[item]
+        if isinstance(item, slice):
+            return [element for _, element in self.index.items()[item]]
+        if isinstance(item, int):
+            return self.index.items()[item][1]
 
         return super().__getitem__(item)
 
@@ -67,17 +202,48 @@ class Register(OrderedDict):
     def append(self, obj: Element):
         self[str(obj)] = obj
 
-    def get_subset(self, size: int) -> RegisterType:
-        """Create a new Register as a random subset of this one"""
+    def get_subset(self,
+                   size: int,
+                   rng: Optional[Union[int, np.random.Generator]] = None,
+                   weights: Optional[Union[str, Sequence[float]]] = None,
+                   stratify: Optional[str] = None) -> RegisterType:
+        """
+        Create a new Register as a random subset of `size` distinct elements of this one (in register order).
+
+        Args:
+            size: number of elements. If it is not smaller than the register, the register itself is returned.
+            rng: a numpy Generator or a seed. Defaults to a generator seeded from numpy's global random state.
+            weights: sample with probabilities proportional to these weights (successive sampling without
+                replacement), given per element or as the name of a numeric `info` field.
+            stratify: name of an `info` field. The subset keeps the proportions of its values (largest remainder),
+                and is drawn within every stratum.
+        """
         if size >= len(self):
             return self
 
-        keys = set()
+        if not isinstance(rng, np.random.Generator):
+            rng = np.random.default_rng(rng if rng is not None else np.random.randint(0, 2**31))
 
-        for _ in range(size):
-            keys.add(random.choice(list(self.keys() - keys)))
+        if isinstance(weights, str):
+            weights = [element.info[weights] for element in self]
+        weights = np.asarray(weights, dtype=np.float64) if weights is not None else None
 
-        return self.new_from_dict({key: self[key] for key in keys})
+        if stratify is None:
+            positions = _sample_positions(np.arange(len(self)), size, weights, rng)
+        else:
+            strata: Dict[Any, list] = {}
+            for i, element in enumerate(self):
+                strata.setdefault(element.info[stratify], []).append(i)
+            strata_positions = [np.array(members) for members in strata.values()]
+            sizes = _allocate(np.array([len(members) for members in strata_positions]), size)
+            positions = np.concatenate([np.zeros(0, np.int64)] + [
+                _sample_positions(members, n, weights[members] if weights is not None else None, rng)
+                for members, n in zip(strata_positions, sizes) if n
+            ])
+
+        positions = np.sort(positions)
+        items = self.index.items()
+        return self._take_features(self.new_from_dict(dict(items[i] for i in positions)), positions)
 
     def get_self_with_info_key(self):
         d = copy(self)
@@ -85,19 +251,21 @@ class Register(OrderedDict):
         return d
 
     def to_json(self):
-        return json.dumps(self.get_self_with_info_key(), default=lambda o: o.model_dump(),
-                          sort_keys=False, ensure_ascii=False)
+        return codec.encode_register(self).decode("utf-8")
 
-    def save(self, path: Union[str, PathLike] = None):
+    def save(self, path: Union[str, PathLike] = None, schema: int = 1):
+        """
+        Write the register to a json file, in schema version 1 (every element written out in full) or 2
+        (normalized: phonemes, syllables, ... stored once and referenced, see `alparc.schema`)
+        """
         if path is None:
             path = f"{self[0].__class__.__name__.lower()}s.json"
 
         if isinstance(path, str) and not path.endswith(".json"):
             path = path + ".json"
 
-        with open(path, "w", encoding='utf-8') as file:
-            json.dump(self.get_self_with_info_key(), file,
-                      default=lambda o: o.model_dump(), sort_keys=False, ensure_ascii=False)
+        with open(path, "wb") as file:
+            file.write(codec.encode_register(self, schema=schema))
 
     def intersection(
             self,
@@ -109,17 +277,16 @@ class Register(OrderedDict):
         :return:
         """
 
-        def merge_infos(element_1, element_2):
-            element_new = copy(element_1)
-            element_new.info.update(element_2.info)
-            return element_new
-
+        positions = [i for i, key in enumerate(self.keys()) if key in other]
         new_register = self.new_from_dict({
-            key: merge_infos(element, other[key]) for key, element in self.items() if key in other
+            key: _merge_infos(element, other[key]) for key, element in self.items() if key in other
         })
 
         new_register.info.update(other.info)
 
+        if not any("binary_features" in other[key].info for key in new_register.keys()):
+            self._take_features(new_register, positions)
+
         return new_register
 
     def new_from_dict(self, dictionary: dict) -> RegisterType:
@@ -138,7 +305,122 @@ class Register(OrderedDict):
     
     def filter(self, func, *args, **kwargs):
         reg = self.empty_like()
-        for element in self:
+        positions = []
+        for i, element in enumerate(self):
             if func(element, *args, **kwargs):
                 reg.append(element)
-        return reg
+                positions.append(i)
+        return self._take_features(reg, positions)
+
+
+class RegisterView:
+    """
+    A lazy view of a register. `filter`, `query`, `intersection` and `flatten` only record a step, and the chain
+    is evaluated in one fused pass over the source register when the view is first used like a register
+    (iterated, indexed, measured, saved, ...). The result is cached.
+
+    Queries before the first intersection are evaluated as one vectorized mask over the source; python filters
+    and intersections are applied element by element, so elements are only copied (to merge infos) once they
+    passed all earlier steps. Queries after an intersection see the merged infos of all intersections.
+    """
+
+    def __init__(self, source: Register, steps: tuple = ()):
+        self.source = source
+        self.steps = steps
+        self._result: Optional[Register] = None
+
+    def _then(self, *step) -> "RegisterView":
+        return RegisterView(self.source, self.steps + (step,))
+
+    def filter(self, func, *args, **kwargs) -> "RegisterView":
+        return self._then("filter", (func, args, kwargs))
+
+    def query(self, predicate: Predicate) -> "RegisterView":
+        return self._then("query", predicate)
+
+    def intersection(self, other: Register) -> "RegisterView":
+        return self._then("intersection", other)
+
+    def flatten(self) -> "RegisterView":
+        return self._then("flatten", None)
+
+    def view(self) -> "RegisterView":
+        return self
+
+    def materialize(self) -> Register:
+        if self._result is None:
+            self._result = self._evaluate()
+        return self._result
+
+    def _evaluate(self) -> Register:
+        register, steps = self.source, list(self.steps)
+        while "flatten" in (kind for kind, _ in steps):
+            i = next(i for i, (kind, _) in enumerate(steps) if kind == "flatten")
+            register = _evaluate_fused(register, steps[:i]).flatten()
+            steps = steps[i + 1:]
+        return _evaluate_fused(register, steps)
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __getitem__(self, item):
+        return self.materialize()[item]
+
+    def __contains__(self, item):
+        return item in self.materialize()
+
+    def __str__(self):
+        return str(self.materialize())
+
+    def __getattr__(self, name):
+        # everything else (keys, info, features, save, ...) behaves like the materialized register
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+
+def _evaluate_fused(register: Register, steps: list) -> Register:
+    """Apply filter/query/intersection `steps` to `register` in one pass"""
+    info = copy(register.info)
+    mask = np.ones(len(register), dtype=bool)
+    element_steps, late_queries = [], []
+
+    for kind, argument in steps:
+        if kind == "query" and not any(step_kind == "intersection" for step_kind, _ in element_steps):
+            mask &= argument.mask(register)
+        elif kind == "query":
+            late_queries.append(argument)
+        elif kind in ("filter", "intersection"):
+            element_steps.append((kind, argument))
+            if kind == "intersection":
+                info.update(argument.info)
+        else:
+            raise ValueError(f"Unknown view step '{kind}'.")
+
+    items = register.index.items()
+    elements, positions = {}, []
+    for i in np.flatnonzero(mask).tolist():
+        key, element = items[i]
+        for kind, argument in element_steps:
+            if kind == "filter":
+                func, args, kwargs = argument
+                if not func(element, *args, **kwargs):
+                    break
+            elif key not in argument:
+                break
+            else:
+                element = _merge_infos(element, argument[key])
+        else:
+            elements[key] = element
+            positions.append(i)
+
+    result = Register(elements, _info=info)
+    others = [argument for kind, argument in element_steps if kind == "intersection"]
+    if not any("binary_features" in other[key].info for other in others for key in elements):
+        register._take_features(result, positions)
+    if late_queries:
+        result = result.query(late_queries[0] if len(late_queries) == 1 else And(*late_queries))
+    return result
@@ -2,7 +2,7 @@ import json
 from abc import ABC, abstractmethod
 from os import PathLike
 
-from typing import List, Literal, get_args, Dict, Any, Union
+from typing import List, Literal, get_args, Dict, Any, Union, Optional, Callable, Tuple, Type
 
 from pydantic import BaseModel
 
@@ -34,6 +34,55 @@ class Element(ABC):
         pass
 
 
+_TRUSTED_TEMPLATES: Dict[type, Tuple[frozenset, Optional[Dict[str, Any]]]] = {}
+
+
+def _trusted_template(cls: Type[BaseModel]) -> Tuple[frozenset, Optional[Dict[str, Any]]]:
+    """The field names and the default private attributes (caches) of a pydantic model class"""
+    if cls not in _TRUSTED_TEMPLATES:
+        private = {name: attr.get_default() for name, attr in (cls.__private_attributes__ or {}).items()}
+        _TRUSTED_TEMPLATES[cls] = (frozenset(cls.model_fields), private or None)
+    return _TRUSTED_TEMPLATES[cls]
+
+
+def construct_trusted(cls: Type[BaseModel], **fields):
+    """
+    Build a pydantic model from field values that are known to be valid: no validation, no copies. This is what
+    `model_construct` does, minus its per-call overhead.
+    """
+    field_names, private = _trusted_template(cls)
+
+    obj = cls.__new__(cls)
+    object.__setattr__(obj, "__dict__", fields)
+    object.__setattr__(obj, "__pydantic_fields_set__", set(field_names))
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    object.__setattr__(obj, "__pydantic_private__", dict(private) if private is not None else None)
+    return obj
+
+
+def reset_private(obj):
+    """Reset the private attributes of a pydantic model to their defaults, e.g. caches derived from its info"""
+    if isinstance(obj, BaseModel):
+        _, private = _trusted_template(type(obj))
+        object.__setattr__(obj, "__pydantic_private__", dict(private) if private is not None else None)
+
+
+def intern_trusted(memo: Optional[Dict], cls: type, data: Dict[str, Any], build: Callable[[], Any]):
+    """
+    Decode `data` with `build`, reusing the object decoded before from equal data with the same id, if a `memo` is
+    given. Registers written by alparc repeat the same phonemes and syllables many times.
+    """
+    if memo is None:
+        return build()
+    key = (cls, data["id"])
+    hit = memo.get(key)
+    if hit is not None and hit[0] == data:
+        return hit[1]
+    obj = build()
+    memo[key] = (data, obj)
+    return obj
+
+
 class Phoneme(Element, BaseModel):
     id: str
     info: Dict[str, Any]
@@ -1,26 +1,79 @@
-from typing import Literal, get_args, TypeVar, Dict, Any
+from dataclasses import dataclass
+from typing import Literal, get_args, TypeVar, Dict, Any, List, Optional
 
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, PrivateAttr
 
 from alparc.types.base_types import Element
+from alparc.types.elements import construct_trusted, intern_trusted
 
 TypePhonemeFeatureLabels = Literal[
     "syl", "son", "cons", "cont", "delrel", "lat", "nas", "strid", "voi", "sg", "cg", "ant", "cor", "distr", "lab",
     "hi", "lo", "back", "round", "tense", "long"
 ]
 PHONEME_FEATURE_LABELS = list(get_args(TypePhonemeFeatureLabels))
+PHONEME_FEATURE_INDEX = {label: i for i, label in enumerate(PHONEME_FEATURE_LABELS)}
 PhonemeType = TypeVar("PhonemeType", bound="Phoneme")
 
+# compiled feature codes: '+' -> 1, '-' -> -1, '0' -> 0. Indexing FEATURE_SYMBOLS with a code gives back the symbol.
+FEATURE_SYMBOL_CODES = {"+": 1, "-": -1, "0": 0}
+FEATURE_SYMBOLS = ("0", "+", "-")
+
+
+def encode_feature_symbols(features: List[str]) -> np.ndarray:
+    """Compile a list of '+'/'-'/'0' feature symbols into an int8 vector"""
+    return np.array([FEATURE_SYMBOL_CODES[symbol] for symbol in features], dtype=np.int8)
+
+
+@dataclass(frozen=True)
+class PhonemeFeatureTable:
+    """Compiled phoneme features: an int8 (n_phonemes x n_features) matrix and a phoneme-id -> row index"""
+    ids: List[str]
+    index: Dict[str, int]
+    labels: List[str]
+    features: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, phoneme_id: str) -> np.ndarray:
+        return self.features[self.index[phoneme_id]]
+
 
 class Phoneme(Element, BaseModel):
     id: str
     info: Dict[str, Any]
 
+    _feature_codes: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    @classmethod
+    def trusted(cls, id: str, info: Dict[str, Any]) -> "Phoneme":
+        """Construct without validation, for data produced by alparc itself (the arguments are not copied)"""
+        return construct_trusted(cls, id=id, info=info)
+
+    @classmethod
+    def from_trusted_dict(cls, data: Dict[str, Any], memo: Optional[Dict] = None) -> "Phoneme":
+        return intern_trusted(memo, cls, data, lambda: cls.trusted(data["id"], data["info"]))
+
+    def __eq__(self, other):
+        # the cached feature codes are an array and not part of the phoneme's value
+        if not isinstance(other, Phoneme):
+            return NotImplemented
+        return self.id == other.id and self.info == other.info
+
     def get_elements(self):
         return []
 
+    @property
+    def feature_codes(self) -> np.ndarray:
+        """The phoneme's features as int8 codes, ordered like PHONEME_FEATURE_LABELS.
+        Compiled from `info["features"]` on first access (unless set from a compiled table)."""
+        if self._feature_codes is None:
+            self._feature_codes = encode_feature_symbols(self.info["features"])
+        return self._feature_codes
+
     def get_feature_symbol(self, label: TypePhonemeFeatureLabels):
-        return self.info["features"][PHONEME_FEATURE_LABELS.index(label)]
+        return FEATURE_SYMBOLS[self.feature_codes.item(PHONEME_FEATURE_INDEX[label])]
 
     def get_binary_feature(self, label: TypePhonemeFeatureLabels):
-        return self.get_feature_symbol(label) == "+"
+        return self.feature_codes.item(PHONEME_FEATURE_INDEX[label]) > 0
@@ -0,0 +1,213 @@
+"""Composable, vectorized queries over registers, backed by lazily built secondary indexes"""
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from alparc.types.base_types import Register
+
+
+class RegisterIndex:
+    """
+    Secondary indexes of a register, each built on first use and dropped with the register's other caches:
+    sorted arrays over numeric `info` fields (for range queries) and an inverted index from sub-element ids
+    (e.g. the syllables of words) to element positions.
+    """
+
+    def __init__(self, register: "Register"):
+        self.register = register
+        self._items: Optional[List[Tuple[str, Any]]] = None
+        self._numeric: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._values: Dict[str, list] = {}
+        self._inverted: Optional[Dict[str, np.ndarray]] = None
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """(key, element) pairs in register order, for positional access"""
+        if self._items is None:
+            self._items = list(dict.items(self.register))
+        return self._items
+
+    def values(self, key: str) -> list:
+        """The `info[key]` of every element (None where missing)"""
+        if key not in self._values:
+            self._values[key] = [element.info.get(key) for element in self.register]
+        return self._values[key]
+
+    def numeric(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """`info[key]` of the elements that have it, sorted, and the positions of these elements"""
+        if key not in self._numeric:
+            column = np.array([np.nan if value is None else value for value in self.values(key)], dtype=np.float64)
+            present = np.flatnonzero(~np.isnan(column))
+            order = present[np.argsort(column[present], kind="stable")]
+            self._numeric[key] = (column[order], order)
+        return self._numeric[key]
+
+    def inverted(self) -> Dict[str, np.ndarray]:
+        """Sub-element id -> sorted positions of the elements that contain it"""
+        if self._inverted is None:
+            postings: Dict[str, list] = {}
+            for i, element in enumerate(self.register):
+                for sub_element_id in dict.fromkeys(sub_element.id for sub_element in element.get_elements()):
+                    postings.setdefault(sub_element_id, []).append(i)
+            self._inverted = {key: np.array(positions, dtype=np.int64) for key, positions in postings.items()}
+        return self._inverted
+
+
+class Predicate(ABC):
+    """A condition on the elements of a register, evaluated for all elements at once as a boolean mask"""
+
+    @abstractmethod
+    def mask(self, register: "Register") -> np.ndarray:
+        pass
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        return And(self, other)
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return Or(self, other)
+
+    def __invert__(self) -> "Predicate":
+        return Not(self)
+
+
+class And(Predicate):
+    def __init__(self, *predicates: Predicate):
+        self.predicates = predicates
+
+    def mask(self, register):
+        mask = np.ones(len(register), dtype=bool)
+        for predicate in self.predicates:
+            mask &= predicate.mask(register)
+        return mask
+
+
+class Or(Predicate):
+    def __init__(self, *predicates: Predicate):
+        self.predicates = predicates
+
+    def mask(self, register):
+        mask = np.zeros(len(register), dtype=bool)
+        for predicate in self.predicates:
+            mask |= predicate.mask(register)
+        return mask
+
+
+class Not(Predicate):
+    def __init__(self, predicate: Predicate):
+        self.predicate = predicate
+
+    def mask(self, register):
+        return ~self.predicate.mask(register)
+
+
+def _positions_mask(register: "Register", positions: np.ndarray) -> np.ndarray:
+    mask = np.zeros(len(register), dtype=bool)
+    mask[positions] = True
+    return mask
+
+
+class Range(Predicate):
+    """`low <= info[key] <= high` (bounds can be None or exclusive), answered with the sorted index of the field"""
+
+    def __init__(self, key: str, low: Optional[float] = None, high: Optional[float] = None,
+                 include_low: bool = True, include_high: bool = True):
+        self.key = key
+        self.low, self.high = low, high
+        self.include_low, self.include_high = include_low, include_high
+
+    def mask(self, register):
+        values, order = register.index.numeric(self.key)
+        start = 0 if self.low is None else np.searchsorted(values, self.low, "left" if self.include_low else "right")
+        stop = len(values) if self.high is None else \
+            np.searchsorted(values, self.high, "right" if self.include_high else "left")
+        return _positions_mask(register, order[start:max(start, stop)])
+
+
+class IsIn(Predicate):
+    """`info[key]` is one of `values`"""
+
+    def __init__(self, key: str, values: Iterable[Any]):
+        self.key = key
+        self.values = set(values)
+
+    def mask(self, register):
+        return np.array([value in self.values for value in register.index.values(self.key)], dtype=bool)
+
+
+class Field:
+    """An `info` field, to build predicates: `Field("freq").between(10, 100)`, `Field("freq") > 10`, ..."""
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def between(self, low: Optional[float], high: Optional[float]) -> Range:
+        return Range(self.key, low, high)
+
+    def isin(self, values: Iterable[Any]) -> IsIn:
+        return IsIn(self.key, values)
+
+    def __lt__(self, value) -> Range:
+        return Range(self.key, high=value, include_high=False)
+
+    def __le__(self, value) -> Range:
+        return Range(self.key, high=value)
+
+    def __gt__(self, value) -> Range:
+        return Range(self.key, low=value, include_low=False)
+
+    def __ge__(self, value) -> Range:
+        return Range(self.key, low=value)
+
+    def __eq__(self, value) -> IsIn:
+        return IsIn(self.key, [value])
+
+    __hash__ = None
+
+
+class Contains(Predicate):
+    """The element contains the sub-element `element_id`, e.g. words containing a syllable (inverted index lookup)"""
+
+    def __init__(self, element_id: str):
+        self.element_id = element_id
+
+    def mask(self, register):
+        return _positions_mask(register, register.index.inverted().get(self.element_id, np.zeros(0, np.int64)))
+
+
+class Feature(Predicate):
+    """
+    The binary feature `label` of phoneme `phoneme` (position within the syllable) is set, read from the register's
+    feature matrix. For words, `syllable` selects the syllable (None: any syllable).
+    """
+
+    def __init__(self, label: str, phoneme: int = 0, syllable: Optional[int] = None):
+        self.label = label
+        self.phoneme = phoneme
+        self.syllable = syllable
+
+    def column(self, register) -> int:
+        info = register.info.get("syllables_info", register.info)
+        labels_per_phoneme = info["syllable_feature_labels"]
+        if self.label not in labels_per_phoneme[self.phoneme]:
+            raise ValueError(f"Phoneme {self.phoneme} has no feature '{self.label}'.")
+        offset = sum(len(labels) for labels in labels_per_phoneme[:self.phoneme])
+        return offset + labels_per_phoneme[self.phoneme].index(self.label)
+
+    def mask(self, register):
+        if not len(register):
+            return np.zeros(0, dtype=bool)
+        values = register.features.values[:, self.column(register)] > 0
+        if values.ndim == 1:
+            return values
+        return values[:, self.syllable] if self.syllable is not None else values.any(axis=1)
+
+
+class Where(Predicate):
+    """Any python predicate on single elements (evaluated element by element)"""
+
+    def __init__(self, func: Callable[..., bool], *args, **kwargs):
+        self.func, self.args, self.kwargs = func, args, kwargs
+
+    def mask(self, register):
+        return np.array([bool(self.func(element, *self.args, **self.kwargs)) for element in register], dtype=bool)
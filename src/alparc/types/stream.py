@@ -1,10 +1,11 @@
-import json
 from os import PathLike
-from typing import TypeVar, List, Dict, Any, Union
+from typing import TypeVar, List, Dict, Any, Union, Optional
 
 from pydantic import BaseModel
 
+from alparc import codec
 from alparc.types.base_types import Register, Element, RegisterType
+from alparc.types.elements import construct_trusted, intern_trusted
 from alparc.types.syllable import Syllable, SyllableType
 
 
@@ -16,6 +17,16 @@ class Stream(Element, BaseModel):
     syllables: List[SyllableType]
     info: Dict[str, Any]
 
+    @classmethod
+    def trusted(cls, id: str, syllables: List[Syllable], info: Dict[str, Any]) -> "Stream":
+        """Construct without validation, for data produced by alparc itself (the arguments are not copied)"""
+        return construct_trusted(cls, id=id, syllables=syllables, info=info)
+
+    @classmethod
+    def from_trusted_dict(cls, data: Dict[str, Any], memo: Optional[Dict] = None) -> "Stream":
+        return intern_trusted(memo, cls, data, lambda: cls.trusted(
+            data["id"], [Syllable.from_trusted_dict(s, memo) for s in data["syllables"]], data["info"]))
+
     def get_elements(self):
         return self.syllables
         
@@ -29,6 +40,5 @@ class Stream(Element, BaseModel):
         if isinstance(path, str) and not path.endswith(".json"):
             path = path + ".json"
 
-        with open(path, "w", encoding='utf-8') as file:
-            json.dump(self, file,
-                      default=lambda o: o.model_dump(), sort_keys=False, ensure_ascii=False)
+        with open(path, "wb") as file:
+            file.write(codec.encode_element(self))
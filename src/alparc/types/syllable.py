@@ -1,14 +1,39 @@
 from typing import List, Literal, Optional, Union, TypeVar, Dict, Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from alparc.types.phoneme import Phoneme
 from alparc.types.base_types import Element
+from alparc.types.elements import construct_trusted, intern_trusted
 
 LABELS_C = ['son', 'back', 'hi', 'lab', 'cor', 'cont', 'lat', 'nas', 'voi']
 LABELS_V = ['back', 'hi', 'lo', 'lab', 'tense', 'long']
 N_FEAT = len(LABELS_C) + len(LABELS_V)  # 14
 
+PHONOTACTIC_VOWELS = ['a', 'e', 'i', 'o', 'u', 'ɛ', 'ø', 'y']
+PHONOTACTIC_FEATURES = ["son", "plo", "fri", "lab", "den", "oth"] + PHONOTACTIC_VOWELS
+"""All phonotactic features, in the order `add_phonotactic_features` lists them. Bit i of a phonotactic mask is
+set if feature i is present."""
+PHONOTACTIC_FEATURE_BITS = {feature: 1 << i for i, feature in enumerate(PHONOTACTIC_FEATURES)}
+
+
+def pack_bits(bits: List[int]) -> int:
+    """Pack a list of 0/1 values into an int, the first value being the lowest bit"""
+    mask = 0
+    for i, bit in enumerate(bits):
+        if bit:
+            mask |= 1 << i
+    return mask
+
+
+def encode_phonotactic_features(features: List[str]) -> int:
+    mask = 0
+    for feature in features:
+        if feature not in PHONOTACTIC_FEATURE_BITS:
+            raise ValueError(f"Unknown phonotactic feature '{feature}'.")
+        mask |= PHONOTACTIC_FEATURE_BITS[feature]
+    return mask
+
 SyllableType = TypeVar("SyllableType", bound="Syllable")
 
 
@@ -17,5 +42,40 @@ class Syllable(Element, BaseModel):
     phonemes: List[Phoneme]
     info: Dict[str, Any]
 
+    _phonotactic_mask: Optional[int] = PrivateAttr(default=None)
+    _n_phonotactic_features: Optional[int] = PrivateAttr(default=None)
+
+    @classmethod
+    def trusted(cls, id: str, phonemes: List[Phoneme], info: Dict[str, Any]) -> "Syllable":
+        """Construct without validation, for data produced by alparc itself (the arguments are not copied)"""
+        return construct_trusted(cls, id=id, phonemes=phonemes, info=info)
+
+    @classmethod
+    def from_trusted_dict(cls, data: Dict[str, Any], memo: Optional[Dict] = None) -> "Syllable":
+        return intern_trusted(memo, cls, data, lambda: cls.trusted(
+            data["id"], [Phoneme.from_trusted_dict(p, memo) for p in data["phonemes"]], data["info"]))
+
+    def __eq__(self, other):
+        # the cached masks are derived from the info and not part of the syllable's value
+        if not isinstance(other, Syllable):
+            return NotImplemented
+        return self.id == other.id and self.phonemes == other.phonemes and self.info == other.info
+
+    @property
+    def phonotactic_mask(self) -> int:
+        """The union of the phonotactic features of all phonemes, as bits of PHONOTACTIC_FEATURES"""
+        if self._phonotactic_mask is None:
+            phoneme_features = self.info["phonotactic_features"]
+            self._phonotactic_mask = encode_phonotactic_features([f for feats in phoneme_features for f in feats])
+            self._n_phonotactic_features = sum(map(len, phoneme_features))
+        return self._phonotactic_mask
+
+    @property
+    def n_phonotactic_features(self) -> int:
+        """Number of phonotactic features of all phonemes, counting repetitions"""
+        if self._n_phonotactic_features is None:
+            self._n_phonotactic_features = sum(map(len, self.info["phonotactic_features"]))
+        return self._n_phonotactic_features
+
     def get_elements(self):
         return self.phonemes
\ No newline at end of file
@@ -1,8 +1,9 @@
-from typing import TypeVar, List, Dict, Any
+from typing import TypeVar, List, Dict, Any, Optional
 
 from pydantic import BaseModel
 
 from alparc.types.base_types import Register, Element, RegisterType
+from alparc.types.elements import construct_trusted, intern_trusted
 from alparc.types.syllable import Syllable, SyllableType
 
 
@@ -14,5 +15,15 @@ class Word(Element, BaseModel):
     syllables: List[SyllableType]
     info: Dict[str, Any]
 
+    @classmethod
+    def trusted(cls, id: str, syllables: List[Syllable], info: Dict[str, Any]) -> "Word":
+        """Construct without validation, for data produced by alparc itself (the arguments are not copied)"""
+        return construct_trusted(cls, id=id, syllables=syllables, info=info)
+
+    @classmethod
+    def from_trusted_dict(cls, data: Dict[str, Any], memo: Optional[Dict] = None) -> "Word":
+        return intern_trusted(memo, cls, data, lambda: cls.trusted(
+            data["id"], [Syllable.from_trusted_dict(s, memo) for s in data["syllables"]], data["info"]))
+
     def get_elements(self):
         return self.syllables
@@ -0,0 +1,15 @@
+import pytest
+
+from alparc import cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    """
+    Keep the on-disk caches in a temporary directory instead of the user cache directory. Session-scoped, so that it
+    also covers module-scoped fixtures that read corpora. Tests of the cache itself point it at their own `tmp_path`.
+    """
+    directory = tmp_path_factory.mktemp("cache")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv(cache.CACHE_DIR_ENV, str(directory))
+        yield directory
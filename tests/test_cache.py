@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+
+from alparc import cache
+
+
+def test_cached_table_memory_and_disk(tmp_path, monkeypatch):
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path / "cache"))
+    source = tmp_path / "corpus.csv"
+    source.write_text("a,1\n")
+    n_builds = []
+
+    def build():
+        n_builds.append(1)
+        return {"ids": np.array(["a"]), "freq": np.array([1])}
+
+    table = cache.cached_table("test", source, 1, build)
+    assert cache.cached_table("test", source, 1, build) is table
+    assert not table["freq"].flags.writeable
+
+    cache.clear_memory_cache()
+    from_disk = cache.cached_table("test", source, 1, build)
+    assert len(n_builds) == 1
+    assert from_disk["ids"].tolist() == ["a"]
+
+    # a new processing version or new file contents invalidate the cache
+    cache.cached_table("test", source, 2, build)
+    source.write_text("a,2\n")
+    cache.cached_table("test", source, 2, build)
+    assert len(n_builds) == 3
+
+
+def test_disable_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path / "cache"))
+    monkeypatch.setenv(cache.NO_CACHE_ENV, "1")
+    source = tmp_path / "corpus.csv"
+    source.write_text("a,1\n")
+
+    cache.cached_table("test", source, 1, lambda: {"freq": np.array([1])})
+    assert not (tmp_path / "cache").exists()
+
+
+def test_stage_cache_lru_eviction(tmp_path, monkeypatch):
+    stages = cache.StageCache(tmp_path / "stages", max_bytes=250)
+    artifact = tmp_path / "artifact.json"
+    artifact.write_bytes(b"x" * 100)
+
+    assert cache.stage_key("words", {"n_words": 10}, 1) == cache.stage_key("words", {"n_words": 10}, 1)
+    keys = [cache.stage_key("words", {"n_words": 10}, seed) for seed in range(3)]
+    assert len(set(keys)) == 3
+    monkeypatch.setattr(cache, "STAGE_FORMAT", cache.STAGE_FORMAT + 1)
+    assert cache.stage_key("words", {"n_words": 10}, 0) != keys[0]
+
+    stages.put(keys[0], {"words.json": artifact}, {"rng_state": None})
+    stages.put(keys[1], {"words.json": artifact}, {"rng_state": None})
+    entry, meta = stages.get(keys[0])  # keys[0] is now the most recently used
+    assert (entry / "words.json").read_bytes() == artifact.read_bytes() and meta == {"rng_state": None}
+
+    os.utime(entry / stages.META, (1e10, 1e10))
+    stages.put(keys[2], {"words.json": artifact}, {"rng_state": None})
+    assert stages.get(keys[1]) is None
+    assert stages.get(keys[0]) is not None and stages.get(keys[2]) is not None
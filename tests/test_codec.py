@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+import pytest
+
+from alparc import codec
+from alparc.eval import to_lexicon
+from alparc.io import load_words
+from alparc.types.word import Word
+
+
+def make_lexicon():
+    return to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"]])
+
+
+@pytest.mark.parametrize("backend", list(codec.BACKENDS))
+def test_register_round_trip(tmp_path, backend):
+    lexicon = make_lexicon()
+    lexicon.info["weights"] = np.arange(3)
+    path = tmp_path / "lexicon.json"
+
+    codec.set_json_backend(backend)
+    try:
+        lexicon.save(str(path))
+    finally:
+        codec.set_json_backend(None)
+
+    legacy = json.loads(json.dumps(lexicon.get_self_with_info_key(), default=lambda o: codec._default(o)))
+    assert json.loads(path.read_bytes()) == legacy
+
+    for trusted in (True, False):
+        loaded = load_words(str(path), trusted=trusted)
+        assert list(loaded.keys()) == list(lexicon.keys())
+        assert [word.model_dump() for word in loaded] == [word.model_dump() for word in lexicon]
+        assert loaded.info["weights"] == [0, 1, 2]
+
+    # repeated sub-elements are shared after a trusted load
+    loaded = load_words(str(path), trusted=True)
+    assert loaded["piɾuta"][2].phonemes[0] is loaded["tokuda"][0].phonemes[0]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        codec.get_json_backend("yaml")
+
+
+def test_element_to_dict_matches_model_dump():
+    word = make_lexicon()[0]
+    assert codec.element_to_dict(word, {}) == word.model_dump()
+    assert isinstance(Word.from_trusted_dict(codec.element_to_dict(word)), Word)
+
+
+@pytest.mark.parametrize("backend", list(codec.BACKENDS))
+def test_register_of_lexicons(tmp_path, backend):
+    from alparc.types.base_types import Register
+
+    lexicon = make_lexicon()
+    lexicons = Register({"l0": lexicon})
+    expected = {"l0": {key: word.model_dump() for key, word in dict.items(lexicon)}, "_info": {}}
+
+    assert json.loads(codec.encode_register(lexicons, backend)) == expected
+    assert json.loads(lexicons.to_json()) == expected
+    lexicons.save(str(tmp_path / "lexicons.json"))
+    lexicons.save(str(tmp_path / "lexicons_v2.json"), schema=2)
+    assert json.loads((tmp_path / "lexicons.json").read_text(encoding="utf-8")) == expected
+
+
+def test_schema_2_round_trip(tmp_path):
+    from alparc.core.stream import make_streams
+    from alparc.io import load_lexicons, load_streams, save_lexicons
+
+    lexicons = [make_lexicon(), to_lexicon([["ka", "mo", "fi"], ["nu", "pe", "lo"], ["to", "ku", "da"]])]
+    streams = make_streams(lexicons, stream_length=4, max_rhythmicity=None)
+    v1, v2 = tmp_path / "streams_v1.json", tmp_path / "streams_v2.json"
+    streams.save(str(v1))
+    streams.save(str(v2), schema=2)
+    assert v2.stat().st_size < v1.stat().st_size / 4
+
+    from_v1, from_v2 = load_streams(str(v1)), load_streams(str(v2))
+    assert list(from_v2.keys()) == list(streams.keys()) and from_v2.info == from_v1.info
+    assert [s.model_dump() for s in from_v2] == [s.model_dump() for s in from_v1]
+    assert [list(s.info) for s in from_v2] == [list(s.info) for s in from_v1]
+    assert from_v2[0].syllables[0] is next(s for s in from_v2[0].syllables[1:] if s.id == from_v2[0].syllables[0].id)
+
+    path = tmp_path / "lexicons.json"
+    save_lexicons(lexicons, str(path))
+    loaded = load_lexicons(str(path))
+    assert [list(lexicon.keys()) for lexicon in loaded] == [list(lexicon.keys()) for lexicon in lexicons]
+    assert loaded[0].info == lexicons[0].info
+    assert loaded[0]["tokuda"] is loaded[1]["tokuda"]
+
+    lexicons[0].save(str(tmp_path / "lexicon.json"))
+    assert list(load_lexicons(str(tmp_path / "lexicon.json"))[0].keys()) == list(lexicons[0].keys())
@@ -0,0 +1,105 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from alparc.eval import to_word
+from alparc.types.base_types import Register
+from alparc.controls.encoding import PhonemeEncoder, PAD
+from alparc.controls.ngrams import NgramFilter
+from alparc.controls.filter import check_bigram_stats, filter_bigrams, filter_trigrams, filter_words, \
+    filter_common_phoneme_words, positional_mask
+from alparc.io import read_bigrams
+from alparc.controls.phonotactics import SyllableCompatibility
+from alparc.core.word import check_syll_feature_overlap
+
+
+def make_words(*words):
+    return Register({word.id: word for word in map(to_word, words)})
+
+
+WORDS = make_words(["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["zɛ", "ki", "mu"], ["ɪç", "tʊ", "nɛ"])
+
+
+def test_encoder_roundtrip_and_padding():
+    words = make_words(["pi", "ta"], ["ba", "ɡo", "li"])
+    encoder = PhonemeEncoder.from_words(words)
+    encoded = encoder.encode_words(words)
+
+    assert encoded.shape == (2, 6)
+    assert (encoded[0, 4:] == PAD).all()
+    assert "".join(encoder.decode(encoded[0])) == "pita"
+
+
+def test_ngram_filter_segments_multi_character_phonemes():
+    encoder = PhonemeEncoder(["t", "s", "ts", "a"])
+    bigrams = NgramFilter(["tsa", "at"], 2, encoder)
+
+    # 'tsa' is either 'ts'+'a' or 't'+'sa' (unknown), 'at' is 'a'+'t'
+    words = np.array([[2, 3, 0], [0, 1, 3], [3, 0, PAD]])
+    assert bigrams.admissible(words).tolist() == [True, False, True]
+
+
+def test_filter_bigrams_matches_per_word_check():
+    bigrams = read_bigrams()
+    expected = [word.id for word in WORDS if check_bigram_stats(word, bigrams)]
+
+    filtered = filter_bigrams(WORDS)
+    assert list(filtered.keys()) == expected
+    assert filtered.info["bigram_pval"] is None
+    assert "bigram_pval" not in WORDS.info
+
+
+def test_filter_trigrams_returns_subset():
+    filtered = filter_trigrams(WORDS, p_val=0.05)
+    assert set(filtered.keys()) <= set(WORDS.keys())
+    assert filtered.info["trigram_pval"] == 0.05
+
+
+def with_position_probs(words, probs):
+    words = Register({word.id: word.model_copy(deep=True) for word in words}, _info=dict(words.info))
+    for word in words:
+        for syllable in word:
+            for phoneme in syllable:
+                phoneme.info["word_position_prob"] = probs.get(phoneme.id, {})
+    return words
+
+
+def test_positional_mask():
+    words = with_position_probs(make_words(["pi", "ta"], ["ba", "ti"]),
+                                {"p": {0: 0.5}, "b": {0: 0.1}, "i": {1: 0.5, 3: 0.5}, "t": {2: 0.5}, "a": {3: 0.5}})
+
+    assert positional_mask(words, position=0, p_threshold=0.2).tolist() == [True, False]
+    assert positional_mask(words, position=None, p_threshold=0.2).tolist() == [True, False]
+    assert positional_mask(words, position=None, p_threshold=0.0).tolist() == [True, True]
+    with pytest.raises(ValueError):
+        positional_mask(words, position=10)
+    assert list(filter_common_phoneme_words(words, position=1, p_threshold=0.2).keys()) == ["pita"]
+
+
+def test_filter_words_fuses_controls():
+    words = with_position_probs(WORDS, {})
+    fused = filter_words(words, positional_control=True, position_alpha=0)
+    sequential = filter_trigrams(filter_bigrams(words))
+
+    assert list(fused.keys()) == list(sequential.keys())
+    assert fused.info["bigram_pval"] is None and fused.info["trigram_pval"] is None
+
+    # on a view, the controls are evaluated in the same pass as its other steps
+    not_first = words.view().filter(lambda word: word.id != WORDS[0].id)
+    assert list(filter_words(not_first, positional_control=True, position_alpha=0).keys()) == \
+        [key for key in fused.keys() if key != WORDS[0].id]
+
+
+def test_syllable_compatibility_matches_overlap_check():
+    syllables = WORDS.flatten()
+    syllables_list = list(syllables)
+    compatibility = SyllableCompatibility(syllables)
+
+    for lookback in itertools.chain([()], itertools.combinations(range(len(syllables_list)), 1),
+                                    itertools.combinations(range(len(syllables_list)), 2)):
+        expected = [j for j, syllable in enumerate(syllables_list)
+                    if check_syll_feature_overlap([syllables_list[i] for i in lookback] + [syllable])]
+        assert compatibility.candidates(lookback).tolist() == expected
+
+    assert 0 not in compatibility.candidates((), exclude=[0])
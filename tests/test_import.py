@@ -2,3 +2,17 @@ import alparc
 
 def test_always_passes():
     assert True
+
+
+def test_import_is_lazy():
+    import subprocess
+    import sys
+
+    code = "import sys, alparc; print(' '.join(m for m in ('scipy', 'pandas', 'pydantic', 'tyro') if m in sys.modules))"
+    heavy_modules = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert heavy_modules.strip() == ""
+
+
+def test_lazy_attributes():
+    assert alparc.make_words.__module__ == "alparc.core.word"
+    assert "make_streams" in dir(alparc)
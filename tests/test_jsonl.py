@@ -0,0 +1,123 @@
+import pytest
+
+from alparc.cli import StreamArgs, generate_streams, streams_from_jsonl, _OBJECT_DUMP
+from alparc.eval import to_lexicon
+from alparc.jsonl import JsonlWriter, read_jsonl, read_jsonl_unique
+
+
+def test_jsonl_writer(tmp_path):
+    path = tmp_path / "records.jsonl"
+    with JsonlWriter(path) as writer:
+        for i in range(100):
+            writer.write({"i": i, "ids": ["pi", "ɾu"]})
+        writer.flush()
+        assert len(list(read_jsonl(path))) == 100
+        writer.write({"i": 100})
+
+    with open(path, "ab") as file:
+        file.write(b'{"i": 1')  # interrupted write
+    assert [record["i"] for record in read_jsonl(path)] == list(range(101))
+
+    writer = JsonlWriter(path)
+    writer.write({"unserializable": object()})
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_read_jsonl_unique(tmp_path):
+    path = tmp_path / "records.jsonl"
+    with JsonlWriter(path) as writer:
+        for key, value in [("a", 0), ("b", 1), ("a", 2), ("c", 3), ("b", 4)]:
+            writer.write({"key": key, "value": value})
+
+    assert [(record["key"], record["value"]) for record in read_jsonl_unique(path)] == [("a", 2), ("b", 4), ("c", 3)]
+
+
+def test_generate_streams_writes_jsonl(tmp_path):
+    (tmp_path / _OBJECT_DUMP).mkdir()
+    lexicons = [to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"]])]
+    streams = streams_from_jsonl(generate_streams(lexicons, StreamArgs(repetitions=4, n_streams_per_lexicon=2),
+                                                  str(tmp_path)), lexicons)
+
+    records = list(read_jsonl(tmp_path / _OBJECT_DUMP / "streams.jsonl"))
+    assert len(records) == 6 and len(streams) == len({record["key"] for record in records})
+    for stream in streams:
+        assert stream.info["lexicon_info"] is lexicons[0].info
+        assert stream.info["rhythmicity_indexes"] and stream.info["stream_tp_mode"]
+        assert all(syllable in lexicons[0].flatten().values() for syllable in stream.syllables[:3])
+
+
+def test_generate_streams_resume(tmp_path, monkeypatch):
+    from alparc.cli import RunCheckpoint
+    from alparc.controls.common import set_seed
+    from alparc.core import stream as stream_module
+
+    lexicons = [to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"]]),
+                to_lexicon([["ki", "bo", "la"], ["mu", "ne", "so"], ["fa", "ɡi", "pu"]])]
+    args = StreamArgs(repetitions=4, n_streams_per_lexicon=2, tp_modes=["random", "word_structured"])
+
+    def run(directory, checkpoint=None):
+        (directory / _OBJECT_DUMP).mkdir(parents=True, exist_ok=True)
+        return streams_from_jsonl(generate_streams(lexicons, args, str(directory), checkpoint), lexicons)
+
+    set_seed(1)
+    expected = [stream.id for stream in run(tmp_path / "uninterrupted")]
+
+    make_stream = stream_module.make_stream_from_lexicon
+    calls = []
+
+    def interrupted(*a, **kw):
+        calls.append(1)
+        if len(calls) == 6:  # the 2nd stream of the 1st lexicon in the 2nd round
+            raise KeyboardInterrupt
+        return make_stream(*a, **kw)
+
+    set_seed(1)
+    (tmp_path / "run" / _OBJECT_DUMP).mkdir(parents=True)
+    monkeypatch.setattr(stream_module, "make_stream_from_lexicon", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run(tmp_path / "run", RunCheckpoint(str(tmp_path / "run" / _OBJECT_DUMP)))
+    monkeypatch.setattr(stream_module, "make_stream_from_lexicon", make_stream)
+
+    checkpoint = RunCheckpoint.load(str(tmp_path / "run" / _OBJECT_DUMP))
+    assert (checkpoint.state["stages"]["streams"]["round"], checkpoint.state["stages"]["streams"]["lexicon"]) == (1, 0)
+    set_seed(2)  # the random state of the checkpoint is restored
+    assert [stream.id for stream in run(tmp_path / "run", checkpoint)] == expected
+
+
+def test_write_streams_from_jsonl(tmp_path):
+    import logging
+
+    import pandas as pd
+    import yaml
+
+    from alparc.cli import stream_summary, write_streams
+    from alparc.io import load_streams
+    from alparc.store import open_stream_store
+
+    (tmp_path / _OBJECT_DUMP).mkdir()
+    lexicons = [to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"]]),
+                to_lexicon([["ka", "mo", "fi"], ["nu", "pe", "lo"], ["to", "ku", "da"]])]
+    args = StreamArgs(repetitions=4, n_streams_per_lexicon=2)
+    path = generate_streams(lexicons, args, str(tmp_path))
+    streams = streams_from_jsonl(path, lexicons)
+    write_streams(path, lexicons, args, str(tmp_path), logging.getLogger(__name__))
+
+    loaded = load_streams(tmp_path / _OBJECT_DUMP / "streams.json")
+    assert list(loaded.keys()) == list(streams.keys())
+    assert [stream.model_dump() for stream in loaded] == [stream.model_dump() for stream in streams]
+
+    store = open_stream_store(tmp_path / _OBJECT_DUMP / "streams_store")
+    assert store.keys() == list(streams.keys())
+    assert all(store.ids(key) == [syllable.id for syllable in stream.syllables] and store.info(key) == stream.info
+               for key, stream in streams.items())
+
+    expected = {"info": {}, "streams": [stream_summary([syllable.id for syllable in stream], stream.info)
+                                         for stream in streams]}
+    with open(tmp_path / "streams.yml", encoding="utf-8") as file:
+        assert yaml.load(file, Loader=yaml.Loader) == yaml.load(yaml.dump(expected), Loader=yaml.Loader)
+
+    table = pd.read_csv(tmp_path / "streams.csv.gz")
+    assert table["key"].tolist() == list(streams.keys())
+    assert table["stream"].tolist() == ["|".join(syllable.id for syllable in stream.syllables) for stream in streams]
+    assert pd.read_csv(tmp_path / "lexicons.csv.gz")["lexicon"].tolist() == [str(lexicon) for lexicon in lexicons]
@@ -0,0 +1,31 @@
+from alparc.io import read_default_phonemes, read_phoneme_feature_table
+from alparc.types.phoneme import Phoneme, PHONEME_FEATURE_LABELS
+
+
+def test_feature_table_matches_csv_symbols():
+    table = read_phoneme_feature_table()
+    phonemes = read_default_phonemes()
+
+    assert table.features.shape == (len(phonemes), len(PHONEME_FEATURE_LABELS))
+    for phoneme in list(phonemes)[:50]:
+        symbols = [phoneme.get_feature_symbol(label) for label in PHONEME_FEATURE_LABELS]
+        assert symbols == phoneme.info["features"]
+        assert (table.row(phoneme.id) == phoneme.feature_codes).all()
+
+
+def test_feature_codes_compiled_from_info():
+    features = ["-"] * len(PHONEME_FEATURE_LABELS)
+    features[PHONEME_FEATURE_LABELS.index("cons")] = "+"
+    features[PHONEME_FEATURE_LABELS.index("round")] = "0"
+    phoneme = Phoneme(id="x", info={"features": features})
+
+    assert phoneme.get_binary_feature("cons")
+    assert not phoneme.get_binary_feature("son")
+    assert phoneme.get_feature_symbol("round") == "0"
+    assert "_feature_codes" not in phoneme.model_dump()
+
+    other = Phoneme(id="x", info={"features": features})
+    assert phoneme == other and other == phoneme
+    other.feature_codes
+    assert phoneme == other
+
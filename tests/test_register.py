@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from alparc.eval import to_lexicon
+
+
+def make_lexicon():
+    return to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"], ["ɡu", "ki", "bo"]])
+
+
+def test_features_are_cached_and_aligned():
+    lexicon = make_lexicon()
+    features = lexicon.features
+
+    assert features.shape == (4, len(features.labels), 3)
+    assert features.labels[:2] == ["son", "back"]
+    assert features.values.tolist() == [word.info["binary_features"] for word in lexicon]
+    assert lexicon.features.values is features.values
+    assert not features.values.flags.writeable
+
+
+def test_features_invalidated_on_mutation():
+    lexicon = make_lexicon()
+    lexicon.features
+    del lexicon[lexicon[0].id]
+
+    assert len(lexicon.features) == 3
+    assert lexicon.features.values.tolist() == [word.info["binary_features"] for word in lexicon]
+
+
+def test_set_feature_matrix():
+    lexicon = make_lexicon()
+    values = np.array([word.info["binary_features"] for word in lexicon])
+    lexicon.set_feature_matrix(values)
+    assert lexicon.features.values.tolist() == values.tolist()
+    assert not lexicon.features.values.flags.writeable
+
+    with pytest.raises(ValueError):
+        lexicon.set_feature_matrix(values[:3])
+    del lexicon[lexicon[0].id]
+    assert lexicon.features.values.tolist() == values[1:].tolist()
+
+
+def test_features_are_sliced_by_subsets():
+    lexicon = make_lexicon()
+    values = lexicon.features.values
+
+    filtered = lexicon.filter(lambda word: word.id != lexicon[1].id)
+    np.testing.assert_array_equal(filtered._feature_values, values[[0, 2, 3]])
+
+    subset = lexicon.get_subset(2)
+    assert subset.features.values.tolist() == [word.info["binary_features"] for word in subset]
+
+    syllables = lexicon.flatten()
+    assert syllables.features.shape == (12, len(lexicon.features.labels))
+
+
+def test_query_composes_indexed_predicates():
+    from alparc.types.query import Field, Feature, Contains, Where
+
+    lexicon = make_lexicon()
+    for i, word in enumerate(lexicon):
+        word.info["freq"] = 10 * i
+
+    assert list(lexicon.query(Field("freq").between(10, 20)).keys()) == ["baɡoli", "tokuda"]
+    assert list(lexicon.query((Field("freq") > 10) | Contains("pi")).keys()) == ["piɾuta", "tokuda", "ɡukibo"]
+    assert list(lexicon.query(Contains("ku") & ~Where(lambda word: word.id.startswith("ɡ"))).keys()) == ["tokuda"]
+
+    sonorant_first = lexicon.query(Feature("son", phoneme=0, syllable=0))
+    assert list(sonorant_first.keys()) == [word.id for word in lexicon if word.info["binary_features"][0][0]]
+    assert sonorant_first.features.values.tolist() == [word.info["binary_features"] for word in sonorant_first]
+
+    syllables = lexicon.flatten()
+    assert len(syllables.query(Feature("hi", phoneme=1))) == sum(s.id[-1] in "iu" for s in syllables)
+
+
+def test_view_evaluates_chain_like_eager_register():
+    from alparc.types.base_types import Register
+    from alparc.types.query import Contains, Field
+
+    lexicon = make_lexicon()
+    stats = Register({word.id: word.model_copy(update={"info": {"freq": 10 * i}}) for i, word in enumerate(lexicon)})
+    calls = []
+
+    def not_first(word):
+        calls.append(word.id)
+        return word.id != "piɾuta"
+
+    view = lexicon.view().query(~Contains("ki")).filter(not_first).intersection(stats).query(Field("freq") >= 20)
+    assert not calls
+
+    eager = lexicon.filter(lambda word: "ki" not in [s.id for s in word]).filter(not_first).intersection(stats)
+    eager = eager.filter(lambda word: word.info["freq"] >= 20)
+    calls.clear()
+
+    assert list(view.keys()) == list(eager.keys()) == ["tokuda"]
+    assert calls == ["piɾuta", "baɡoli", "tokuda"]
+    assert view.info == eager.info
+    assert view[0].info["freq"] == 20 and "freq" not in lexicon["tokuda"].info
+
+    syllables = lexicon.view().filter(lambda word: word.id != "piɾuta").flatten().query(Contains("k"))
+    assert list(syllables.keys()) == ["ku", "ki"]
+
+
+def test_get_subset_is_seeded_weighted_and_stratified():
+    from alparc.types.base_types import Register
+    from alparc.types.syllable import Syllable
+
+    register = Register({str(i): Syllable(id=str(i), phonemes=[], info={"freq": i % 10, "group": i % 3})
+                         for i in range(300)}, _info={"name": "digits"})
+
+    subset = register.get_subset(20, rng=1)
+    assert len(subset) == 20 and subset.info == register.info and subset.info is not register.info
+    assert list(subset.keys()) == list(register.get_subset(20, rng=1).keys())
+    assert [int(key) for key in subset.keys()] == sorted(int(key) for key in subset.keys())
+
+    heavy = register.get_subset(20, rng=2, weights="freq")
+    assert all(element.info["freq"] > 0 for element in heavy)
+    assert np.mean([element.info["freq"] for element in heavy]) > 5
+
+    stratified = register.get_subset(30, rng=3, stratify="group")
+    assert sorted(element.info["group"] for element in stratified) == [0] * 10 + [1] * 10 + [2] * 10
+    assert register.get_subset(300) is register
+
+
+def test_trusted_constructors_match_validated(tmp_path):
+    from alparc.io import load_words
+    from alparc.types.word import Word
+
+    lexicon = make_lexicon()
+    for word in lexicon:
+        trusted = Word.from_trusted_dict(word.model_dump())
+        assert trusted == word and trusted.model_dump() == word.model_dump()
+        assert trusted.syllables[0].phonotactic_mask == word.syllables[0].phonotactic_mask
+
+    path = tmp_path / "words.json"
+    lexicon.save(str(path))
+    validated, trusted = load_words(str(path)), load_words(str(path), trusted=True)
+    assert [w.model_dump() for w in trusted] == [w.model_dump() for w in validated]
+    assert trusted.info == validated.info
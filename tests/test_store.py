@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from alparc.core.stream import make_streams
+from alparc.eval import to_lexicon
+from alparc.store import open_stream_store
+
+
+def test_stream_store_round_trip(tmp_path):
+    lexicons = [to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"]]),
+                to_lexicon([["ka", "mo", "fi"], ["nu", "pe", "lo"], ["to", "ku", "da"]])]
+    streams = make_streams(lexicons, stream_length=4, max_rhythmicity=None, store=tmp_path / "store")
+
+    store = open_stream_store(tmp_path / "store")
+    assert len(store) == len(streams) and store.keys() == list(streams.keys())
+    assert isinstance(store.syllables, np.memmap)
+    assert np.shares_memory(store[0], store.syllables)
+    assert store.register_info == {**streams.info, "tp_modes": list(streams.info["tp_modes"])}
+
+    for i, (key, stream) in enumerate(streams.items()):
+        assert store.ids(i) == store.ids(key) == [syllable.id for syllable in stream.syllables]
+        assert store.info(key) == stream.info and list(store.info(key)) == list(stream.info)
+        assert store.stream_features(i).tolist() == [syllable.info["binary_features"] for syllable in stream.syllables]
+    assert store.lengths().tolist() == [len(stream.syllables) for stream in streams]
+
+
+def test_stream_store_reader_does_not_import_pydantic(tmp_path):
+    make_streams([to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"]])], stream_length=4, max_rhythmicity=None,
+                 store=tmp_path)
+    code = f"import sys; from alparc.store import StreamStore; StreamStore({str(tmp_path)!r})[0]; " \
+           f"assert 'pydantic' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
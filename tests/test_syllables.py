@@ -0,0 +1,55 @@
+import itertools
+from copy import deepcopy
+
+import pytest
+
+from alparc.core.syllable import (build_syllable_trie, iter_phoneme_combinations, syllable_from_phonemes,
+                                  syllable_features, decode_phonotactic_code, CompiledPhonemes)
+from alparc.eval import get_default_phonemes, to_word
+
+
+def test_trie_pruned_combinations_match_product():
+    factors = [["p", "ts", "t"], ["a", "aː", "i"], ["n", "ŋ"]]
+    corpus = ["tsan", "pin", "taːŋ", "ta", "tsaːŋx", "pa", "xyz"]
+
+    expected = [combination for combination in itertools.product(*factors) if "".join(combination) in corpus]
+
+    assert list(iter_phoneme_combinations(factors, build_syllable_trie(corpus))) == expected
+    assert list(iter_phoneme_combinations(factors)) == list(itertools.product(*factors))
+
+
+def test_batch_syllable_features_match_syllable_from_phonemes():
+    phonemes = get_default_phonemes()
+    combinations = [("p", "aː"), ("ʃ", "iː"), ("m", "ɛ"), ("t͡s", "uː"), ("l", "ø")]
+    compiled = CompiledPhonemes(phonemes)
+    binary_features, phonotactic_codes = syllable_features(compiled, compiled.encode(combinations, 2))
+
+    for combination, binary_row, codes in zip(combinations, binary_features.tolist(), phonotactic_codes.tolist()):
+        syllable = syllable_from_phonemes(phonemes, combination)
+        assert binary_row == syllable.info["binary_features"]
+        assert [decode_phonotactic_code(code) for code in codes] == syllable.info["phonotactic_features"]
+
+    with pytest.raises(ValueError):
+        syllable_features(compiled, compiled.encode([("p", "aː"), ("aː", "p")], 2))
+
+
+def test_cached_masks_do_not_affect_equality():
+    word = to_word(["pi", "ɾu", "ta"])
+    other = deepcopy(word)
+    word.syllables[0].phonotactic_mask, word.syllables[1].n_phonotactic_features
+
+    assert word == other and word.syllables[0] == other.syllables[0]
+    assert word.syllables[0] != word.syllables[1]
+
+
+def test_merged_info_resets_cached_masks():
+    from alparc.types.base_types import Register
+
+    word = to_word(["pi", "ɾu", "ta"])
+    syllables = Register({syllable.id: syllable for syllable in word.syllables})
+    assert syllables["pi"].phonotactic_mask
+    other = Register({"pi": syllables["pi"].model_copy(update={"info": {"phonotactic_features": [[], []]}})})
+
+    merged = syllables.intersection(other)["pi"]
+    assert merged.phonotactic_mask == 0 and merged.n_phonotactic_features == 0
+    assert syllables["pi"].phonotactic_mask
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from alparc.core.stream import make_streams
+from alparc.eval import to_lexicon
+from alparc.tables import export_stream_tables, stream_tables
+
+
+def make_test_streams():
+    lexicons = [to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"]]),
+                to_lexicon([["ka", "mo", "fi"], ["nu", "pe", "lo"], ["to", "ku", "da"]])]
+    return make_streams(lexicons, stream_length=4, max_rhythmicity=None)
+
+
+def test_stream_tables():
+    streams = make_test_streams()
+    tables = stream_tables(streams)
+
+    table = tables["streams"]
+    assert table["key"].tolist() == list(streams.keys())
+    assert table["stream_tp_mode"].tolist() == [stream.info["stream_tp_mode"] for stream in streams]
+    feature_columns = [key for key in table if key.startswith("phon_")]
+    assert feature_columns == list(streams[0].info["rhythmicity_indexes"])
+    np.testing.assert_allclose(np.stack([table[key] for key in feature_columns], axis=1),
+                               [list(stream.info["rhythmicity_indexes"].values()) for stream in streams])
+
+    lexicons = tables["lexicons"]
+    assert len(lexicons["lexicon"]) == 2
+    assert lexicons["lexicon"][table["lexicon_index"]].tolist() == table["lexicon"].tolist()
+    assert lexicons["cumulative_feature_repetitiveness"].dtype == np.int64
+
+
+def test_export_csv(tmp_path):
+    streams = make_test_streams()
+    paths = export_stream_tables(streams, tmp_path, table_format="csv")
+
+    df = pd.read_csv(paths["streams"])
+    assert len(df) == len(streams)
+    assert df["stream"].str.split("|").str.len().tolist() == [len(stream.syllables) for stream in streams]
+    assert pd.read_csv(paths["lexicons"])["lexicon"].nunique() == 2
@@ -0,0 +1,166 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from alparc.core.syllable import make_syllables
+from alparc.core.word import (make_words, check_syll_feature_overlap, sample_from_mask, word_overlap_matrix,
+                              word_feature_bitplanes, WordSpace)
+from alparc.controls.sampling import AliasTable, syllable_weights
+from alparc.eval import get_default_phonemes, to_lexicon
+
+
+@pytest.fixture(scope="module")
+def syllables():
+    return make_syllables(get_default_phonemes(), phoneme_pattern="cV")
+
+
+def test_sample_from_mask():
+    mask = np.array([[False, True, False], [False, False, False], [True, True, True]])
+    indexes, has_candidates = sample_from_mask(mask, np.random.default_rng(0))
+
+    assert indexes[0] == 1
+    assert has_candidates.tolist() == [True, False, True]
+
+
+def test_vectorized_engine(syllables):
+    words = make_words(syllables, n_words=200, positional_control=False, bigram_control=False,
+                       trigram_control=False, engine="vectorized", progress_bar=False)
+
+    assert len(words) == 200
+    for word in words:
+        assert len(word.syllables) == 3
+        assert check_syll_feature_overlap(word.syllables)
+        assert len(word.info["binary_features"]) == len(word.syllables[0].info["binary_features"])
+    assert words.info["syllables_info"]["syllable_type"] == "cV"
+
+
+def test_vectorized_engine_applies_controls(syllables):
+    words = make_words(syllables, n_words=50, positional_control=False, engine="vectorized", progress_bar=False)
+
+    assert words.info["bigram_pval"] is None and words.info["trigram_pval"] is None
+    assert len(make_words(syllables, n_words=50, positional_control=False, engine="vectorized",
+                          progress_bar=False, max_tries=0)) == 0
+
+
+def ambiguous_syllables(syllables):
+    # "a" + "aa" + "b" and "aa" + "a" + "b" are different syllable sequences with the same word id
+    renamed = [syllable.model_copy(update={"id": new_id})
+               for syllable, new_id in zip(list(syllables)[:4], ["a", "aa", "b", "c"])]
+    return syllables.new_from_dict({syllable.id: syllable for syllable in renamed})
+
+
+def test_vectorized_engine_dedups_by_word_id(syllables):
+    ambiguous = ambiguous_syllables(syllables)
+    words = make_words(ambiguous, n_words=100, max_tries=1000, phonotactic_control=False, bigram_control=False,
+                       trigram_control=False, positional_control=False, engine="vectorized", progress_bar=False)
+
+    assert 0 < len(words) < 24
+    assert words._feature_values.shape[0] == len(words)
+    for word, features in zip(words, words._feature_values):
+        assert (features == np.array([syllable.info["binary_features"] for syllable in word.syllables]).T).all()
+
+
+def test_word_space_matches_brute_force(syllables):
+    subset = syllables.new_from_dict({key: syllables[key] for key in list(syllables.keys())[::4]})
+    subset_list = list(subset)
+    space = WordSpace(subset, n_syllables=3, n_look_back=2, phonotactic_control=True)
+
+    expected = [indexes for indexes in itertools.product(range(len(subset_list)), repeat=3)
+                if len(set(indexes)) == 3 and check_syll_feature_overlap([subset_list[i] for i in indexes])]
+
+    assert list(space.iter_indexes()) == expected
+    assert sorted(space.iter_indexes(shuffle=True)) == expected
+    assert space.count() == len(expected)
+
+
+def test_word_space_uniform_sample(syllables):
+    space = WordSpace(syllables, n_syllables=3, n_look_back=2, phonotactic_control=True)
+    sample = space.sample_indexes(20, rng=np.random.default_rng(0))
+
+    assert len(set(sample)) == 20
+    assert all(check_syll_feature_overlap([space.syllables[i] for i in indexes]) for indexes in sample)
+    # the first words of a shuffled depth-first enumeration would all share their first syllable
+    assert len({indexes[0] for indexes in sample}) > 10
+
+    subset = WordSpace(syllables.new_from_dict({key: syllables[key] for key in list(syllables.keys())[::8]}))
+    assert sorted(subset.sample_indexes(10**9)) == list(subset.iter_indexes())
+
+
+def test_enumerate_engine_reports_word_space_size(syllables):
+    words = make_words(syllables, n_words=10**9, positional_control=False, engine="enumerate", progress_bar=False)
+
+    assert len(words) == words.info["n_valid_words"]
+    assert words.info["bigram_pval"] is None
+
+    # 24 syllable sequences, but only 20 distinct word ids
+    controls = dict(phonotactic_control=False, bigram_control=False, trigram_control=False, positional_control=False)
+    ambiguous = ambiguous_syllables(syllables)
+    words = make_words(ambiguous, n_words=100, engine="enumerate", progress_bar=False, **controls)
+    assert len(words) == words.info["n_valid_words"] == 20
+
+    words = make_words(ambiguous, n_words=19, engine="enumerate", progress_bar=False, **controls)
+    assert len(words) == 19
+    assert len(set(WordSpace(ambiguous, phonotactic_control=False).iter_indexes())) == 20
+
+
+def test_loop_engine_keeps_feature_matrix(syllables):
+    words = make_words(syllables, n_words=50, positional_control=False, progress_bar=False)
+
+    assert words._feature_values is not None
+    assert words.features.values.tolist() == [word.info["binary_features"] for word in words]
+
+
+def test_vectorized_engine_is_deterministic_across_jobs(syllables):
+    kwargs = dict(n_words=100, positional_control=False, engine="vectorized", progress_bar=False, batch_size=256, seed=3)
+    words = make_words(syllables, n_jobs=1, **kwargs)
+
+    assert list(words.keys()) == list(make_words(syllables, n_jobs=2, **kwargs).keys())
+    assert list(words.keys()) != list(make_words(syllables, n_jobs=1, **{**kwargs, "seed": 4}).keys())
+
+    for engine in ("loop", "enumerate"):
+        with pytest.raises(ValueError):
+            make_words(syllables, n_jobs=2, engine=engine, n_words=1)
+
+
+def test_alias_table_samples_renormalised_distribution():
+    weights = np.array([1., 0., 2., 5., 2.])
+    table = AliasTable(weights)
+    rng = np.random.default_rng(0)
+
+    draws = np.bincount(table.draw(rng, size=200_000), minlength=len(weights)) / 200_000
+    np.testing.assert_allclose(draws, weights / weights.sum(), atol=0.01)
+
+    candidates = np.array([0, 1, 2])
+    draws = np.bincount([table.draw_from(candidates, rng) for _ in range(20_000)], minlength=len(weights)) / 20_000
+    np.testing.assert_allclose(draws, [1 / 3, 0, 2 / 3, 0, 0], atol=0.02)
+    assert table.draw_from(np.array([1]), rng) is None
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_frequency_weighted_words(syllables, engine):
+    kwargs = dict(n_words=300, positional_control=False, bigram_control=False, trigram_control=False,
+                  progress_bar=False, engine=engine)
+    mean_freq = {}
+    for weighting in ["frequency", "inverse_frequency"]:
+        words = make_words(syllables, syllable_weighting=weighting, **kwargs)
+        mean_freq[weighting] = np.mean([syllable.info["freq"] for word in words for syllable in word.syllables])
+        assert words.info["syllable_weighting"] == weighting
+
+    assert mean_freq["frequency"] > 2 * mean_freq["inverse_frequency"]
+    assert (syllable_weights(syllables, "inverse_frequency") > 0).all()
+
+
+def test_word_overlap_matrix_counts_oscillating_features():
+    lexicon = to_lexicon([["pi", "ɾu", "ta"], ["ba", "ɡo", "li"], ["to", "ku", "da"], ["ɡu", "ki", "bo"]])
+    planes = word_feature_bitplanes(lexicon)
+    assert planes.shape == (4, len(lexicon[0].info["binary_features"]))
+
+    # with lag 1, a feature oscillates over a word pair iff both words have it in the same single syllable
+    expected = np.zeros((4, 4), dtype=int)
+    for i, j in itertools.product(range(4), repeat=2):
+        for f1, f2 in zip(lexicon[i].info["binary_features"], lexicon[j].info["binary_features"]):
+            expected[i, j] += (f1 == f2) and sum(f1) == 1
+
+    np.testing.assert_array_equal(word_overlap_matrix(lexicon), expected)
+    assert not word_overlap_matrix(lexicon, lag_of_interest=2).any()